@@ -0,0 +1,189 @@
+import multiprocessing as mp
+import queue
+import time
+
+from SessionStore import SENSOR_SCHEMA
+from SharedRing import SharedRing, READS, MISSED, DROPPED, JITTER_MEAN_US, JITTER_MAX_US
+
+
+RING_FIELDS = [name for name, _ in SENSOR_SCHEMA]
+INTEGER_FIELDS = {'ecg_raw', 'bpm'}
+
+
+def row_to_point(row):
+    """Convierte una fila del buffer en un dict serializable a JSON"""
+    point = dict(zip(RING_FIELDS, row.tolist()))
+    for field in INTEGER_FIELDS:
+        point[field] = int(point[field])
+    return point
+
+
+def _acquisition_main(ring_name, capacity, demo_mode, sample_rate, port, commands, ready, peaks):
+    """Proceso hijo: lee sensores, calcula BPM y publica en la memoria compartida"""
+    from AcquisitionScheduler import AcquisitionScheduler
+    from BioSensorSystem import BioSensorSystem
+
+    system = BioSensorSystem(sample_rate=sample_rate, port=port)
+    system.DEMO_MODE = demo_mode
+    if not system.connect():
+        ready.put(None)
+        return
+
+    ring = SharedRing.attach(ring_name, RING_FIELDS, capacity)
+    # Los picos R salen por su propia cola: el padre calcula la VFC sin volver a detectarlos
+    system.peak_detector.add_listener(peaks.put)
+    period = system.acquisition_period
+    scheduler = AcquisitionScheduler(system.read_sensor_batch, period=period).start()
+    # El protocolo binario puede imponer otra frecuencia: se informa al padre
+    ready.put(system.sample_rate)
+
+    try:
+        while True:
+            try:
+                command = commands.get_nowait()
+                if command[0] == 'stop':
+                    break
+                if command[0] == 'baseline':
+                    system.baseline_ecg, system.baseline_temp = command[1], command[2]
+            except queue.Empty:
+                pass
+
+            data = scheduler.get(timeout=period)
+            if data:
+                ring.write(data)
+
+                stats = scheduler.stats()
+                ring.header[READS] = stats['lecturas']
+                ring.header[MISSED] = stats['plazos_perdidos']
+                ring.header[DROPPED] = stats['muestras_descartadas']
+                ring.header[JITTER_MEAN_US] = int(stats['jitter_promedio_ms'] * 1000)
+                ring.header[JITTER_MAX_US] = int(stats['jitter_max_ms'] * 1000)
+    finally:
+        scheduler.stop()
+        system.disconnect()
+        ring.close()
+
+
+class AcquisitionProcess:
+    """Adquisición en un proceso hijo aislado del servidor web
+
+    El hijo ejecuta su propio `BioSensorSystem` con un `AcquisitionScheduler`
+    y escribe cada muestra (con el BPM ya calculado) en un `SharedRing`. Así
+    el trabajo de HTTP/Socket.IO no compite por el GIL con el muestreo. Los
+    eventos de pico R del detector del hijo llegan por una cola aparte
+    (`peak_events`), con los mismos intervalos RR que vio el hijo aunque el
+    padre se salte muestras.
+    Expone la misma interfaz que `AcquisitionScheduler` (get, stats, stop),
+    pero `get` entrega filas estructuradas (se indexan por nombre de campo,
+    igual que un dict) en lugar de dicts; `row_to_point` las convierte cuando
+    hace falta JSON.
+    """
+
+    def __init__(self, demo_mode=True, sample_rate=10, capacity=4096, port=None):
+        self.demo_mode = demo_mode
+        self.port = port
+        self.sample_rate = sample_rate
+        self.period = 1.0 / sample_rate
+        self.capacity = capacity
+        self.lost_samples = 0
+
+        self._context = mp.get_context('spawn')
+        self._commands = self._context.Queue()
+        self._ready = self._context.Queue()
+        self._peaks = self._context.Queue()
+        self._ring = None
+        self._process = None
+        self._position = 0
+        self._rows = None      # Filas copiadas del buffer que aún no se entregaron
+        self._next_row = 0
+
+    def start(self):
+        self._ring = SharedRing.create(RING_FIELDS, self.capacity)
+        self._process = self._context.Process(
+            target=_acquisition_main,
+            args=(self._ring.name, self.capacity, self.demo_mode, self.sample_rate,
+                  self.port, self._commands, self._ready, self._peaks),
+            name=f'acquisition-process-{self.port or "demo"}',
+            daemon=True
+        )
+        self._process.start()
+        return self
+
+    def wait_ready(self, timeout=15):
+        """Espera a que el hijo se conecte a los sensores; True si lo logró"""
+        try:
+            sample_rate = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        if sample_rate is None:
+            return False
+        self.sample_rate = sample_rate
+        self.period = 1.0 / sample_rate
+        return True
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.is_alive()
+
+    def set_baseline(self, ecg, temperature):
+        self._commands.put(('baseline', ecg, temperature))
+
+    def skip_to_latest(self):
+        """Descarta lo acumulado: la próxima lectura empieza en la muestra más reciente"""
+        self._position = self._ring.count
+        self._rows = None
+        self.peak_events()
+
+    def read_new(self):
+        """Filas nuevas del buffer compartido (arreglo estructurado)"""
+        rows, self._position, lost = self._ring.read_since(self._position)
+        self.lost_samples += lost
+        return rows
+
+    def peak_events(self):
+        """Eventos de pico R publicados por el hijo desde la última llamada"""
+        events = []
+        while True:
+            try:
+                events.append(self._peaks.get_nowait())
+            except queue.Empty:
+                return events
+
+    def get(self, timeout=None):
+        """Siguiente muestra como fila estructurada, o None si no llegó ninguna a tiempo"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._rows is None or self._next_row >= len(self._rows):
+            rows = self.read_new()
+            if len(rows):
+                self._rows, self._next_row = rows, 0
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(min(self.period / 4, 0.01))
+
+        row = self._rows[self._next_row]
+        self._next_row += 1
+        return row
+
+    def stats(self):
+        header = self._ring.header
+        return {
+            'lecturas': int(header[READS]),
+            'plazos_perdidos': int(header[MISSED]),
+            'muestras_descartadas': int(header[DROPPED]),
+            'muestras_perdidas': self.lost_samples,
+            'jitter_promedio_ms': int(header[JITTER_MEAN_US]) / 1000,
+            'jitter_max_ms': int(header[JITTER_MAX_US]) / 1000
+        }
+
+    def stop(self, timeout=2.0):
+        if self._process is None:
+            return
+        self._commands.put(('stop',))
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+        self._ring.close()
+        self._ring.unlink()
+        self._ring = None
@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+
+from RunningStats import RunningStats
+
+
+class AcquisitionScheduler:
+    """Hilo de adquisición con plazos fijos sobre time.monotonic()
+
+    Las lecturas se programan en una grilla `inicio + k * period`, de modo que
+    el tiempo que tarda cada lectura no se acumula como deriva. Un retraso
+    menor a un periodo se recupera en la lectura siguiente; si es mayor, los
+    plazos vencidos se cuentan como perdidos y se salta al siguiente plazo de
+    la grilla. `read_fn` puede devolver una muestra o una lista de muestras
+    (lectura por lotes); cada una se publica por separado. Las muestras se
+    entregan a los consumidores (emisión, persistencia) por una cola
+    acotada: si se llena, se descarta la muestra más antigua para no frenar
+    la adquisición.
+    """
+
+    def __init__(self, read_fn, period=0.1, queue_size=256, name='acquisition'):
+        self.read_fn = read_fn
+        self.period = period
+        self.name = name
+        self.samples = queue.Queue(maxsize=queue_size)
+
+        self.reads = 0
+        self.missed_deadlines = 0
+        self.dropped_samples = 0
+        self.jitter = RunningStats()   # Retraso (s) respecto a cada plazo
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get(self, timeout=None):
+        """Siguiente muestra adquirida, o None si no llegó ninguna a tiempo"""
+        try:
+            return self.samples.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _publish(self, data):
+        try:
+            self.samples.put_nowait(data)
+        except queue.Full:
+            # Consumidor lento: se descarta la muestra más antigua
+            try:
+                self.samples.get_nowait()
+                self.dropped_samples += 1
+            except queue.Empty:
+                pass
+            self.samples.put_nowait(data)
+
+    def _run(self):
+        next_deadline = time.monotonic()
+
+        while not self._stop.is_set():
+            delay = next_deadline - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+
+            self.jitter.update(max(0.0, time.monotonic() - next_deadline))
+
+            try:
+                data = self.read_fn()
+            except Exception as e:
+                print(f"Error en adquisición: {e}")
+                data = None
+
+            self.reads += 1
+            if isinstance(data, list):
+                # Lectura por lotes (p. ej. varias tramas binarias)
+                for sample in data:
+                    self._publish(sample)
+            elif data:
+                self._publish(data)
+
+            next_deadline += self.period
+            late = time.monotonic() - next_deadline
+            if late >= self.period:
+                # Plazos vencidos durante una lectura lenta: se saltan sin desplazar la grilla
+                missed = int(late // self.period)
+                self.missed_deadlines += missed
+                next_deadline += missed * self.period
+
+    def stats(self):
+        """Contadores de la adquisición (jitter en milisegundos)"""
+        return {
+            'lecturas': self.reads,
+            'plazos_perdidos': self.missed_deadlines,
+            'muestras_descartadas': self.dropped_samples,
+            'jitter_promedio_ms': self.jitter.mean * 1000,
+            'jitter_max_ms': (self.jitter.maximum or 0.0) * 1000
+        }
@@ -5,13 +5,29 @@ import random
 import csv
 import os
 import json
-from datetime import datetime
+import threading
 import numpy as np
-from scipy.signal import find_peaks
+from bisect import bisect_right
+from datetime import datetime
+from PeakDetector import StreamingPeakDetector
+from HRVMonitor import StreamingHRV
+from RingBuffer import RingBuffer
+from AcquisitionScheduler import AcquisitionScheduler
+from RunningStats import RunningStats, SessionStats
+from SessionStore import SessionStore
+from SessionWriter import SessionWriter
+from SessionWAL import SessionWAL, WAL_NAME
+from SerialFrameDecoder import FrameDecoder, FRAME_SIZE
+from DeviceClock import DeviceClock
+from SessionPyramid import SessionPyramid
+from SessionColumns import SessionColumns
+from SessionCatalog import SessionCatalog
+from ConsolidatedDataset import CONSOLIDATED_COLUMNS
 
 class BioSensorSystem:
-    def __init__(self):
+    def __init__(self, sample_rate=10, port=None):
         self.serial_connection = None
+        self.port = port   # Puerto serie fijo; None = primer Arduino encontrado
         self.connected = False
         self.baseline_ecg = None
         self.baseline_temp = None
@@ -20,18 +36,62 @@ class BioSensorSystem:
         #! MODO ARDUINO - False
         self.DEMO_MODE = True
         
+        #! PROTOCOLO SERIE - 'ascii' (líneas DATA: a 10 Hz)
+        #! PROTOCOLO SERIE - 'binary' (tramas con CRC, BINARY_MODE 1 en el .ino)
+        self.SERIAL_PROTOCOL = 'ascii'
+        self.BINARY_SAMPLE_RATE = 250   # Hz, ECG_INTERVAL_US del .ino
+        self.frame_decoder = FrameDecoder()
+        self.last_temperature = None    # La temperatura llega solo en algunas tramas
+        self.acquisition_period = 1.0 / sample_rate   # Segundos entre lecturas del puerto
+        
         # Variables para cálculo de BPM
-        self.ecg_window = []  # Ventana deslizante de 10 segundos
+        # Frecuencia de muestreo: ventanas, detector y duraciones se derivan de ella
+        self.sample_rate = sample_rate   # Hz
+        self.ecg_window_seconds = 10
+        self.bpm_min_seconds = 5         # Datos mínimos antes de calcular BPM
+        # Detector incremental; su ventana deslizante es un RingBuffer preasignado
+        self.peak_detector = StreamingPeakDetector(sample_rate=self.sample_rate,
+                                                   window_seconds=self.ecg_window_seconds)
+        # VFC (SDNN, RMSSD, pNN50 y LF/HF) a partir de los intervalos RR del detector
+        self.hrv_window_seconds = 60       # Ventana deslizante del dominio del tiempo
+        self.hrv_spectral_seconds = 120    # Tacograma para LF/HF
+        self.hrv_refresh_seconds = 5       # Welch como mucho una vez cada N segundos
+        self.hrv = StreamingHRV(window_seconds=self.hrv_window_seconds,
+                                spectral_seconds=self.hrv_spectral_seconds,
+                                refresh_seconds=self.hrv_refresh_seconds)
+        self.peak_detector.add_listener(self.hrv.on_peak)
+        # Reloj del Arduino como base de tiempo (desfase, huecos, muestras perdidas)
+        self.device_clock = DeviceClock(self.sample_rate)
+        self.demo_samples = 0   # Reloj simulado del modo demo
         self.last_bpm = 70    # BPM inicial por defecto
-        self.bpm_history = [] # Historial para suavizar BPM
+        self.bpm_history = RingBuffer(5)  # Historial para suavizar BPM
         
         # Variables de sesión
         self.session_active = False
-        self.session_data = []
+        self.session_data = SessionStore()  # Almacén columnar de la sesión
+        self.session_stats = SessionStats() # Estadísticas acumuladas por canal y fase
+        self.current_phase = None
+        self.phase_changes = []             # Punto de inicio de cada fase
+        self.points_offset = 0              # Puntos guardados antes de una reanudación
+        self.recovered = None               # Estado recuperado del checkpoint (sesión reanudada)
+        self._session_lock = threading.Lock()
         self.session_folder = None
         self.demographics = None
         self.hamilton_data = None
         
+        # Escritura de datos_sensores.csv en segundo plano
+        self.session_writer = None
+        self.flush_interval = 1.0     # Segundos entre lotes
+        self.fsync_policy = 'batch'   # 'batch', 'close' o 'never'
+        self.checkpoint_interval = 5.0   # Segundos entre checkpoints del WAL (acota la recuperación)
+        
+        # Copia remuestreada en una grilla uniforme (datos_uniformes.csv) al terminar
+        self.resample_on_save = False
+        self.resample_max_gap = 1.0   # Segundos; huecos más largos quedan en NaN
+        
+        # Copia columnar binaria (columnas/*.npy) para cargar la sesión sin parsear el CSV
+        self.save_columnar = True
+        
     def connect(self):
         """Conecta con el Arduino o activa modo demo"""
         if self.DEMO_MODE:
@@ -40,17 +100,17 @@ class BioSensorSystem:
             return True
             
         try:
-            ports = serial.tools.list_ports.comports()
-            arduino_port = None
-            
-            for port in ports:
-                if 'Arduino' in port.description or 'USB' in port.description:
-                    arduino_port = port.device
-                    break
+            arduino_port = self.port
+            if arduino_port is None:
+                ports = self.find_arduino_ports()
+                arduino_port = ports[0] if ports else None
             
             if arduino_port:
                 self.serial_connection = serial.Serial(arduino_port, 115200, timeout=1)
                 time.sleep(2)
+                if self.SERIAL_PROTOCOL == 'binary':
+                    self._configure_binary()
+                self.port = arduino_port
                 self.connected = True
                 print(f"✓ Arduino conectado en: {arduino_port}")
                 return True
@@ -62,58 +122,38 @@ class BioSensorSystem:
             print(f"✗ Error al conectar: {e}")
             return False
     
-    def calculate_bpm(self, ecg_voltage):
-        """Calcula BPM a partir de la señal ECG usando detección de picos"""
-        
-        # Agregar nuevo valor a la ventana
-        self.ecg_window.append(ecg_voltage)
-        
-        # Mantener ventana de 100 muestras (10 segundos a 10Hz)
-        if len(self.ecg_window) > 100:
-            self.ecg_window.pop(0)
-        
-        # Necesitamos al menos 5 segundos de datos (50 muestras)
-        if len(self.ecg_window) < 50:
-            return self.last_bpm
+    @staticmethod
+    def find_arduino_ports():
+        """Puertos serie que parecen un Arduino (o adaptador USB)"""
+        return [port.device for port in serial.tools.list_ports.comports()
+                if 'Arduino' in port.description or 'USB' in port.description]
+    
+    def calculate_bpm(self, ecg_voltage, device_time=None):
+        """Calcula BPM a partir de la señal ECG usando detección incremental de picos
+
+        `device_time` (s, reloj del Arduino) fija el tiempo de los picos R que
+        recibe la VFC.
+        """
         
         try:
-            # Convertir a numpy array
-            signal = np.array(self.ecg_window)
+            # Procesar la nueva muestra; los picos de la ventana son los mismos que daría find_peaks
+            self.peak_detector.update(ecg_voltage, device_time)
             
-            # Normalizar señal (z-score)
-            signal_mean = np.mean(signal)
-            signal_std = np.std(signal)
+            # Necesitamos al menos 5 segundos de datos
+            if len(self.peak_detector.window) < self.bpm_min_seconds * self.sample_rate:
+                return self.last_bpm
             
             # ← PROTECCIÓN: Si no hay variación, retornar BPM por defecto
-            if signal_std == 0 or signal_std < 0.001:
+            if self.peak_detector.flat:
                 return self.last_bpm
             
-            normalized_signal = (signal - signal_mean) / signal_std
-            
-            # Detectar picos R (latidos del corazón)
-            peaks, properties = find_peaks(
-                normalized_signal, 
-                height=0.5,      # Ajustar si no detecta picos
-                distance=6,      # Mínimo 0.6 segundos entre latidos
-                prominence=0.3   # Qué tan prominente debe ser el pico
-            )
-            
             # Necesitamos al menos 3 picos para calcular BPM confiable
-            if len(peaks) >= 3:
-                # Calcular intervalos entre picos (en segundos)
-                intervals = np.diff(peaks) * 0.1  # 0.1 segundos por muestra (10Hz)
-                
-                # ← PROTECCIÓN: Filtrar intervalos válidos
-                intervals = intervals[intervals > 0]
-                
-                if len(intervals) == 0:
-                    return self.last_bpm
-                
-                # Calcular BPM promedio
-                avg_interval = np.mean(intervals)
+            if len(self.peak_detector.peaks) >= 3:
+                # Intervalo promedio entre picos (en segundos)
+                avg_interval = self.peak_detector.mean_rr()
                 
                 # ← PROTECCIÓN: Evitar división por cero
-                if avg_interval == 0 or avg_interval < 0.001:
+                if not avg_interval or avg_interval < 0.001:
                     return self.last_bpm
                 
                 current_bpm = 60 / avg_interval
@@ -122,10 +162,8 @@ class BioSensorSystem:
                 if 40 <= current_bpm <= 180:
                     # Suavizar usando promedio móvil
                     self.bpm_history.append(current_bpm)
-                    if len(self.bpm_history) > 5:
-                        self.bpm_history.pop(0)
                     
-                    smoothed_bpm = np.mean(self.bpm_history)
+                    smoothed_bpm = self.bpm_history.view().mean()
                     self.last_bpm = int(smoothed_bpm)
                     
                     return self.last_bpm
@@ -144,6 +182,7 @@ class BioSensorSystem:
             return None
         
         # ← DEFINIR VARIABLES POR DEFECTO AL INICIO
+        device_ms = 0
         ecg_raw = 0
         ecg_voltage = 0
         temp = 0
@@ -155,11 +194,12 @@ class BioSensorSystem:
             base_temp = 36.5
             
             # Factor de estrés que aumenta con el tiempo
-            stress_factor = min(len(self.ecg_window) / 100, 0.08)  # Hasta 8% de aumento
+            stress_factor = min(len(self.peak_detector.window) / self.peak_detector.window_size, 0.08)  # Hasta 8% de aumento
             
             # ECG: Simular señal con picos (latidos)
-            # Crear señal de ECG sintética con latidos
-            t = len(self.ecg_window) % 10  # Posición en el ciclo (0-9)
+            # Crear señal de ECG sintética con latidos (un ciclo por segundo)
+            cycle = max(10, int(round(self.sample_rate)))
+            t = (len(self.peak_detector.window) % cycle) * 10 // cycle  # Posición en el ciclo (0-9)
             
             # Simular complejo QRS (pico R cada ~7-8 muestras para 70-80 BPM)
             if t in [2, 3]:  # Pico R
@@ -175,8 +215,12 @@ class BioSensorSystem:
             # Temperatura: Sube gradualmente con estrés
             temp = base_temp + random.uniform(-0.1, 0.3) + stress_factor * 2
             
+            # El "dispositivo" simulado muestrea exactamente a sample_rate
+            device_ms = self.demo_samples * 1000 / self.sample_rate
+            self.demo_samples += 1
+            
             # Calcular BPM del ECG simulado
-            bpm = self.calculate_bpm(ecg_voltage)
+            bpm = self.calculate_bpm(ecg_voltage, device_ms / 1000.0)
             
         else:
             # MODO REAL: Leer del Arduino
@@ -199,18 +243,24 @@ class BioSensorSystem:
                 if len(values) < 4:
                     return None
                 
-                ecg_raw = int(values[0])
+                # Formato: tiempo relativo (ms), ecg_raw, voltaje, temperatura
+                device_ms = int(values[0])
+                ecg_raw = int(values[1])
                 ecg_voltage = float(values[2])
                 temp = float(values[3])
                 
                 # Calcular BPM del ECG real
-                bpm = self.calculate_bpm(ecg_voltage)
+                bpm = self.calculate_bpm(ecg_voltage, device_ms / 1000.0)
                 
             except Exception as e:
                 print(f"Error leyendo Arduino: {e}")
                 return None
         
-        # Calcular cambios respecto al baseline
+        timestamp, device_time = self.device_clock.update(device_ms, time.time())
+        return self._make_point(timestamp, ecg_raw, ecg_voltage, temp, bpm, device_time)
+    
+    def _make_point(self, timestamp, ecg_raw, ecg_voltage, temp, bpm, device_time):
+        """Arma el punto de datos con los cambios respecto al baseline"""
         ecg_change = 0
         temp_change = 0
         
@@ -221,36 +271,124 @@ class BioSensorSystem:
             temp_change = temp - self.baseline_temp
         
         return {
-            'timestamp': time.time(),
+            'timestamp': timestamp,
             'ecg_raw': ecg_raw,
             'ecg_voltage': ecg_voltage,
             'temperature': temp,
             'ecg_change_percent': ecg_change,
             'temp_change_celsius': temp_change,
-            'bpm': bpm  # ← Ahora siempre está definido
+            'bpm': bpm,  # ← Ahora siempre está definido
+            'device_time': device_time
         }
     
-    def set_baseline(self, duration=10):
-        """Establece valores baseline durante N segundos"""
-        print(f"📊 Calculando baseline durante {duration} segundos...")
+    def set_sample_rate(self, sample_rate):
+        """Cambia la frecuencia de muestreo y reconstruye lo que depende de ella"""
+        self.sample_rate = sample_rate
+        self.peak_detector = StreamingPeakDetector(sample_rate=self.sample_rate,
+                                                   window_seconds=self.ecg_window_seconds)
+        self.hrv.reset()
+        self.peak_detector.add_listener(self.hrv.on_peak)
+        self.bpm_history.clear()
+        self.device_clock = DeviceClock(self.sample_rate)
+        if self.SERIAL_PROTOCOL == 'binary' and not self.DEMO_MODE:
+            # Las tramas llegan solas: se lee el puerto por lotes
+            self.acquisition_period = max(1.0 / sample_rate, 0.02)
+        else:
+            self.acquisition_period = 1.0 / sample_rate
+    
+    def _configure_binary(self):
+        """Prepara la lectura de tramas binarias a la frecuencia del Arduino"""
+        self.set_sample_rate(self.BINARY_SAMPLE_RATE)
+        self.frame_decoder = FrameDecoder()
+        self.last_temperature = None
+        self.serial_connection.reset_input_buffer()
+    
+    def read_sensor_batch(self):
+        """Lee todas las muestras disponibles (lista de puntos)
         
-        ecg_values = []
-        temp_values = []
-        bpm_values = []
+        Con el protocolo binario decodifica de una vez todas las tramas que hay
+        en el buffer del puerto; en modo demo o ASCII devuelve una sola muestra.
+        """
+        if self.DEMO_MODE or self.SERIAL_PROTOCOL != 'binary':
+            data = self.read_sensor_data()
+            return [data] if data else []
         
-        start_time = time.time()
+        if not self.connected:
+            return []
         
-        while time.time() - start_time < duration:
-            data = self.read_sensor_data()
-            if data:
-                ecg_values.append(data['ecg_voltage'])
-                temp_values.append(data['temperature'])
-                bpm_values.append(data['bpm'])
-            time.sleep(0.1)
+        try:
+            waiting = self.serial_connection.in_waiting
+            frames = self.frame_decoder.feed(self.serial_connection.read(max(waiting, FRAME_SIZE)))
+        except Exception as e:
+            print(f"Error leyendo Arduino: {e}")
+            return []
+        
+        if len(frames['seq']) == 0:
+            return []
+        
+        # Hora de cada trama a partir del reloj del dispositivo
+        timestamps, device_times = self.device_clock.update_batch(frames['device_ms'], time.time())
+        voltages = frames['ecg_raw'] * 5.0 / 1023.0
+        
+        points = []
+        for timestamp, device_time, ecg_raw, ecg_voltage, temp in zip(
+                timestamps.tolist(), device_times.tolist(), frames['ecg_raw'].tolist(),
+                voltages.tolist(), frames['temperature'].tolist()):
+            if temp == temp:   # NaN: temperatura no medida en esta trama
+                self.last_temperature = temp
+            bpm = self.calculate_bpm(ecg_voltage, device_time)
+            if self.last_temperature is None:
+                # Antes de la primera lectura de temperatura (a lo sumo 1 s tras conectar) no
+                # se arman puntos: un 0 °C de relleno contaminaría el baseline y las estadísticas
+                continue
+            points.append(self._make_point(timestamp, ecg_raw, ecg_voltage,
+                                           self.last_temperature, bpm, device_time))
+        return points
+    
+    def serial_stats(self):
+        """Contadores del decodificador de tramas (None con el protocolo ASCII)"""
+        if self.DEMO_MODE or self.SERIAL_PROTOCOL != 'binary':
+            return None
+        return self.frame_decoder.stats()
+    
+    def set_baseline(self, duration=10, source=None):
+        """Establece valores baseline durante N segundos
+
+        `source` es una fuente de muestras ya en marcha (p. ej. un
+        AcquisitionProcess); si no se indica se leen los sensores aquí.
+        """
+        print(f"📊 Calculando baseline durante {duration} segundos...")
         
-        self.baseline_ecg = sum(ecg_values) / len(ecg_values)
-        self.baseline_temp = sum(temp_values) / len(temp_values)
-        baseline_bpm = sum(bpm_values) / len(bpm_values)
+        ecg_stats = RunningStats()
+        temp_stats = RunningStats()
+        bpm_stats = RunningStats()
+        
+        acquisition = source
+        if acquisition is None:
+            acquisition = AcquisitionScheduler(self.read_sensor_batch, period=self.acquisition_period,
+                                               name='baseline').start()
+        else:
+            acquisition.skip_to_latest()
+        end_time = time.monotonic() + duration
+        
+        try:
+            while time.monotonic() < end_time:
+                data = acquisition.get(timeout=max(0.0, end_time - time.monotonic()))
+                if data is not None:
+                    ecg_stats.update(data['ecg_voltage'])
+                    temp_stats.update(data['temperature'])
+                    bpm_stats.update(data['bpm'])
+        finally:
+            if source is None:
+                acquisition.stop()
+        
+        # ← PROTECCIÓN: sin lecturas no hay baseline
+        if ecg_stats.count == 0:
+            raise RuntimeError("No se recibieron datos de los sensores durante el baseline")
+        
+        self.baseline_ecg = ecg_stats.mean
+        self.baseline_temp = temp_stats.mean
+        baseline_bpm = bpm_stats.mean
         
         print(f"✓ Baseline ECG: {self.baseline_ecg:.4f}V")
         print(f"✓ Baseline Temperatura: {self.baseline_temp:.2f}°C")
@@ -262,10 +400,17 @@ class BioSensorSystem:
             'bpm': baseline_bpm
         }
     
-    def start_session(self, demographics, hamilton_data):
+    def start_session(self, demographics, hamilton_data, phase=None):
         """Inicia una nueva sesión"""
         self.session_active = True
-        self.session_data = []
+        self.session_data = SessionStore()
+        self.session_stats = SessionStats()
+        self.current_phase = None
+        self.phase_changes = []
+        self.points_offset = 0
+        self.recovered = None
+        self.hrv.begin()
+        self.set_phase(phase)
         self.demographics = demographics
         self.hamilton_data = hamilton_data
         
@@ -276,7 +421,16 @@ class BioSensorSystem:
         
         folder_name = f"{timestamp}_{edad}anos_{sexo}"
         self.session_folder = os.path.join('sessions', folder_name)
-        os.makedirs(self.session_folder, exist_ok=True)
+        # Varias estaciones pueden iniciar en el mismo segundo con los mismos datos:
+        # crear la carpeta es la reserva del nombre (si ya existe, se prueba el siguiente)
+        suffix = 2
+        while True:
+            try:
+                os.makedirs(self.session_folder)
+                break
+            except FileExistsError:
+                self.session_folder = os.path.join('sessions', f"{folder_name}_{suffix}")
+                suffix += 1
         
         # Guardar Hamilton PRE
         hamilton_file = os.path.join(self.session_folder, 'hamilton_pre.json')
@@ -291,85 +445,389 @@ class BioSensorSystem:
                 }
             }, f, indent=2, ensure_ascii=False)
         
+        # Metadatos de adquisición, necesarios para interpretar datos_sensores.csv
+        metadata_file = os.path.join(self.session_folder, 'metadatos.json')
+        with open(metadata_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'frecuencia_muestreo_hz': self.sample_rate,
+                'modo': 'demo' if self.DEMO_MODE else 'arduino',
+                'protocolo': None if self.DEMO_MODE else self.SERIAL_PROTOCOL,
+                'inicio': datetime.now().isoformat(),
+                'baseline': {
+                    'ecg_voltaje': self.baseline_ecg,
+                    'temperatura_celsius': self.baseline_temp
+                }
+            }, f, indent=2, ensure_ascii=False)
+        
+        # Los datos de sensores se escriben por lotes mientras dura la sesión
+        self.session_writer = self._new_writer()
+        
         print(f"✓ Sesión iniciada: {self.session_folder}")
         return self.session_folder
     
     
 
+    def _new_writer(self, resume=None):
+        """SessionWriter con WAL y checkpoints en la carpeta de la sesión"""
+        return SessionWriter(
+            os.path.join(self.session_folder, 'datos_sensores.csv'),
+            self.session_data,
+            flush_interval=self.flush_interval,
+            fsync_policy=self.fsync_policy,
+            wal=SessionWAL(os.path.join(self.session_folder, WAL_NAME), append=resume is not None),
+            snapshot=self._session_snapshot(),
+            checkpoint_interval=self.checkpoint_interval,
+            sample_rate=self.sample_rate,
+            resume=resume
+        ).start()
+    
+    def _session_snapshot(self):
+        """Función que devuelve las filas en memoria y el estado acumulado hasta ellas
+        
+        Queda ligada al almacén, las estadísticas, los cambios de fase y la
+        VFC de la sesión actual: el escritor de una sesión detenida puede
+        seguir vaciándose en el finalizador cuando otra ya empezó.
+        """
+        store = self.session_data
+        stats = self.session_stats
+        phase_changes = self.phase_changes
+        hrv_state = self.hrv.session_state()
+        resumes = self.recovered.get('reanudaciones', 0) if self.recovered else 0
+        
+        def snapshot():
+            with self._session_lock:
+                return len(store), {
+                    'estadisticas': stats.to_dict(),
+                    'cambios_fase': list(phase_changes),
+                    'fase_actual': phase_changes[-1]['fase'] if phase_changes else None,
+                    'reanudaciones': resumes,
+                    'hrv': hrv_state()
+                }
+        return snapshot
+
+    def set_phase(self, phase):
+        """Cambia la fase del protocolo; los puntos siguientes se acumulan en ella"""
+        if phase is None or phase == self.current_phase:
+            return
+        self.hrv.set_phase(phase)
+        with self._session_lock:
+            self.current_phase = phase
+            self.phase_changes.append({'fase': phase,
+                                       'inicio_punto': self.points_offset + len(self.session_data)})
+
     def add_data_point(self, data):
         """Agrega un punto de datos a la sesión"""
         if self.session_active:
-            self.session_data.append(data)
+            with self._session_lock:
+                self.session_data.append(data)
+                self.session_stats.update(data, self.current_phase)
+    
+    def live_summary(self):
+        """Resumen de la sesión en curso, sin recorrer los datos (O(1))"""
+        summary = self.session_stats.summary()
+        summary['duracion_segundos'] = self._session_duration()
+        summary['frecuencia_muestreo_hz'] = self.sample_rate
+        summary['sesion_activa'] = self.session_active
+        summary['fase_actual'] = self.current_phase
+        summary['fases'] = self.session_stats.phase_summary()
+        summary['hrv'] = self.hrv.metrics()
+        return summary
     
-    def stop_session(self):
-        """Detiene la sesión y guarda archivos"""
+    def stop_session(self, finalizer=None, on_progress=None, on_done=None):
+        """Detiene la sesión y guarda archivos
+        
+        El resumen se arma al instante con las estadísticas acumuladas. Las
+        escrituras a disco se hacen aquí mismo o, si se pasa un
+        `SessionFinalizer`, en su hilo de E/S (con `on_progress`/`on_done`).
+        """
         if not self.session_active:
             return None
         
         self.session_active = False
-        
-        # Guardar CSV de datos de sensores
-        csv_file = os.path.join(self.session_folder, 'datos_sensores.csv')
-        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['timestamp', 'ecg_raw', 'ecg_voltage', 'temperature', 
-                           'ecg_change_percent', 'temp_change_celsius', 'bpm'])
-            
-            for point in self.session_data:
-                writer.writerow([
-                    point['timestamp'],
-                    point['ecg_raw'],
-                    point['ecg_voltage'],
-                    point['temperature'],
-                    point['ecg_change_percent'],
-                    point['temp_change_celsius'],
-                    point['bpm']
-                ])
-        
-        # Calcular resumen
-        ecg_values = [p['ecg_voltage'] for p in self.session_data]
-        temp_values = [p['temperature'] for p in self.session_data]
-        bpm_values = [p['bpm'] for p in self.session_data]
-        
-        summary = {
-            'duracion_segundos': len(self.session_data) * 0.1,
-            'puntos_datos': len(self.session_data),
-            'ecg': {
-                'promedio': sum(ecg_values) / len(ecg_values),
-                'minimo': min(ecg_values),
-                'maximo': max(ecg_values),
-                'desviacion': np.std(ecg_values)
-            },
-            'temperatura': {
-                'promedio': sum(temp_values) / len(temp_values),
-                'minimo': min(temp_values),
-                'maximo': max(temp_values),
-                'desviacion': np.std(temp_values)
-            },
-            'bpm': {
-                'promedio': sum(bpm_values) / len(bpm_values),
-                'minimo': min(bpm_values),
-                'maximo': max(bpm_values),
-                'desviacion': np.std(bpm_values)
-            },
+        self.hrv.end()
+        
+        # Resumen a partir de las estadísticas acumuladas durante la sesión
+        summary = self._build_summary(
+            self.session_stats, self._session_duration(), self._session_gaps(),
+            self.sample_rate, self.baseline_ecg, self.baseline_temp, self.phase_changes,
+            self.hrv.summary()
+        )
+        if self.recovered:
+            summary['reanudaciones'] = self.recovered.get('reanudaciones', 0)
+        
+        steps = self._finalization_steps(summary)
+        self.session_writer = None
+        
+        if finalizer is None:
+            for _, step in steps:
+                step()
+        else:
+            finalizer.submit(steps, on_progress, on_done, key=self.session_folder)
+        return summary
+    
+    @staticmethod
+    def _build_summary(stats, duration, gaps, sample_rate, baseline_ecg, baseline_temp, phase_changes,
+                       hrv=None):
+        totals = stats.summary()
+        return {
+            'duracion_segundos': duration,
+            'frecuencia_muestreo_hz': sample_rate,
+            'huecos': gaps,
+            'puntos_datos': totals['puntos_datos'],
+            'ecg': totals['ecg'],
+            'temperatura': totals['temperatura'],
+            'bpm': totals['bpm'],
             'baseline': {
-                'ecg_voltaje': self.baseline_ecg,
-                'temperatura_celsius': self.baseline_temp
-            }
+                'ecg_voltaje': baseline_ecg,
+                'temperatura_celsius': baseline_temp
+            },
+            'fases': stats.phase_summary(),
+            'cambios_fase': phase_changes,
+            'hrv': hrv   # Totales de la sesión y por fase (sin picos R detectados: None)
         }
-        
-        # Guardar resumen
-        summary_file = os.path.join(self.session_folder, 'resumen_sesion.json')
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
-        
+    
+    def _finalization_steps(self, summary):
+        """Escrituras pendientes de la sesión, con sus datos ya capturados
+        
+        Los pasos no leen atributos de la instancia al ejecutarse: una sesión
+        nueva puede empezar mientras se termina de guardar la anterior.
+        """
+        folder = self.session_folder
+        writer = self.session_writer
+        store = self.session_data
+        sample_rate = self.sample_rate
+        max_gap = self.resample_max_gap
+        # Tras una reanudación la memoria solo tiene el último tramo: se parte del CSV
+        resumed = self.recovered is not None
+        
+        def save_summary():
+            summary_file = os.path.join(folder, 'resumen_sesion.json')
+            with open(summary_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+        
+        def done():
+            print(f"✓ Sesión guardada: {folder}")
+        
+        # El CSV ya está en disco: solo queda escribir el último lote
+        steps = [('datos_sensores', writer.close), ('resumen', save_summary)]
+        if self.save_columnar:
+            if resumed:
+                steps.append(('columnas', lambda: SessionColumns.load_columns(folder, convert=True)))
+            else:
+                steps.append(('columnas', lambda: SessionColumns.write(folder, store.columns())))
+        steps.append(('piramide', lambda: SessionPyramid.build(folder, None if resumed else store.columns())))
+        if self.resample_on_save:
+            steps.append(('datos_uniformes',
+                          lambda: self._guardar_datos_uniformes(store, folder, sample_rate, max_gap)))
         # Agregar a CSV consolidado
-        self._agregar_a_csv_consolidado(summary)
+        steps.append(('consolidado', lambda: self._agregar_a_csv_consolidado(summary, folder)))
+        steps.append(('catalogo', lambda: SessionCatalog().index_folder(folder)))
+        steps.append(('fin', done))
+        return steps
+    
+    def _session_duration(self):
+        """Duración según el reloj del dispositivo (incluye los huecos)"""
+        # Tramos anteriores a una reanudación (el reloj del Arduino pudo reiniciarse)
+        duration = self.recovered['duracion_segundos'] if self.recovered else 0.0
+        if len(self.session_data) == 0:
+            return duration
+        device_time = self.session_data.column('device_time')
+        return duration + float(device_time[-1] - device_time[0]) + 1.0 / self.sample_rate
+    
+    def _session_gaps(self):
+        """Huecos de la sesión detectados en el tiempo del dispositivo"""
+        gaps = DeviceClock.gap_summary(self.session_data.column('device_time'), 1.0 / self.sample_rate,
+                                       self.device_clock.gap_factor)
+        if self.recovered:
+            for key, value in self.recovered['huecos'].items():
+                gaps[key] += value
+        return gaps
+    
+    @staticmethod
+    def _guardar_datos_uniformes(store, folder, sample_rate, max_gap):
+        """Guarda los datos remuestreados a sample_rate sobre el tiempo del dispositivo"""
+        columns = store.resample(sample_rate, max_gap=max_gap)
+        names = ['device_time'] + [name for name in store.names if name != 'device_time']
+        formats = ['%d' if np.issubdtype(columns[name].dtype, np.integer) else '%.6f' for name in names]
+        np.savetxt(os.path.join(folder, 'datos_uniformes.csv'),
+                   np.column_stack([columns[name] for name in names]).astype(object),
+                   fmt=formats, delimiter=',', header=','.join(names), comments='')
+    
+    # ========================================
+    # RECUPERACIÓN DE SESIONES INTERRUMPIDAS
+    # ========================================
+    
+    @staticmethod
+    def find_unfinished_sessions(root='sessions'):
+        """Carpetas con WAL pero sin resumen_sesion.json (el servidor se cortó)"""
+        if not os.path.isdir(root):
+            return []
+        unfinished = []
+        for name in sorted(os.listdir(root)):
+            folder = os.path.join(root, name)
+            if (os.path.exists(os.path.join(folder, WAL_NAME))
+                    and not os.path.exists(os.path.join(folder, 'resumen_sesion.json'))):
+                unfinished.append(folder)
+        return unfinished
+    
+    @staticmethod
+    def recover_session(folder):
+        """Deja la sesión consistente a partir del último checkpoint y del WAL
+        
+        Solo se leen los registros del WAL posteriores al checkpoint, así que
+        el tiempo de recuperación no depende de la duración de la sesión. Se
+        trunca el WAL en el último registro válido, se reconstruye la cola de
+        datos_sensores.csv y se escribe un checkpoint nuevo. Devuelve el
+        estado recuperado (mismo formato que el checkpoint).
+        """
+        with open(os.path.join(folder, 'metadatos.json'), encoding='utf-8') as f:
+            metadata = json.load(f)
+        sample_rate = metadata.get('frecuencia_muestreo_hz', 10)
+        period = 1.0 / sample_rate
+        
+        state = SessionWAL.read_checkpoint(folder)
+        if state is None:
+            raise RuntimeError(f"La sesión {folder} no tiene checkpoint")
+        
+        wal_path = os.path.join(folder, WAL_NAME)
+        tail, events, valid_end = SessionWAL.scan(wal_path, state['wal_bytes'])
+        os.truncate(wal_path, valid_end)
+        
+        # Cambios de fase registrados después del checkpoint
+        phase_changes = list(state['cambios_fase'])
+        known = {(change['fase'], change['inicio_punto']) for change in phase_changes}
+        for event in events:
+            if (event['fase'], event['inicio_punto']) not in known:
+                phase_changes.append(event)
+        phase_changes.sort(key=lambda change: change['inicio_punto'])
+        
+        # Estadísticas: las del checkpoint más las filas de la cola
+        stats = SessionStats.from_dict(state['estadisticas'])
+        starts = [change['inicio_punto'] for change in phase_changes]
+        names = tail.dtype.names
+        for i, row in enumerate(tail.tolist()):
+            index = state['filas'] + i
+            position = bisect_right(starts, index) - 1
+            stats.update(dict(zip(names, row)), phase_changes[position]['fase'] if position >= 0 else None)
+        
+        # El CSV puede tener filas a medio escribir: se corta en el checkpoint y se rehace la cola
+        csv_path = os.path.join(folder, 'datos_sensores.csv')
+        with open(csv_path, 'r+b') as f:
+            f.truncate(state['csv_bytes'])
+            f.seek(0, os.SEEK_END)
+            if len(tail):
+                rows = SessionStore(initial_capacity=len(tail))
+                rows.extend(tail)
+                f.write(rows.format_rows().encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+            csv_bytes = f.tell()
+        
+        duration = state['duracion_segundos']
+        gaps = dict(state['huecos'])
+        last_device_time = state['ultimo_device_time']
+        if len(tail):
+            device_time = tail['device_time']
+            if last_device_time is None:
+                duration += float(device_time[-1] - device_time[0]) + period
+            else:
+                device_time = np.concatenate(([last_device_time], device_time))
+                duration += float(device_time[-1] - last_device_time)
+            for key, value in DeviceClock.gap_summary(device_time, period).items():
+                gaps[key] += value
+            last_device_time = float(device_time[-1])
+        
+        state.update({
+            'filas': state['filas'] + len(tail),
+            'wal_bytes': valid_end,
+            'csv_bytes': csv_bytes,
+            'duracion_segundos': duration,
+            'ultimo_device_time': last_device_time,
+            'huecos': gaps,
+            'estadisticas': stats.to_dict(),
+            'cambios_fase': phase_changes,
+            'fase_actual': phase_changes[-1]['fase'] if phase_changes else state['fase_actual']
+        })
+        SessionWAL.write_checkpoint(folder, state)
+        
+        state['frecuencia_muestreo_hz'] = sample_rate
+        state['baseline'] = metadata.get('baseline', {})
+        print(f"✓ Sesión recuperada: {folder} ({state['filas']} puntos, {len(tail)} desde el checkpoint)")
+        return state
+    
+    def resume_session(self, folder, phase=None):
+        """Continúa grabando una sesión interrumpida en su misma carpeta"""
+        state = self.recover_session(folder)
+        if state['frecuencia_muestreo_hz'] != self.sample_rate:
+            raise RuntimeError(f"La sesión se grabó a {state['frecuencia_muestreo_hz']} Hz "
+                               f"y el sistema muestrea a {self.sample_rate} Hz")
+        
+        with open(os.path.join(folder, 'hamilton_pre.json'), encoding='utf-8') as f:
+            hamilton = json.load(f)
+        
+        baseline = state['baseline']
+        if self.baseline_ecg is None:
+            self.baseline_ecg = baseline.get('ecg_voltaje')
+            self.baseline_temp = baseline.get('temperatura_celsius')
+        
+        self.session_folder = folder
+        self.session_active = True
+        self.session_data = SessionStore()
+        self.session_stats = SessionStats.from_dict(state['estadisticas'])
+        self.phase_changes = list(state['cambios_fase'])
+        self.current_phase = state['fase_actual']
+        self.points_offset = state['filas']
+        # Los latidos posteriores al último checkpoint no llegan a la VFC (a lo sumo checkpoint_interval)
+        self.hrv.begin(self.current_phase, state.get('hrv'))
+        state['reanudaciones'] = state.get('reanudaciones', 0) + 1
+        self.recovered = state
+        self.demographics = hamilton['demographics']
+        # Mismo formato que recibe start_session desde la interfaz
+        self.hamilton_data = {
+            'demographics': hamilton['demographics'],
+            'responses': hamilton['responses'],
+            'psychic': hamilton['puntuaciones']['psiquica'],
+            'somatic': hamilton['puntuaciones']['somatica'],
+            'total': hamilton['puntuaciones']['total']
+        }
+        self.set_phase(phase)
         
-        print(f"✓ Sesión guardada: {self.session_folder}")
-        return summary
+        self.session_writer = self._new_writer(resume=state)
+        print(f"✓ Sesión reanudada: {folder} (fase {self.current_phase})")
+        return folder
     
-    def _agregar_a_csv_consolidado(self, summary):
+    def finalize_unfinished(self, folder, finalizer=None, on_progress=None, on_done=None):
+        """Cierra una sesión interrumpida sin reanudarla (resumen y CSV consolidado)"""
+        result = {}
+        
+        def recover():
+            state = self.recover_session(folder)
+            baseline = state['baseline']
+            result['summary'] = self._build_summary(
+                SessionStats.from_dict(state['estadisticas']), state['duracion_segundos'],
+                state['huecos'], state['frecuencia_muestreo_hz'],
+                baseline.get('ecg_voltaje'), baseline.get('temperatura_celsius'), state['cambios_fase'],
+                StreamingHRV.summary_from_dict(state.get('hrv'))
+            )
+            result['summary']['recuperada'] = True
+        
+        def save_summary():
+            with open(os.path.join(folder, 'resumen_sesion.json'), 'w', encoding='utf-8') as f:
+                json.dump(result['summary'], f, indent=2, ensure_ascii=False)
+        
+        steps = [('recuperacion', recover), ('resumen', save_summary)]
+        if self.save_columnar:
+            steps.append(('columnas', lambda: SessionColumns.load_columns(folder, convert=True)))
+        steps.append(('piramide', lambda: SessionPyramid.build(folder)))
+        steps.append(('consolidado', lambda: self._agregar_a_csv_consolidado(result['summary'], folder)))
+        steps.append(('catalogo', lambda: SessionCatalog().index_folder(folder)))
+        if finalizer is None:
+            for _, step in steps:
+                step()
+            return result['summary']
+        finalizer.submit(steps, on_progress, on_done, key=folder)
+    
+    def _agregar_a_csv_consolidado(self, summary, folder):
         """Agrega una fila al CSV consolidado con todos los datos de la sesión"""
         csv_consolidado = os.path.join('sessions', 'todas_las_sesiones.csv')
         
@@ -381,29 +839,17 @@ class BioSensorSystem:
             
             # Escribir headers solo si el archivo no existe
             if not file_exists:
-                headers = [
-                    'fecha_hora', 'carpeta_sesion',
-                    'edad', 'sexo',
-                    'hamilton_q1', 'hamilton_q2', 'hamilton_q3', 'hamilton_q4',
-                    'hamilton_q5', 'hamilton_q6', 'hamilton_q7',
-                    'hamilton_psiquica', 'hamilton_somatica', 'hamilton_total',
-                    'baseline_ecg_voltaje', 'baseline_temperatura_celsius',
-                    'ecg_promedio', 'ecg_minimo', 'ecg_maximo', 'ecg_desviacion',
-                    'temp_promedio', 'temp_minimo', 'temp_maximo', 'temp_desviacion',
-                    'bpm_promedio', 'bpm_minimo', 'bpm_maximo', 'bpm_desviacion',
-                    'duracion_segundos', 'puntos_datos'
-                ]
-                writer.writerow(headers)
+                writer.writerow(CONSOLIDATED_COLUMNS)
             
             # Extraer datos del hamilton_pre.json
-            hamilton_file = os.path.join(self.session_folder, 'hamilton_pre.json')
+            hamilton_file = os.path.join(folder, 'hamilton_pre.json')
             with open(hamilton_file, 'r', encoding='utf-8') as hf:
                 hamilton_data = json.load(hf)
             
             # Preparar fila de datos
             fila = [
                 datetime.now().strftime('%Y%m%d_%H%M%S'),
-                os.path.basename(self.session_folder),
+                os.path.basename(folder),
                 hamilton_data['demographics']['edad'],
                 hamilton_data['demographics']['sexo'],
                 hamilton_data['responses']['q1'],
@@ -440,10 +886,15 @@ class BioSensorSystem:
     
     def disconnect(self):
         """Desconecta del Arduino"""
+        if self.session_writer:
+            self.session_writer.close()
+            self.session_writer = None
+        
         if self.serial_connection:
             self.serial_connection.close()
         self.connected = False
         
         # Limpiar ventanas
-        self.ecg_window = []
-        self.bpm_history = []
\ No newline at end of file
+        self.peak_detector.reset()
+        self.hrv.reset()
+        self.bpm_history.clear()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+POLICIES = ('drop', 'coalesce', 'disconnect')
+
+
+class _Subscriber:
+    def __init__(self, sid, topic, policy):
+        self.sid = sid
+        self.topic = topic
+        self.policy = policy
+        # 'coalesce' guarda solo el último mensaje de cada evento
+        self.outbox = OrderedDict() if policy == 'coalesce' else deque()
+        self.in_flight = deque()     # Momento de envío de cada mensaje sin confirmar
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+
+class BroadcastHub:
+    """Difusión a observadores con un único serializado por mensaje
+
+    `publish(tema, evento, datos)` serializa los datos una sola vez (los
+    bytes se envían tal cual; el resto como JSON en UTF-8) y deja la misma
+    trama en la cola de cada suscriptor del tema. Un hilo envía las tramas
+    con confirmación (ack) y cada cliente puede tener a lo sumo
+    `max_in_flight` sin confirmar; lo que no cabe espera en una cola de
+    hasta `max_queue` tramas. Si el cliente no da abasto se aplica su
+    política: 'drop' descarta las tramas nuevas, 'coalesce' conserva solo la
+    más reciente de cada evento y 'disconnect' lo desconecta. Así la memoria
+    por cliente está acotada y un observador lento no frena la adquisición.
+    """
+
+    def __init__(self, send, disconnect, max_in_flight=4, max_queue=32, ack_timeout=5.0):
+        self.send = send                  # send(sid, evento, trama, callback)
+        self.disconnect = disconnect      # disconnect(sid)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.ack_timeout = ack_timeout
+
+        self._subscribers = {}            # (sid, tema) -> _Subscriber
+        self._lock = threading.Condition()
+        self._thread = None
+        self._stop = False
+
+    @staticmethod
+    def serialize(data):
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def subscribe(self, sid, topic, policy='coalesce'):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconocida: {policy}")
+        with self._lock:
+            self._subscribers[(sid, topic)] = _Subscriber(sid, topic, policy)
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name='broadcast-hub')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def unsubscribe(self, sid, topic=None):
+        """Quita las suscripciones del cliente (todas si no se indica tema)"""
+        with self._lock:
+            for key in [key for key in self._subscribers if key[0] == sid and topic in (None, key[1])]:
+                del self._subscribers[key]
+
+    def observers(self, topic):
+        with self._lock:
+            return sum(1 for key in self._subscribers if key[1] == topic)
+
+    def publish(self, topic, event, data):
+        with self._lock:
+            subscribers = [sub for key, sub in self._subscribers.items() if key[1] == topic]
+            if not subscribers:
+                return
+            frame = self.serialize(data)   # Una vez, para todos los suscriptores
+
+            to_disconnect = []
+            for sub in subscribers:
+                if sub.policy == 'coalesce':
+                    if event in sub.outbox:
+                        sub.coalesced += 1
+                        del sub.outbox[event]   # El evento pasa al final con la trama nueva
+                    sub.outbox[event] = frame
+                elif len(sub.outbox) < self.max_queue:
+                    sub.outbox.append((event, frame))
+                elif sub.policy == 'drop':
+                    sub.dropped += 1
+                else:
+                    to_disconnect.append(sub)
+
+            for sub in to_disconnect:
+                del self._subscribers[(sub.sid, sub.topic)]
+            self._lock.notify()
+
+        for sub in to_disconnect:
+            print(f"⚠️ Observador {sub.sid} desconectado: no consume a tiempo")
+            self.disconnect(sub.sid)
+
+    def _next_frames(self):
+        """Tramas que se pueden enviar ya (respetando max_in_flight)"""
+        now = time.monotonic()
+        ready = []
+        for sub in self._subscribers.values():
+            # Un ack que no llega no bloquea al cliente para siempre
+            while sub.in_flight and now - sub.in_flight[0] > self.ack_timeout:
+                sub.in_flight.popleft()
+            while sub.outbox and len(sub.in_flight) < self.max_in_flight:
+                if sub.policy == 'coalesce':
+                    event, frame = sub.outbox.popitem(last=False)
+                else:
+                    event, frame = sub.outbox.popleft()
+                sub.in_flight.append(now)
+                sub.sent += 1
+                ready.append((sub, event, frame))
+        return ready
+
+    def _acknowledge(self, sub):
+        with self._lock:
+            if sub.in_flight:
+                sub.in_flight.popleft()
+            self._lock.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                ready = self._next_frames()
+                while not ready and not self._stop:
+                    self._lock.wait(timeout=self.ack_timeout)
+                    ready = self._next_frames()
+                if self._stop:
+                    return
+
+            for sub, event, frame in ready:
+                try:
+                    self.send(sub.sid, event, frame, lambda *args, sub=sub: self._acknowledge(sub))
+                except Exception as e:
+                    print(f"Error enviando a observador {sub.sid}: {e}")
+
+    def stop(self):
+        with self._lock:
+            self._stop = True
+            self._lock.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def stats(self, topic=None):
+        with self._lock:
+            return [{
+                'sid': sub.sid,
+                'tema': sub.topic,
+                'politica': sub.policy,
+                'enviados': sub.sent,
+                'descartados': sub.dropped,
+                'combinados': sub.coalesced,
+                'en_cola': len(sub.outbox),
+                'sin_confirmar': len(sub.in_flight)
+            } for sub in self._subscribers.values() if topic in (None, sub.topic)]
@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from FileHash import hashed_state
+from SessionColumns import SessionColumns
+
+
+CONSOLIDATED_NAME = 'todas_las_sesiones.csv'
+CACHE_NAME = 'todas_las_sesiones.cache.json'
+
+# Columnas de todas_las_sesiones.csv (una fila por sesión)
+CONSOLIDATED_COLUMNS = [
+    'fecha_hora', 'carpeta_sesion',
+    'edad', 'sexo',
+    'hamilton_q1', 'hamilton_q2', 'hamilton_q3', 'hamilton_q4',
+    'hamilton_q5', 'hamilton_q6', 'hamilton_q7',
+    'hamilton_psiquica', 'hamilton_somatica', 'hamilton_total',
+    'baseline_ecg_voltaje', 'baseline_temperatura_celsius',
+    'ecg_promedio', 'ecg_minimo', 'ecg_maximo', 'ecg_desviacion',
+    'temp_promedio', 'temp_minimo', 'temp_maximo', 'temp_desviacion',
+    'bpm_promedio', 'bpm_minimo', 'bpm_maximo', 'bpm_desviacion',
+    'duracion_segundos', 'puntos_datos'
+]
+
+# Archivos de los que sale la fila de una sesión (metadatos.json es opcional;
+# resumen_sesion.json aporta el baseline y la frecuencia cuando faltan los metadatos)
+INPUT_FILES = ('datos_sensores.csv', 'hamilton_pre.json', 'metadatos.json', 'resumen_sesion.json')
+
+
+def _unchanged(state, cached):
+    """Mismas entradas con el mismo contenido (un mtime distinto no basta para recalcular)"""
+    return ({name: entry['sha256'] for name, entry in state.items()}
+            == {name: entry['sha256'] for name, entry in cached.items()})
+
+
+def input_state(folder, cached=None):
+    """mtime, tamaño y hash de las entradas; el hash se reutiliza si mtime y tamaño no cambiaron"""
+    state = {}
+    for name in INPUT_FILES:
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            continue
+        state[name] = hashed_state(path, (cached or {}).get(name))
+    return state
+
+
+def _channel_stats(values):
+    return [float(values.mean()), values.min().item(), values.max().item(), float(values.std())]
+
+
+def device_duration(device_time, sample_rate):
+    """Duración según el reloj del dispositivo, sumando los tramos de una sesión reanudada
+
+    Al reanudar, el reloj del Arduino puede reiniciarse: cada retroceso
+    empieza un tramo nuevo, igual que en la sesión en vivo.
+    """
+    device_time = np.asarray(device_time)
+    if len(device_time) == 0:
+        return 0.0
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(device_time) < 0) + 1))
+    ends = np.concatenate((starts[1:] - 1, [len(device_time) - 1]))
+    return float((device_time[ends] - device_time[starts]).sum()) + len(starts) / sample_rate
+
+
+def summarize_folder(folder):
+    """Recalcula la fila de una sesión desde datos_sensores.csv y hamilton_pre.json
+
+    Se ejecuta en los procesos del pool. El baseline sale de metadatos.json
+    o del resumen; en las sesiones que no lo guardaron se despeja de las
+    columnas de cambio (ecg_change_percent y temp_change_celsius).
+    """
+    with open(os.path.join(folder, 'hamilton_pre.json'), encoding='utf-8') as f:
+        hamilton = json.load(f)
+    metadata, summary = {}, {}
+    has_metadata = os.path.exists(os.path.join(folder, 'metadatos.json'))
+    if has_metadata:
+        with open(os.path.join(folder, 'metadatos.json'), encoding='utf-8') as f:
+            metadata = json.load(f)
+    summary_path = os.path.join(folder, 'resumen_sesion.json')
+    if os.path.exists(summary_path):
+        with open(summary_path, encoding='utf-8') as f:
+            summary = json.load(f)
+    metadata = {**summary, **metadata}
+
+    columns = SessionColumns.load_columns(folder)
+    points = len(columns['timestamp'])
+    sample_rate = metadata.get('frecuencia_muestreo_hz', 10)
+
+    baseline = metadata.get('baseline') or {}
+    baseline_ecg = baseline.get('ecg_voltaje')
+    baseline_temp = baseline.get('temperatura_celsius')
+    if baseline_ecg is None and points:
+        # ecg_change_percent = (v - b) / b * 100  →  b = v / (1 + cambio / 100)
+        ratio = 1 + np.asarray(columns['ecg_change_percent']) / 100
+        valid = ratio != 0
+        if valid.any():
+            baseline_ecg = float(np.median(np.asarray(columns['ecg_voltage'])[valid] / ratio[valid]))
+    if baseline_temp is None and points:
+        baseline_temp = float(np.median(np.asarray(columns['temperature']) - columns['temp_change_celsius']))
+
+    # Duración como en la sesión en vivo: la del resumen o, si falta, el reloj
+    # del dispositivo por tramos. Las sesiones sin metadatos.json son
+    # anteriores a device_time: puntos / Hz
+    if summary.get('duracion_segundos') is not None:
+        duration = summary['duracion_segundos']
+    elif points and has_metadata:
+        duration = device_duration(columns['device_time'], sample_rate)
+    else:
+        duration = points / sample_rate
+
+    name = os.path.basename(os.path.normpath(folder))
+    row = [
+        name[:15],   # Fecha de la carpeta; se conserva la de la fila anterior si existía
+        name,
+        hamilton['demographics']['edad'],
+        hamilton['demographics']['sexo'],
+        *[hamilton['responses'][f'q{i}'] for i in range(1, 8)],
+        hamilton['puntuaciones']['psiquica'],
+        hamilton['puntuaciones']['somatica'],
+        hamilton['puntuaciones']['total'],
+        baseline_ecg,
+        baseline_temp,
+    ]
+    for channel in ('ecg_voltage', 'temperature', 'bpm'):
+        row += _channel_stats(np.asarray(columns[channel])) if points else [None] * 4
+    row += [duration, points]
+    return row
+
+
+def _summarize(job):
+    folder, cached = job
+    try:
+        state = input_state(folder, cached)
+        return folder, state, summarize_folder(folder), None
+    except Exception as e:   # Una carpeta dañada no frena la reconstrucción
+        return folder, None, None, str(e)
+
+
+def rebuild(root='sessions', workers=None, force=False):
+    """Regenera todas_las_sesiones.csv a partir de las carpetas de sesión
+
+    Solo se recalculan (en un pool de procesos) las sesiones cuyas entradas
+    cambiaron desde la corrida anterior, según mtime y tamaño y, si estos
+    cambiaron, según su SHA-256. Si una carpeta no se puede leer se avisa y
+    se conserva su última fila válida. El CSV se reemplaza de forma atómica.
+    Devuelve (sesiones, recalculadas).
+    """
+    cache_path = os.path.join(root, CACHE_NAME)
+    csv_path = os.path.join(root, CONSOLIDATED_NAME)
+    cache = {}
+    if os.path.exists(cache_path) and not force:
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+
+    # Fecha de las filas ya existentes (momento en que se agregó la sesión)
+    dates = {}
+    if os.path.exists(csv_path):
+        with open(csv_path, newline='', encoding='utf-8-sig') as f:
+            dates = {row['carpeta_sesion']: row['fecha_hora'] for row in csv.DictReader(f)}
+
+    # Solo sesiones terminadas: una en curso (o interrumpida) aún no tiene resumen
+    folders = [os.path.join(root, name) for name in sorted(os.listdir(root))
+               if all(os.path.exists(os.path.join(root, name, file))
+                      for file in ('datos_sensores.csv', 'hamilton_pre.json', 'resumen_sesion.json'))]
+
+    rows, pending = {}, []
+    for folder in folders:
+        name = os.path.basename(folder)
+        entry = cache.get(name)
+        state = input_state(folder, entry['entradas']) if entry else None
+        if entry and _unchanged(state, entry['entradas']):
+            rows[name] = entry['fila']
+            entry['entradas'] = state   # mtime al día: la próxima vez no se vuelve a hashear
+        else:
+            pending.append((folder, entry['entradas'] if entry else None))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for folder, state, row, error in pool.map(_summarize, pending, chunksize=4):
+                name = os.path.basename(folder)
+                if error:
+                    # Se mantiene la última fila válida (y se reintenta en la próxima corrida)
+                    previous = cache.get(name)
+                    if previous:
+                        rows[name] = previous['fila']
+                    print(f"✗ {name}: {error} ({'se mantiene la fila anterior' if previous else 'se omite'})")
+                    continue
+                rows[name] = row
+                cache[name] = {'entradas': state, 'fila': row}
+
+    temporary = csv_path + '.tmp'
+    with open(temporary, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(CONSOLIDATED_COLUMNS)
+        for name in sorted(rows):
+            row = list(rows[name])
+            row[0] = dates.get(name, row[0])
+            writer.writerow(row)
+    os.replace(temporary, csv_path)
+
+    present = {os.path.basename(folder) for folder in folders}
+    cache = {name: entry for name, entry in cache.items() if name in present}
+    with open(cache_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(cache_path + '.tmp', cache_path)
+    return len(rows), len(pending)
+
+
+if __name__ == '__main__':
+    # Regenera el CSV consolidado:  python ConsolidatedDataset.py [carpeta_sessions] [--force]
+    arguments = [arg for arg in sys.argv[1:] if arg != '--force']
+    total, recomputed = rebuild(arguments[0] if arguments else 'sessions', force='--force' in sys.argv)
+    print(f"✓ {CONSOLIDATED_NAME}: {total} sesiones ({recomputed} recalculadas)")
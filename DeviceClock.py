@@ -0,0 +1,112 @@
+import numpy as np
+
+
+class DeviceClock:
+    """Base de tiempo a partir del reloj del Arduino (`relativeTime` en ms)
+
+    Cada muestra trae el tiempo del dispositivo; la hora del host solo se usa
+    para estimar el desfase entre ambos relojes. El desfase se sigue con el
+    mínimo de `host - dispositivo` (la muestra que llegó con menor retraso),
+    dejándolo subir lentamente para acompañar la deriva entre relojes. Así la
+    marca de tiempo de cada muestra no hereda el jitter del puerto serie ni el
+    de la planificación del hilo que la lee.
+
+    Los saltos en el tiempo del dispositivo mayores que `gap_factor` periodos
+    se registran como huecos y las muestras que faltan se cuentan como
+    perdidas. Un tiempo que retrocede indica que el Arduino se reinició: se
+    vuelve a anclar el desfase.
+    """
+
+    def __init__(self, sample_rate=10, gap_factor=1.5, drift_rate=1e-3, max_gaps=1000):
+        self.sample_rate = sample_rate
+        self.period = 1.0 / sample_rate
+        self.gap_factor = gap_factor
+        self.drift_rate = drift_rate      # Fracción del exceso de desfase absorbida por muestra
+        self.max_gaps = max_gaps
+
+        self.offset = None                # host - dispositivo (s)
+        self.last_device_time = None      # s
+        self.samples = 0
+        self.dropped_samples = 0
+        self.resets = 0
+        self.gaps = []                    # [{'inicio', 'duracion', 'muestras'}]
+
+    def update(self, device_ms, host_time):
+        """Registra una muestra; devuelve (marca de tiempo en el reloj del host, tiempo del dispositivo en s)"""
+        timestamps, device_times = self.update_batch(np.array([device_ms], dtype=np.float64), host_time)
+        return float(timestamps[0]), float(device_times[0])
+
+    def update_batch(self, device_ms, host_time):
+        """Registra un lote de muestras leídas juntas en `host_time`
+
+        Devuelve (marcas de tiempo en el reloj del host, tiempos del
+        dispositivo en s), ambos como arreglos.
+        """
+        device_times = np.asarray(device_ms, dtype=np.float64) / 1000.0
+        if len(device_times) == 0:
+            return device_times, device_times
+
+        previous = self.last_device_time
+        if previous is not None and device_times[0] < previous:
+            # El Arduino se reinició: el reloj del dispositivo volvió a empezar
+            self.resets += 1
+            self.offset = None
+            previous = None
+
+        steps = np.diff(device_times, prepend=device_times[0] if previous is None else previous)
+        self._count_gaps(device_times, steps)
+
+        # La última muestra del lote es la que acaba de llegar: acota el desfase
+        observed = float(host_time - device_times[-1])
+        if self.offset is None or observed < self.offset:
+            self.offset = observed
+        else:
+            self.offset += (observed - self.offset) * min(1.0, self.drift_rate * len(device_times))
+
+        self.last_device_time = float(device_times[-1])
+        self.samples += len(device_times)
+        return device_times + self.offset, device_times
+
+    def _count_gaps(self, device_times, steps):
+        gap_index = np.flatnonzero(steps > self.gap_factor * self.period)
+        if len(gap_index) == 0:
+            return
+        missing = np.rint(steps[gap_index] / self.period).astype(np.int64) - 1
+        self.dropped_samples += int(missing.sum())
+        for index, count in zip(gap_index.tolist(), missing.tolist()):
+            if len(self.gaps) >= self.max_gaps:
+                break
+            duration = float(steps[index])
+            self.gaps.append({
+                'inicio': float(device_times[index]) - duration,
+                'duracion': duration,
+                'muestras': count
+            })
+
+    @staticmethod
+    def gap_summary(device_times, period, gap_factor=1.5):
+        """Huecos en una secuencia de tiempos del dispositivo (s), vectorizado"""
+        steps = np.diff(device_times)
+        gaps = steps[steps > gap_factor * period]
+        return {
+            'cantidad': int(len(gaps)),
+            'muestras_perdidas': int((np.rint(gaps / period) - 1).sum()),
+            'duracion_total_segundos': float(gaps.sum())
+        }
+
+    def reset(self):
+        self.offset = None
+        self.last_device_time = None
+        self.samples = 0
+        self.dropped_samples = 0
+        self.resets = 0
+        self.gaps = []
+
+    def stats(self):
+        return {
+            'muestras': self.samples,
+            'muestras_perdidas': self.dropped_samples,
+            'huecos': len(self.gaps),
+            'reinicios': self.resets,
+            'desfase_ms': None if self.offset is None else self.offset * 1000
+        }
@@ -0,0 +1,86 @@
+import numpy as np
+
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x, y, max_points):
+    """Índices elegidos por Largest-Triangle-Three-Buckets
+
+    Conserva el primer y el último punto y, de cada bucket intermedio, el que
+    forma el triángulo de mayor área con el punto elegido antes y el promedio
+    del bucket siguiente. A diferencia de un paso fijo, no se pierden los
+    picos R ni los extremos de temperatura.
+    """
+    n = len(y)
+    max_points = max(3, int(max_points))
+    if n <= max_points:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64) - x[0]   # Timestamps Unix: se evita perder precisión
+    y = np.asarray(y, dtype=np.float64)
+
+    # Buckets sobre los puntos 1..n-2; n > max_points garantiza que ninguno queda vacío
+    edges = np.floor(np.linspace(1, n - 1, max_points - 1)).astype(np.int64)
+    sizes = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[:edges[-1]], edges[:-1]) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:edges[-1]], edges[:-1]) / sizes, y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, max_points):
+    """Índices del mínimo y el máximo de cada bucket (más el primero y el último)"""
+    n = len(y)
+    buckets = max(1, int(max_points) // 2 - 1)
+    if n <= max_points:
+        return np.arange(n)
+
+    edges = np.floor(np.linspace(0, n, buckets + 1)).astype(np.int64)
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    # Ordenado por bucket y luego por valor: el primero de cada bucket es su mínimo
+    order = np.lexsort((y, bucket))
+    return np.unique(np.concatenate(([0, n - 1], order[edges[:-1]], order[edges[1:] - 1])))
+
+
+def downsample(columns, max_points, channels, x_name='timestamp', method='lttb'):
+    """Columnas reducidas a ~max_points filas que conservan la forma de cada canal
+
+    Cada canal elige sus puntos con su parte del presupuesto y se devuelve la
+    unión de los índices, así todas las columnas comparten el eje x.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de diezmado desconocido: {method}")
+    x = columns[x_name]
+    budget = max(3, int(max_points) // max(1, len(channels)))
+
+    if len(x) <= max_points:
+        indices = np.arange(len(x))
+    elif method == 'lttb':
+        indices = np.unique(np.concatenate([lttb_indices(x, columns[name], budget) for name in channels]))
+    else:
+        indices = np.unique(np.concatenate([minmax_indices(columns[name], budget) for name in channels]))
+    return {name: column[indices] for name, column in columns.items()}
+
+
+def query_range(columns, start=None, end=None, max_points=1000, channels=None,
+                x_name='timestamp', method='lttb'):
+    """Rango [start, end] de x reducido a la resolución pedida
+
+    Devuelve (columnas reducidas, puntos que había en el rango).
+    """
+    x = columns[x_name]
+    lo = 0 if start is None else int(np.searchsorted(x, start, side='left'))
+    hi = len(x) if end is None else int(np.searchsorted(x, end, side='right'))
+    channels = [name for name in columns if name != x_name] if channels is None else channels
+    window = {name: columns[name][lo:hi] for name in [x_name] + list(channels)}
+    return downsample(window, max_points, channels, x_name, method), hi - lo
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from FileHash import hashed_state
+
+
+CACHE_DIR = 'cache_caracteristicas'
+HASHES_NAME = 'hashes.json'
+
+
+class FeatureCache:
+    """Caché en disco de características por sesión, direccionada por contenido
+
+    La clave de una entrada es el hash de los archivos de entrada de la
+    sesión junto con el nombre y la versión del extractor: si cambian los
+    datos o el código que calcula las características (se sube la versión),
+    la clave cambia y se recalcula. Los hashes de archivo se recuerdan por
+    ruta, mtime y tamaño, así una sesión sin cambios no se vuelve a leer.
+    Cuando el total supera `max_bytes` se borran las entradas usadas hace
+    más tiempo (LRU según el mtime, que se actualiza en cada acierto).
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._hashes_path = os.path.join(directory, HASHES_NAME)
+        self._hashes = {}
+        if os.path.exists(self._hashes_path):
+            with open(self._hashes_path, encoding='utf-8') as f:
+                self._hashes = json.load(f)
+
+    def file_hash(self, path):
+        """SHA-256 del archivo, recalculado solo si cambió su mtime o su tamaño"""
+        self._hashes[path] = hashed_state(path, self._hashes.get(path))
+        return self._hashes[path]['sha256']
+
+    def key(self, folder, inputs, extractor, version):
+        """Clave de las características `extractor` (versión `version`) de una sesión"""
+        digest = hashlib.sha256(f'{extractor}:{version}'.encode('utf-8'))
+        for name in inputs:
+            path = os.path.join(folder, name)
+            digest.update(f'|{name}:'.encode('utf-8'))
+            if os.path.exists(path):   # Una entrada opcional ausente también forma parte de la clave
+                digest.update(self.file_hash(path).encode('ascii'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)   # Marca de uso reciente para el LRU
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def evict(self):
+        """Borra las entradas menos usadas hasta quedar bajo max_bytes; devuelve cuántas"""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.json') and name != HASHES_NAME:
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def save(self):
+        """Guarda los hashes conocidos (olvida las rutas que ya no existen)"""
+        self._hashes = {path: known for path, known in self._hashes.items() if os.path.exists(path)}
+        with open(self._hashes_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self._hashes, f, ensure_ascii=False)
+        os.replace(self._hashes_path + '.tmp', self._hashes_path)
+
+    def map(self, function, folders, inputs, extractor, version, workers=None):
+        """function(carpeta) para cada sesión, calculando en paralelo solo las que faltan
+
+        `function` debe ser serializable (definida a nivel de módulo) y
+        devolver algo que se pueda guardar como JSON; si devuelve None no se
+        guarda (p. ej. una sesión que no se pudo leer). Devuelve los
+        resultados en el orden de `folders`.
+        """
+        keys = [self.key(folder, inputs, extractor, version) for folder in folders]
+        results = [self.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunk = max(1, len(missing) // ((workers or os.cpu_count()) * 4))
+                computed = pool.map(function, [folders[i] for i in missing], chunksize=chunk)
+                for i, result in zip(missing, computed):
+                    results[i] = result
+                    if result is not None:
+                        self.put(keys[i], result)
+
+        self.save()
+        self.evict()
+        return results
+
+    def stats(self):
+        return {'aciertos': self.hits, 'fallos': self.misses}
@@ -0,0 +1,30 @@
+import hashlib
+import os
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 del archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_state(path):
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'bytes': stat.st_size}
+
+
+def hashed_state(path, previous=None):
+    """mtime, tamaño y SHA-256 del archivo
+
+    Si `previous` (un estado anterior del mismo archivo) tiene el mismo
+    mtime y tamaño, se reutiliza su hash sin volver a leer el archivo.
+    """
+    current = file_state(path)
+    if previous and all(previous.get(key) == current[key] for key in current):
+        current['sha256'] = previous['sha256']
+    else:
+        current['sha256'] = file_sha256(path)
+    return current
@@ -0,0 +1,298 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from scipy.signal import welch
+
+from RunningStats import RunningStats
+
+
+# Bandas de frecuencia de la VFC (Hz), Task Force 1996
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+
+
+class HRVTotals:
+    """Acumuladores de VFC de un tramo completo (sesión o fase) en O(1) por latido"""
+
+    __slots__ = ('rr', 'diff_count', 'diff_sq_sum', 'nn50', 'artifacts')
+
+    def __init__(self):
+        self.rr = RunningStats()   # Intervalos RR en ms
+        self.diff_count = 0        # Diferencias sucesivas (pares de latidos válidos consecutivos)
+        self.diff_sq_sum = 0.0
+        self.nn50 = 0              # |ΔRR| > 50 ms
+        self.artifacts = 0         # Intervalos descartados por fuera de rango
+
+    def update(self, rr_ms, diff_ms):
+        self.rr.update(rr_ms)
+        if diff_ms is not None:
+            self.diff_count += 1
+            self.diff_sq_sum += diff_ms * diff_ms
+            self.nn50 += int(abs(diff_ms) > 50)
+
+    def summary(self):
+        if self.rr.count == 0:
+            return None
+        return {
+            'latidos': self.rr.count,
+            'rr_promedio_ms': self.rr.mean,
+            'sdnn_ms': self.rr.std,
+            'rmssd_ms': (self.diff_sq_sum / self.diff_count) ** 0.5 if self.diff_count else None,
+            'pnn50': 100.0 * self.nn50 / self.diff_count if self.diff_count else None,
+            'artefactos': self.artifacts
+        }
+
+    def to_dict(self):
+        return {'rr': self.rr.to_dict(), 'diff_count': self.diff_count, 'diff_sq_sum': self.diff_sq_sum,
+                'nn50': self.nn50, 'artifacts': self.artifacts}
+
+    @classmethod
+    def from_dict(cls, state):
+        totals = cls()
+        totals.rr = RunningStats.from_dict(state['rr'])
+        totals.diff_count = state['diff_count']
+        totals.diff_sq_sum = state['diff_sq_sum']
+        totals.nn50 = state['nn50']
+        totals.artifacts = state['artifacts']
+        return totals
+
+
+class StreamingHRV:
+    """Variabilidad de la frecuencia cardíaca a partir de los eventos de pico R
+
+    Se registra como listener del `StreamingPeakDetector` y recibe cada
+    intervalo RR. En el dominio del tiempo mantiene SDNN, RMSSD y pNN50
+    sobre una ventana deslizante de `window_seconds` con sumas acumuladas
+    (O(1) por latido: entra un latido, salen los que quedaron fuera). LF,
+    HF y LF/HF salen de Welch sobre el tacograma remuestreado a
+    `resample_hz` en los últimos `spectral_seconds`; como es lo costoso, se
+    recalcula como mucho una vez cada `refresh_seconds` y entre medio se
+    devuelve el último valor.
+
+    Durante una sesión (`begin`/`end`) acumula además los totales de la
+    sesión y de cada fase para resumen_sesion.json. Los eventos llegan desde
+    el hilo de adquisición y las métricas se leen desde el de streaming:
+    todo pasa por un lock.
+    """
+
+    def __init__(self, window_seconds=60.0, spectral_seconds=120.0, refresh_seconds=5.0,
+                 resample_hz=4.0, min_rr=0.3, max_rr=2.0):
+        self.window_seconds = window_seconds
+        self.spectral_seconds = spectral_seconds
+        self.refresh_seconds = refresh_seconds
+        self.resample_hz = resample_hz
+        self.min_rr = min_rr   # s; 200 lpm
+        self.max_rr = max_rr   # s; 30 lpm
+        self._lock = threading.Lock()
+        self.recording = False
+        self.phase = None
+        self.totals = HRVTotals()
+        self.phases = {}
+        self.reset()
+
+    def reset(self):
+        """Vacía las ventanas (p. ej. si el detector se reinició); no toca los totales"""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._window = deque()      # (tiempo, rr_ms, diferencia con el anterior o None)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._diff_count = 0
+        self._diff_sq_sum = 0.0
+        self._nn50 = 0
+        self._tachogram = deque()   # (tiempo, rr_ms) de la ventana espectral
+        self._last_rr = None        # Último RR válido (None tras un artefacto o un hueco)
+        self._last_time = None
+        self._spectral = None
+        self._spectral_at = None
+
+    # ----- sesión -----
+
+    def begin(self, phase=None, state=None):
+        """Empieza a acumular totales (desde cero o desde un checkpoint)"""
+        with self._lock:
+            self.recording = True
+            self.phase = phase
+            self.totals = HRVTotals.from_dict(state['total']) if state else HRVTotals()
+            self.phases = ({name: HRVTotals.from_dict(values) for name, values in state['fases'].items()}
+                           if state else {})
+
+    def end(self):
+        with self._lock:
+            self.recording = False
+
+    def set_phase(self, phase):
+        with self._lock:
+            self.phase = phase
+
+    def to_dict(self):
+        """Totales de la sesión, para el checkpoint del WAL"""
+        return self.session_state()()
+
+    def session_state(self):
+        """Función que devuelve los totales de la sesión en curso, ligada a ella
+
+        `begin` crea acumuladores nuevos para la sesión siguiente, así que el
+        escritor de una sesión detenida sigue leyendo los suyos aunque otra
+        ya haya empezado.
+        """
+        totals, phases = self.totals, self.phases
+
+        def state():
+            with self._lock:
+                return {'total': totals.to_dict(),
+                        'fases': {name: values.to_dict() for name, values in phases.items()}}
+        return state
+
+    @staticmethod
+    def summary_from_dict(state):
+        """Resumen de VFC a partir de los totales guardados en un checkpoint"""
+        summary = HRVTotals.from_dict(state['total']).summary() if state else None
+        if summary is None:   # Sin latidos válidos en la sesión
+            return None
+        summary['fases'] = {name: HRVTotals.from_dict(values).summary()
+                            for name, values in state['fases'].items()}
+        return summary
+
+    def summary(self):
+        """Resumen de VFC de la sesión completa y por fase (resumen_sesion.json)"""
+        return self.summary_from_dict(self.to_dict())
+
+    # ----- eventos -----
+
+    def on_peak(self, event):
+        """Listener del detector de picos: {'index', 'time', 'rr'}"""
+        if event['rr'] is None:
+            # Primer pico tras arrancar o reiniciar el detector: sin intervalo
+            with self._lock:
+                self._restart_if_rewound(event['time'])
+                self._last_rr = None
+                self._last_time = event['time']
+            return
+        self.add_rr(event['time'], event['rr'])
+
+    def _restart_if_rewound(self, t):
+        # Un tiempo menor al anterior: el detector volvió a empezar (nueva frecuencia de muestreo)
+        if self._last_time is not None and t < self._last_time:
+            self._clear()
+
+    def add_rr(self, t, rr):
+        """Agrega un intervalo RR (s) que termina en el instante `t` (s)"""
+        with self._lock:
+            self._restart_if_rewound(t)
+            self._last_time = t
+
+            if not self.min_rr <= rr <= self.max_rr:
+                # Latido perdido o falso positivo: se descarta y se corta la cadena de diferencias
+                self._last_rr = None
+                if self.recording:
+                    self.totals.artifacts += 1
+                    if self.phase is not None:
+                        self._phase_totals().artifacts += 1
+                return
+
+            rr_ms = rr * 1000.0
+            diff = rr_ms - self._last_rr if self._last_rr is not None else None
+            self._last_rr = rr_ms
+
+            # Ventana del dominio del tiempo
+            self._window.append((t, rr_ms, diff))
+            self._sum += rr_ms
+            self._sum_sq += rr_ms * rr_ms
+            if diff is not None:
+                self._add_diff(diff, 1)
+            while self._window and self._window[0][0] <= t - self.window_seconds:
+                _, old_rr, _ = self._window.popleft()
+                self._sum -= old_rr
+                self._sum_sq -= old_rr * old_rr
+                if self._window:
+                    # La diferencia del nuevo primero apuntaba al latido que salió
+                    first_t, first_rr, first_diff = self._window[0]
+                    if first_diff is not None:
+                        self._add_diff(first_diff, -1)
+                        self._window[0] = (first_t, first_rr, None)
+
+            # Tacograma para el dominio de la frecuencia
+            self._tachogram.append((t, rr_ms))
+            while self._tachogram and self._tachogram[0][0] <= t - self.spectral_seconds:
+                self._tachogram.popleft()
+
+            if self.recording:
+                self.totals.update(rr_ms, diff)
+                if self.phase is not None:
+                    self._phase_totals().update(rr_ms, diff)
+
+    def _phase_totals(self):
+        totals = self.phases.get(self.phase)
+        if totals is None:
+            totals = self.phases[self.phase] = HRVTotals()
+        return totals
+
+    def _add_diff(self, diff, sign):
+        self._diff_count += sign
+        self._diff_sq_sum += sign * diff * diff
+        self._nn50 += sign * int(abs(diff) > 50)
+
+    # ----- métricas -----
+
+    def time_domain(self):
+        """SDNN, RMSSD y pNN50 de la ventana deslizante (O(1)); None sin latidos suficientes"""
+        with self._lock:
+            n = len(self._window)
+            if n < 2:
+                return None
+            mean = self._sum / n
+            variance = max(self._sum_sq / n - mean * mean, 0.0)
+            return {
+                'latidos': n,
+                'rr_promedio_ms': mean,
+                'sdnn_ms': variance ** 0.5,
+                'rmssd_ms': (max(self._diff_sq_sum, 0.0) / self._diff_count) ** 0.5 if self._diff_count else None,
+                'pnn50': 100.0 * self._nn50 / self._diff_count if self._diff_count else None
+            }
+
+    def frequency_domain(self):
+        """LF, HF (ms²) y LF/HF del tacograma; se recalcula como mucho cada refresh_seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._spectral_at is not None and now - self._spectral_at < self.refresh_seconds:
+                return self._spectral
+            beats = np.array(self._tachogram, dtype=np.float64).reshape(-1, 2)
+            self._spectral_at = now
+
+        # Fuera del lock: los eventos de pico no esperan a Welch
+        spectral = self._welch(beats[:, 0], beats[:, 1])
+        with self._lock:
+            self._spectral = spectral
+        return spectral
+
+    def _welch(self, times, rr_ms):
+        # Al menos dos ciclos de la frecuencia más baja de LF (0.04 Hz → 50 s)
+        if len(times) < 4 or times[-1] - times[0] < 2 / LF_BAND[0]:
+            return None
+        grid = np.arange(times[0], times[-1], 1.0 / self.resample_hz)
+        tachogram = np.interp(grid, times, rr_ms)
+        # Segmentos de ~64 s: resolución de 1/64 Hz, suficiente para separar LF de HF
+        frequencies, power = welch(tachogram, fs=self.resample_hz, detrend='linear',
+                                   nperseg=min(len(grid), int(64 * self.resample_hz)))
+        step = frequencies[1] - frequencies[0]
+        lf = float(power[(frequencies >= LF_BAND[0]) & (frequencies < LF_BAND[1])].sum() * step)
+        hf = float(power[(frequencies >= HF_BAND[0]) & (frequencies < HF_BAND[1])].sum() * step)
+        return {
+            'lf_ms2': lf,
+            'hf_ms2': hf,
+            'lf_hf': lf / hf if hf > 0 else None,
+            'segundos': float(times[-1] - times[0])
+        }
+
+    def metrics(self):
+        """Métricas en vivo (evento 'hrv_update' y resumen en vivo)"""
+        return {
+            'ventana_segundos': self.window_seconds,
+            'tiempo': self.time_domain(),
+            'frecuencia': self.frequency_domain()
+        }
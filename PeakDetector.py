@@ -0,0 +1,315 @@
+from bisect import bisect_left, insort
+from collections import deque
+
+import numpy as np
+
+from RingBuffer import RingBuffer
+
+
+# Desviación mínima de la ventana: por debajo la señal se considera plana
+MIN_STD = 0.001
+# Margen (en unidades de z) dentro del cual una comparación con un umbral se
+# rehace con la media y la desviación exactas
+TIE_MARGIN = 1e-6
+
+
+class StreamingPeakDetector:
+    """Detector incremental de picos R equivalente a `find_peaks` sobre la ventana
+
+    Tras cada muestra, `peaks` contiene exactamente los picos que daría
+    `find_peaks(z, height, distance, prominence)` con `z` la ventana
+    normalizada (z-score), pero sin recorrer la ventana entera:
+
+    - la ventana es un `RingBuffer` preasignado y la media y la desviación
+      se mantienen con sumas acumuladas. Su redondeo difiere del de
+      `np.mean`/`np.std`, lo que basta para que una muestra cuantizada justo
+      en el umbral de altura o de prominencia (o una desviación justo en
+      `MIN_STD`) cambie de lado; si alguna comparación queda a menos de
+      `TIE_MARGIN` del umbral, se repite con `np.mean`/`np.std` sobre la
+      ventana, como en la referencia;
+    - los máximos locales (con el punto medio de las mesetas, como
+      `find_peaks`) se detectan al llegar la muestra que baja y se guardan
+      ordenados por altura, así que el umbral de altura es una búsqueda
+      binaria;
+    - `distance` se aplica a los que superan la altura, del más alto al más
+      bajo, y solo se rehace cuando cambia ese conjunto;
+    - la prominencia solo se evalúa para los que quedan, a lo sumo uno cada
+      `min_distance` muestras. Las bases se mantienen por pico: la izquierda
+      es un arreglo de mínimos por sufijo calculado una vez y consultado en
+      O(1) a medida que avanza el inicio de la ventana; la derecha es un
+      mínimo acumulado que se congela al llegar una muestra más alta.
+
+    Como la media y la desviación cambian con cada muestra, los candidatos
+    se reevalúan siempre contra la ventana actual: un pico puede aparecer o
+    desaparecer igual que con `find_peaks`. En régimen, el costo por muestra
+    depende de los picos que hay en la ventana (su duración sobre
+    `min_distance`), no de cuántas muestras tiene; solo la primera vez que un
+    máximo pasa a candidato se recorre la ventana, una vez en su vida.
+
+    Los eventos de pico R (para la VFC) se emiten una sola vez, cuando el
+    pico sigue en `peaks` después de `min_distance` muestras: ya no puede
+    aparecer a su lado un pico más alto que lo descarte por distancia. Su
+    tiempo (y el RR) sale del tiempo del dispositivo de cada muestra si se
+    pasa a `update`: una trama perdida alarga el intervalo en vez de
+    acortarlo en silencio. Un tiempo que retrocede (el Arduino se reinició)
+    corta la cadena de intervalos.
+    """
+
+    def __init__(self, sample_rate=10.0, window_seconds=10.0, height=0.5,
+                 min_distance_seconds=0.6, prominence=0.3):
+        self.sample_rate = float(sample_rate)
+        self.window_size = max(1, int(round(window_seconds * self.sample_rate)))
+        self.min_distance = max(1, int(round(min_distance_seconds * self.sample_rate)))
+        self.height = height
+        self.prominence = prominence
+        self.listeners = []
+        self.window = RingBuffer(self.window_size)
+        self.times = RingBuffer(self.window_size)   # Tiempo (s) de cada muestra de la ventana
+        self.reset()
+
+    def reset(self):
+        """Reinicia el estado del detector"""
+        self.window.clear()
+        self.times.clear()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self.sample_index = -1
+        self._prev = None
+        self._plateau_start = None   # Primera muestra de una subida (posible borde izquierdo)
+        self._maxima = deque()       # (borde_izquierdo, punto_medio, valor) en orden temporal
+        self._by_height = []         # (valor, punto_medio) ordenados para el umbral de altura
+        self._distance_floor = None  # Menor (valor, punto_medio) de la última selección por distancia
+        self._distance_stale = True  # Se agregó o quitó un máximo >= _distance_floor
+        self._bases = {}             # punto_medio -> [valor, inicio, mínimos_izq, mínimo_der, congelado]
+        self._distance_peaks = None  # (posiciones, valores) tras la selección por distancia
+        self.peaks = np.empty(0, dtype=np.int64)   # Índices de los picos dentro de la ventana
+        self.flat = True             # Ventana sin variación (desviación < MIN_STD)
+        self.last_peak_index = None  # Último pico emitido como evento
+        self.last_peak_time = None
+
+    def add_listener(self, callback):
+        """Registra una función que recibe cada evento de pico R"""
+        self.listeners.append(callback)
+
+    @property
+    def mean(self):
+        n = len(self.window)
+        return self._sum / n if n else 0.0
+
+    @property
+    def std(self):
+        n = len(self.window)
+        if n == 0:
+            return 0.0
+        mean = self._sum / n
+        return max(self._sum_sq / n - mean * mean, 0.0) ** 0.5
+
+    def mean_rr(self):
+        """Intervalo RR promedio (segundos) de los picos dentro de la ventana"""
+        if len(self.peaks) < 2:
+            return None
+        # Misma cuenta que el cálculo original: promedio de los intervalos en segundos
+        return float(np.mean(np.diff(self.peaks) * (1.0 / self.sample_rate)))
+
+    def update(self, value, time=None):
+        """Procesa una muestra; devuelve el evento de pico R emitido o None
+
+        `time` es el tiempo del dispositivo de la muestra (s); sin él se usa
+        índice / frecuencia de muestreo.
+        """
+        self.sample_index += 1
+        index = self.sample_index
+        self.times.append(index / self.sample_rate if time is None else float(time))
+
+        # Actualizar estadísticas de la ventana en O(1)
+        value = float(value)
+        old = self.window.append(value)
+        if old is not None:
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._sum += value
+        self._sum_sq += value * value
+        self._extend_right_bases(value)
+
+        # ← PROTECCIÓN: recalcular las sumas una vez por ventana para evitar deriva numérica
+        if index % self.window_size == 0:
+            signal = self.window.view()
+            self._sum = float(signal.sum())
+            self._sum_sq = float(np.dot(signal, signal))
+
+        self._track_maxima(index, value)
+        self._expire(index - len(self.window) + 1)
+        self.peaks = self._select_peaks(index)
+        return self._emit(index)
+
+    def _track_maxima(self, index, value):
+        # Como find_peaks: subida estricta, meseta opcional y bajada estricta
+        prev = self._prev
+        self._prev = value
+        if prev is None:
+            return
+        if value > prev:
+            self._plateau_start = index
+        elif value < prev:
+            if self._plateau_start is not None:
+                left_edge = self._plateau_start
+                midpoint = (left_edge + index - 1) // 2
+                self._maxima.append((left_edge, midpoint, prev))
+                insort(self._by_height, (prev, midpoint))
+                self._touch((prev, midpoint))
+            self._plateau_start = None
+
+    def _touch(self, entry):
+        # Solo los cambios dentro del último conjunto seleccionado invalidan la selección
+        if self._distance_floor is None or entry >= self._distance_floor:
+            self._distance_stale = True
+
+    def _expire(self, start):
+        # Un máximo necesita la muestra anterior a su borde izquierdo dentro de la ventana
+        while self._maxima and self._maxima[0][0] <= start:
+            _, midpoint, value = self._maxima.popleft()
+            del self._by_height[bisect_left(self._by_height, (value, midpoint))]
+            self._bases.pop(midpoint, None)
+            self._touch((value, midpoint))
+        if self._plateau_start is not None and self._plateau_start <= start:
+            self._plateau_start = None
+
+    def _exact_stats(self):
+        """Media y desviación calculadas como la referencia (np.mean/np.std sobre la ventana)"""
+        signal = self.window.view()
+        return float(np.mean(signal)), float(np.std(signal))
+
+    def _select_peaks(self, index):
+        mean, std = self.mean, self.std
+        exact = abs(std - MIN_STD) <= TIE_MARGIN * MIN_STD
+        if exact:
+            mean, std = self._exact_stats()
+        peaks = self._peaks_for(index, mean, std, exact)
+        if peaks is None:
+            # Una comparación quedó en el umbral: se decide con los valores exactos
+            mean, std = self._exact_stats()
+            peaks = self._peaks_for(index, mean, std, exact=True)
+        self.flat = std < MIN_STD
+        return peaks
+
+    def _peaks_for(self, index, mean, std, exact):
+        """Picos de la ventana con esa media y desviación; None si una comparación
+        queda a menos de TIE_MARGIN de su umbral y los valores no son exactos"""
+        if std < MIN_STD or not self._by_height:
+            return np.empty(0, dtype=np.int64)
+
+        # Altura: los que pasan son un sufijo de _by_height; búsqueda binaria con un
+        # margen y luego la misma comparación sobre z que hace find_peaks
+        threshold = mean + self.height * std
+        margin = TIE_MARGIN * std
+        first = bisect_left(self._by_height, (threshold - margin - 1e-9 * abs(threshold),))
+        while first < len(self._by_height) and (self._by_height[first][0] - mean) / std < self.height:
+            if not exact and self._by_height[first][0] >= threshold - margin:
+                return None
+            first += 1
+        if first == len(self._by_height):
+            return np.empty(0, dtype=np.int64)
+        if not exact and self._by_height[first][0] <= threshold + margin:
+            return None
+
+        # El orden por altura no depende de la normalización: la selección por
+        # distancia solo cambia si cambia el conjunto que supera la altura
+        if self._distance_stale or self._by_height[first] != self._distance_floor:
+            self._distance_floor = self._by_height[first]
+            self._distance_stale = False
+            self._distance_peaks = self._select_by_distance(self._by_height[first:])
+        positions, values = self._distance_peaks
+
+        # Prominencia con bases dentro de la ventana, en unidades de z
+        start = index - len(self.window) + 1
+        bases = np.array([self._base(position, start) for position in positions.tolist()])
+        prominences = (values - mean) / std - (bases - mean) / std
+        if not exact and np.any(np.abs(prominences - self.prominence) < TIE_MARGIN):
+            return None
+        return positions[prominences >= self.prominence]
+
+    def _base(self, position, start):
+        """Base de la prominencia (la mayor de las dos) para el máximo en `position`"""
+        state = self._bases.get(position)
+        if state is None:
+            state = self._bases[position] = self._build_base(position, start)
+        _, left_start, left_minima, right_min, _ = state
+        left_min = left_minima[start - left_start if start > left_start else 0]
+        return left_min if left_min > right_min else right_min
+
+    def _build_base(self, position, start):
+        # Igual que peak_prominences: hacia cada lado hasta una muestra más alta
+        # o el borde de la ventana, quedándose con el mínimo del tramo
+        signal = self.window.view()
+        offset = position - start
+        value = signal[offset]
+
+        left = signal[:offset + 1]
+        higher = np.flatnonzero(left > value)
+        left_offset = int(higher[-1]) + 1 if len(higher) else 0
+        # Mínimo de [a, pico] para cada a: sirve aunque el inicio de la ventana avance
+        left_minima = np.minimum.accumulate(left[left_offset:][::-1])[::-1].tolist()
+
+        right = signal[offset:]
+        higher = np.flatnonzero(right > value)
+        frozen = len(higher) > 0
+        right_min = float(right[:higher[0]].min() if frozen else right.min())
+        return [float(value), start + left_offset, left_minima, right_min, frozen]
+
+    def _extend_right_bases(self, value):
+        # La base derecha de un pico sigue bajando hasta que llega una muestra más alta
+        for state in self._bases.values():
+            if state[4]:
+                continue
+            if value > state[0]:
+                state[4] = True
+            elif value < state[3]:
+                state[3] = value
+
+    def _select_by_distance(self, candidates):
+        # Del más alto al más bajo, como _select_by_peak_distance de SciPy
+        candidates = sorted((midpoint, value) for value, midpoint in candidates)
+        positions = [midpoint for midpoint, _ in candidates]
+        values = np.array([value for _, value in candidates])
+        keep = [True] * len(positions)
+        for j in np.argsort(values)[::-1].tolist():
+            if not keep[j]:
+                continue
+            k = j - 1
+            while k >= 0 and positions[j] - positions[k] < self.min_distance:
+                keep[k] = False
+                k -= 1
+            k = j + 1
+            while k < len(positions) and positions[k] - positions[j] < self.min_distance:
+                keep[k] = False
+                k += 1
+        keep = np.array(keep)
+        return np.array(positions, dtype=np.int64)[keep], values[keep]
+
+    def _emit(self, index):
+        event = None
+        for peak_index in self.peaks:
+            peak_index = int(peak_index)
+            if index - peak_index < self.min_distance:
+                break
+            if self.last_peak_index is not None and peak_index <= self.last_peak_index:
+                continue
+            event = self._confirm(peak_index)
+        return event
+
+    def _confirm(self, index):
+        time = float(self.times[index - (self.sample_index - len(self.times) + 1)])
+        rr = None
+        if self.last_peak_time is not None and time > self.last_peak_time:
+            rr = time - self.last_peak_time
+
+        self.last_peak_index = index
+        self.last_peak_time = time
+        event = {
+            'index': index,
+            'time': time,
+            'rr': rr
+        }
+        for callback in self.listeners:
+            callback(event)
+        return event
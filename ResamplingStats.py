@@ -0,0 +1,150 @@
+import numpy as np
+
+
+# Bytes por lote para el arreglo (lote, n, p) float64 de los remuestreos; el
+# lote se deriva de n y p, así una cohorte grande no dispara la memoria
+MEMORY_BUDGET = 64 * 2 ** 20
+
+
+def _standardize(X):
+    """Columnas centradas y divididas por su DE poblacional (NaN si la columna es constante)"""
+    centered = X - X.mean(axis=-2, keepdims=True)
+    scale = np.sqrt((centered ** 2).mean(axis=-2, keepdims=True))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / np.where(scale > 0, scale, np.nan)
+
+
+def pearson_matrix(X):
+    """Matriz de correlación de Pearson de X (..., n, p) → (..., p, p), también por lotes"""
+    Z = _standardize(np.asarray(X, dtype=np.float64))
+    return np.einsum('...nk,...nl->...kl', Z, Z) / Z.shape[-2]
+
+
+def _complete_rows(X):
+    # Análisis por casos completos: una fila con algún NaN se descarta para todos los pares
+    X = np.asarray(X, dtype=np.float64)
+    return X[~np.isnan(X).any(axis=1)]
+
+
+def _batch_size(n, p, memory_budget):
+    """Remuestreos por lote para que (lote, n, p) float64 quepa en `memory_budget` bytes (mínimo 1)"""
+    return max(1, int(memory_budget) // (n * p * 8))
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield min(batch_size, total - start)
+
+
+def bootstrap_pairs(X, resamples=10000, seed=None, memory_budget=MEMORY_BUDGET):
+    """Correlaciones bootstrap de todos los pares (i < j): arreglo (resamples, pares)
+
+    Cada lote de remuestreos es una matriz de índices (lote, n) sacada con
+    reposición: X[índices] da los lote×n×p datos de una vez y la correlación
+    de todos los pares sale de un solo einsum, sin bucles por remuestreo. Un
+    remuestreo en que una variable queda constante da NaN para sus pares.
+    El tamaño del lote sale de `memory_budget` (bytes del arreglo lote×n×p).
+    """
+    X = _complete_rows(X)
+    n, p = X.shape
+    upper = np.triu_indices(p, k=1)
+    rng = np.random.default_rng(seed)
+    out = np.empty((resamples, len(upper[0])))
+    done = 0
+    for size in _batches(resamples, _batch_size(n, p, memory_budget)):
+        indices = rng.integers(0, n, size=(size, n))
+        out[done:done + size] = pearson_matrix(X[indices])[:, upper[0], upper[1]]
+        done += size
+    return out
+
+
+def bootstrap_ci(X, resamples=10000, confidence=0.95, seed=None, memory_budget=MEMORY_BUDGET):
+    """Intervalo bootstrap por percentiles de la correlación de cada par: (inferior, superior) p×p"""
+    X = _complete_rows(X)
+    p = X.shape[1]
+    samples = bootstrap_pairs(X, resamples, seed, memory_budget)
+    alpha = (1 - confidence) / 2
+    low_pairs, high_pairs = np.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+
+    upper = np.triu_indices(p, k=1)
+    low, high = np.ones((p, p)), np.ones((p, p))
+    low[upper], high[upper] = low_pairs, high_pairs
+    low[upper[::-1]], high[upper[::-1]] = low_pairs, high_pairs
+    return low, high
+
+
+def permutation_pvalues(X, permutations=10000, seed=None, memory_budget=MEMORY_BUDGET):
+    """p bilateral por permutación de la correlación de cada par: matriz p×p
+
+    Cada permutación reordena las filas de una copia de los datos (una
+    matriz de índices (lote, n) hecha con argsort de números aleatorios) y
+    se correlaciona la columna i original con la j permutada: para cada par
+    es una muestra de la distribución nula de r sin relación entre ambas.
+    p = (1 + #{|r*| ≥ |r|}) / (1 + permutaciones), nunca cero. Los lotes
+    se dimensionan con `memory_budget` igual que en bootstrap_pairs.
+    """
+    X = _complete_rows(X)
+    n, p = X.shape
+    Z = _standardize(X)
+    observed = np.abs(Z.T @ Z / n)
+    rng = np.random.default_rng(seed)
+    exceed = np.zeros((p, p))
+    for size in _batches(permutations, _batch_size(n, p, memory_budget)):
+        indices = np.argsort(rng.random((size, n)), axis=1)
+        null = np.einsum('nk,bnl->bkl', Z, Z[indices]) / n
+        # Tolerancia relativa: la permutación identidad debe contar como ≥ observado
+        exceed += (np.abs(null) >= observed * (1 - 1e-12)).sum(axis=0)
+
+    # Simétrica: el par (i, j) usa la permutación de j; se toma el de i < j para ambos
+    pvalues = (1 + exceed) / (1 + permutations)
+    pvalues = np.triu(pvalues, k=1)
+    pvalues = pvalues + pvalues.T
+    np.fill_diagonal(pvalues, 0.0)
+    pvalues[np.isnan(observed)] = np.nan
+    return pvalues
+
+
+def fdr_bh(pvalues):
+    """Valores q de Benjamini-Hochberg (mismo orden que `pvalues`; los NaN se ignoran)"""
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    q = np.full_like(pvalues, np.nan)
+    valid = ~np.isnan(pvalues)
+    m = valid.sum()
+    if not m:
+        return q
+    order = np.argsort(pvalues[valid])
+    ranked = pvalues[valid][order] * m / np.arange(1, m + 1)
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(ranked, 1.0)
+    q[valid] = adjusted
+    return q
+
+
+def correlation_table(X, names, resamples=10000, permutations=10000, confidence=0.95, seed=None,
+                      memory_budget=MEMORY_BUDGET):
+    """Una fila por par de variables: r, IC bootstrap, p por permutación y q (BH)
+
+    `X` es (n, p) con las variables en el orden de `names`. Devuelve una
+    lista de diccionarios (lista para pasar a un DataFrame o a JSON).
+    """
+    X = _complete_rows(X)
+    r = pearson_matrix(X)
+    low, high = bootstrap_ci(X, resamples, confidence, seed, memory_budget)
+    pvalues = permutation_pvalues(X, permutations, None if seed is None else seed + 1, memory_budget)
+    upper = np.triu_indices(len(names), k=1)
+    q = fdr_bh(pvalues[upper])
+
+    rows = []
+    for k, (i, j) in enumerate(zip(*upper)):
+        rows.append({
+            'variable_a': names[i],
+            'variable_b': names[j],
+            'n': len(X),
+            'r': float(r[i, j]),
+            'ic_inferior': float(low[i, j]),
+            'ic_superior': float(high[i, j]),
+            'p_permutacion': float(pvalues[i, j]),
+            'q_bh': float(q[k]),
+        })
+    return rows
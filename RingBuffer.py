@@ -0,0 +1,63 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Buffer circular de capacidad fija sobre un arreglo NumPy preasignado
+
+    Cada muestra se escribe dos veces (posición `i` y `i + capacity`), de modo
+    que las últimas N muestras siempre ocupan un tramo contiguo del arreglo:
+    `view()` devuelve ese tramo sin copiar ni reservar memoria. La vista queda
+    ligada al buffer, así que refleja las escrituras posteriores; si se
+    necesita conservarla hay que copiarla.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("La capacidad del buffer debe ser al menos 1")
+        self.capacity = int(capacity)
+        self._data = np.zeros(2 * self.capacity, dtype=dtype)
+        self._head = 0      # Próxima posición de escritura (0..capacity-1)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self):
+        return self._count == self.capacity
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def append(self, value):
+        """Agrega una muestra; devuelve la muestra desplazada o None si había espacio"""
+        evicted = self._data[self._head] if self.full else None
+        self._data[self._head] = value
+        self._data[self._head + self.capacity] = value
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        return evicted
+
+    def view(self):
+        """Vista contigua (sin copia) de las muestras, de la más antigua a la más reciente"""
+        end = self._head + self.capacity
+        return self._data[end - self._count:end]
+
+    def oldest(self):
+        return self._data[self._head + self.capacity - self._count] if self._count else None
+
+    def latest(self):
+        return self._data[self._head + self.capacity - 1] if self._count else None
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def clear(self):
+        """Vacía el buffer sin liberar el arreglo preasignado"""
+        self._head = 0
+        self._count = 0
@@ -0,0 +1,142 @@
+class RunningStats:
+    """Acumulador de Welford: media, varianza, mínimo y máximo en O(1) por muestra"""
+
+    __slots__ = ('count', 'mean', '_m2', 'minimum', 'maximum')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other):
+        """Combina otro acumulador (fórmula de Chan) y devuelve self"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self._m2 = other.count, other.mean, other._m2
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def variance(self):
+        """Varianza poblacional (igual que np.std con ddof=0)"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def summary(self):
+        if self.count == 0:
+            return None
+        return {
+            'promedio': self.mean,
+            'minimo': self.minimum,
+            'maximo': self.maximum,
+            'desviacion': self.std
+        }
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self._m2,
+                'min': self.minimum, 'max': self.maximum}
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls()
+        stats.count = state['count']
+        stats.mean = state['mean']
+        stats._m2 = state['m2']
+        stats.minimum = state['min']
+        stats.maximum = state['max']
+        return stats
+
+
+# Canal del resumen → columna de datos de sensores
+SUMMARY_CHANNELS = {
+    'ecg': 'ecg_voltage',
+    'temperatura': 'temperature',
+    'bpm': 'bpm',
+}
+
+
+class SessionStats:
+    """Acumuladores por canal para la sesión completa y para cada fase del protocolo"""
+
+    def __init__(self, channels=SUMMARY_CHANNELS):
+        self.channels = dict(channels)
+        self.total = self._new_accumulators()
+        self.phases = {}
+
+    def _new_accumulators(self):
+        return {channel: RunningStats() for channel in self.channels}
+
+    @property
+    def count(self):
+        return next(iter(self.total.values())).count if self.total else 0
+
+    def update(self, point, phase=None):
+        phase_stats = None
+        if phase is not None:
+            phase_stats = self.phases.get(phase)
+            if phase_stats is None:
+                phase_stats = self.phases[phase] = self._new_accumulators()
+
+        for channel, column in self.channels.items():
+            value = point[column]
+            self.total[channel].update(value)
+            if phase_stats is not None:
+                phase_stats[channel].update(value)
+
+    def summary(self):
+        """Resumen de la sesión completa, con las mismas claves de resumen_sesion.json"""
+        summary = {'puntos_datos': self.count}
+        for channel, stats in self.total.items():
+            summary[channel] = stats.summary()
+        return summary
+
+    def to_dict(self):
+        return {
+            'total': {channel: stats.to_dict() for channel, stats in self.total.items()},
+            'fases': {phase: {channel: stats.to_dict() for channel, stats in accumulators.items()}
+                      for phase, accumulators in self.phases.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, state, channels=SUMMARY_CHANNELS):
+        session_stats = cls(channels)
+        session_stats.total = {channel: RunningStats.from_dict(values)
+                               for channel, values in state['total'].items()}
+        session_stats.phases = {phase: {channel: RunningStats.from_dict(values)
+                                        for channel, values in accumulators.items()}
+                                for phase, accumulators in state['fases'].items()}
+        return session_stats
+
+    def phase_summary(self):
+        result = {}
+        for phase, accumulators in self.phases.items():
+            result[phase] = {'puntos_datos': next(iter(accumulators.values())).count}
+            for channel, stats in accumulators.items():
+                result[phase][channel] = stats.summary()
+        return result
@@ -0,0 +1,101 @@
+import struct
+import time
+
+import numpy as np
+
+
+# Lote binario 'sensor_batch' (little-endian), decodificado por decodeSensorBatch() en main.js
+#   0     versión (uint8)
+#   1     reservado
+#   2-3   cantidad de muestras n (uint16)
+#   4-7   reservado
+#   8-15  timestamp de la primera muestra en s (float64)
+#   16-   columnas: primero las de 4 bytes y luego las de 2, para que cada
+#         una quede alineada y se pueda leer con un TypedArray sin copiar
+BATCH_VERSION = 1
+BATCH_HEADER = struct.Struct('<BxHxxxxd')
+BATCH_COLUMNS = [
+    ('timestamp_delta_us', '<i4'),   # Diferencia con la muestra anterior (la primera es 0)
+    ('ecg_voltage', '<f4'),
+    ('temperature', '<f4'),
+    ('ecg_change_percent', '<f4'),
+    ('temp_change_celsius', '<f4'),
+    ('bpm', '<i2'),
+    ('ecg_raw', '<u2'),
+]
+MAX_BATCH_SAMPLES = 65535
+
+
+def encode_batch(points):
+    """Codifica una lista de puntos como columnas binarias"""
+    count = len(points)
+    timestamps = np.fromiter((p['timestamp'] for p in points), dtype=np.float64, count=count)
+    deltas = np.diff(timestamps, prepend=timestamps[0]) * 1e6
+
+    parts = [BATCH_HEADER.pack(BATCH_VERSION, count, timestamps[0])]
+    for name, dtype in BATCH_COLUMNS:
+        if name == 'timestamp_delta_us':
+            column = np.rint(deltas).astype(dtype)
+        else:
+            column = np.fromiter((p[name] for p in points), dtype=np.float64, count=count).astype(dtype)
+        parts.append(column.tobytes())
+    return b''.join(parts)
+
+
+def decode_batch(payload):
+    """Inverso de encode_batch (columnas NumPy); útil para clientes en Python"""
+    version, count, first_timestamp = BATCH_HEADER.unpack_from(payload)
+    if version != BATCH_VERSION:
+        raise ValueError(f"Versión de lote no soportada: {version}")
+
+    columns = {}
+    offset = BATCH_HEADER.size
+    for name, dtype in BATCH_COLUMNS:
+        columns[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += columns[name].nbytes
+    columns['timestamp'] = first_timestamp + np.cumsum(columns.pop('timestamp_delta_us')) / 1e6
+    return columns
+
+
+class SampleBatcher:
+    """Agrupa muestras en lotes de hasta `max_samples` o `max_interval` segundos
+
+    `add()` devuelve el lote codificado cuando se completa; `poll()` lo
+    devuelve si venció el intervalo aunque no lleguen muestras nuevas.
+    """
+
+    def __init__(self, max_samples=25, max_interval=0.1):
+        self.max_samples = min(max_samples, MAX_BATCH_SAMPLES)
+        self.max_interval = max_interval
+        self._points = []
+        self._started = None
+
+    def __len__(self):
+        return len(self._points)
+
+    def add(self, point):
+        if not self._points:
+            self._started = time.monotonic()
+        self._points.append(point)
+        if len(self._points) >= self.max_samples:
+            return self.flush()
+        return self.poll()
+
+    def poll(self):
+        if self._points and time.monotonic() - self._started >= self.max_interval:
+            return self.flush()
+        return None
+
+    def time_left(self):
+        """Segundos hasta que vence el lote en curso (None si está vacío)"""
+        if not self._points:
+            return None
+        return max(0.0, self.max_interval - (time.monotonic() - self._started))
+
+    def flush(self):
+        if not self._points:
+            return None
+        payload = encode_batch(self._points)
+        self._points = []
+        self._started = None
+        return payload
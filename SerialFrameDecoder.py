@@ -0,0 +1,163 @@
+import numpy as np
+
+
+# Trama binaria enviada por Biofeedback_System.ino con BINARY_MODE = 1 (little-endian, 14 bytes)
+#   0-1   sincronía 0xA5 0x5A
+#   2-3   número de secuencia (uint16, da la vuelta en 65535)
+#   4-7   tiempo del dispositivo en ms (uint32)
+#   8-9   ECG crudo del ADC (uint16)
+#   10-11 temperatura en centésimas de °C (int16; TEMP_NOT_SAMPLED si no se midió en esta trama)
+#   12-13 CRC16-CCITT (poly 0x1021, inicial 0xFFFF) de los bytes 2-11
+SYNC = b'\xa5\x5a'
+FRAME_DTYPE = np.dtype([
+    ('sync', '<u2'),
+    ('seq', '<u2'),
+    ('device_ms', '<u4'),
+    ('ecg_raw', '<u2'),
+    ('temp_centi', '<i2'),
+    ('crc', '<u2'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+SYNC_WORD = int.from_bytes(SYNC, 'little')
+TEMP_NOT_SAMPLED = 0x7FFF
+CRC_START, CRC_END = 2, 12
+
+
+def _crc16_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[byte] = crc & 0xFFFF
+    return table
+
+
+CRC16_TABLE = _crc16_table()
+
+
+def crc16_ccitt(frames):
+    """CRC16-CCITT de cada fila de una matriz de bytes (n_tramas x n_bytes), vectorizado"""
+    crc = np.full(frames.shape[0], 0xFFFF, dtype=np.uint16)
+    for column in range(frames.shape[1]):
+        index = ((crc >> 8) ^ frames[:, column]) & 0xFF
+        crc = ((crc << 8) & 0xFFFF) ^ CRC16_TABLE[index]
+    return crc
+
+
+class FrameDecoder:
+    """Decodifica por lotes las tramas binarias que llegan por el puerto serie
+
+    `feed()` recibe los bytes disponibles y devuelve todas las tramas completas
+    como columnas NumPy (sin recorrer byte a byte en Python). Los bytes de una
+    trama incompleta quedan guardados para la siguiente llamada. Las tramas con
+    CRC inválido se descartan y los saltos en el número de secuencia se cuentan
+    como tramas perdidas, salvo los que ya explica una trama corrupta. Si la
+    secuencia vuelve atrás sin que avance el reloj del dispositivo (el Arduino
+    se reinició), se toma como una resincronización y no como pérdida.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._last_seq = None
+        self._last_ms = None
+        self._corrupt_since_last = 0   # Tramas corruptas desde la última válida
+        self.frames_ok = 0
+        self.frames_corrupt = 0
+        self.frames_lost = 0
+        self.resyncs = 0
+        self.bytes_skipped = 0
+
+    def feed(self, data):
+        """Procesa bytes nuevos; devuelve dict de columnas con las tramas válidas"""
+        buffer = self._buffer + data
+        chunks = []
+        position = 0
+
+        while len(buffer) - position >= FRAME_SIZE:
+            start = buffer.find(SYNC, position)
+            if start < 0:
+                # Sin sincronía: conservar solo un posible primer byte de SYNC al final
+                keep = 1 if buffer.endswith(SYNC[:1]) else 0
+                self.bytes_skipped += len(buffer) - position - keep
+                position = len(buffer) - keep
+                break
+            self.bytes_skipped += start - position
+
+            count = (len(buffer) - start) // FRAME_SIZE
+            if count == 0:
+                position = start
+                break
+
+            frames = np.frombuffer(buffer, dtype=FRAME_DTYPE, count=count, offset=start)
+            raw = np.frombuffer(buffer, dtype=np.uint8, count=count * FRAME_SIZE, offset=start)
+            raw = raw.reshape(count, FRAME_SIZE)
+
+            # Se aceptan las tramas hasta la primera con sincronía o CRC inválidos
+            synced = frames['sync'] == SYNC_WORD
+            valid = synced & (crc16_ccitt(raw[:, CRC_START:CRC_END]) == frames['crc'])
+            invalid = np.flatnonzero(~valid)
+            good = int(invalid[0]) if len(invalid) else count
+            chunks.append(frames[:good])
+            self._count_lost(frames[:good])
+
+            position = start + good * FRAME_SIZE
+            if good < count:
+                # Trama dañada o bytes perdidos: avanzar un byte y volver a buscar la sincronía,
+                # así se recupera una trama que haya quedado dentro de la dañada
+                if synced[good]:
+                    self.frames_corrupt += 1
+                    self._corrupt_since_last += 1
+                position += 1
+                self.bytes_skipped += 1
+
+        self._buffer = buffer[position:]
+
+        frames = np.concatenate(chunks) if chunks else np.empty(0, dtype=FRAME_DTYPE)
+        self.frames_ok += len(frames)
+
+        temperature = frames['temp_centi'] / 100.0
+        temperature[frames['temp_centi'] == TEMP_NOT_SAMPLED] = np.nan
+        return {
+            'seq': frames['seq'],
+            'device_ms': frames['device_ms'],
+            'ecg_raw': frames['ecg_raw'],
+            'temperature': temperature
+        }
+
+    def _count_lost(self, frames):
+        if len(frames) == 0:
+            return
+        seq = frames['seq'].astype(np.int64)
+        device_ms = frames['device_ms'].astype(np.int64)
+        if self._last_seq is not None:
+            seq = np.concatenate(([self._last_seq], seq))
+            device_ms = np.concatenate(([self._last_ms], device_ms))
+
+        steps = np.diff(seq)
+        gaps = steps - 1
+        # Hacia atrás con el reloj avanzando: la secuencia dio la vuelta en 65535
+        wrapped = (steps <= 0) & (np.diff(device_ms) > 0)
+        gaps[wrapped] += 65536
+        # Hacia atrás con el reloj reiniciado: el Arduino arrancó de nuevo
+        resync = (steps <= 0) & ~wrapped
+        gaps[resync] = 0
+        self.resyncs += int(resync.sum())
+
+        if self._last_seq is not None and len(gaps):
+            # El hueco previo a este tramo incluye las tramas corruptas ya contadas
+            gaps[0] = max(0, gaps[0] - self._corrupt_since_last)
+        self._corrupt_since_last = 0
+
+        self.frames_lost += int(gaps.sum())
+        self._last_seq = int(seq[-1])
+        self._last_ms = int(device_ms[-1])
+
+    def stats(self):
+        return {
+            'tramas_validas': self.frames_ok,
+            'tramas_corruptas': self.frames_corrupt,
+            'tramas_perdidas': self.frames_lost,
+            'resincronizaciones': self.resyncs,
+            'bytes_descartados': self.bytes_skipped
+        }
@@ -0,0 +1,239 @@
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from FileHash import file_sha256
+
+
+CATALOG_NAME = 'catalogo.sqlite'
+
+# Columnas del catálogo (una fila por carpeta de sesión terminada)
+CATALOG_COLUMNS = [
+    ('carpeta', 'TEXT PRIMARY KEY'),
+    ('fecha', 'TEXT'),
+    ('edad', 'INTEGER'),
+    ('sexo', 'TEXT'),
+    *[(f'hamilton_q{i}', 'INTEGER') for i in range(1, 8)],
+    ('hamilton_psiquica', 'INTEGER'),
+    ('hamilton_somatica', 'INTEGER'),
+    ('hamilton_total', 'INTEGER'),
+    ('banda_hamilton', 'TEXT'),
+    ('frecuencia_muestreo_hz', 'REAL'),
+    ('duracion_segundos', 'REAL'),
+    ('puntos_datos', 'INTEGER'),
+    ('baseline_ecg_voltaje', 'REAL'),
+    ('baseline_temperatura_celsius', 'REAL'),
+    *[(f'{prefix}_{stat}', 'REAL')
+      for prefix in ('ecg', 'temp', 'bpm')
+      for stat in ('promedio', 'minimo', 'maximo', 'desviacion')],
+    ('ruta_csv', 'TEXT'),
+    ('sha256_csv', 'TEXT'),
+    ('bytes_csv', 'INTEGER'),
+    ('formato_columnar', 'INTEGER'),
+    ('indexada', 'TEXT'),
+]
+CATALOG_INDEXES = {
+    'idx_sesiones_fecha': '(fecha, carpeta)',
+    'idx_sesiones_edad': '(edad, fecha)',
+    'idx_sesiones_sexo_edad': '(sexo, edad, fecha)',
+    'idx_sesiones_banda': '(banda_hamilton, fecha)',
+}
+
+# Bandas de la escala de Hamilton (mismos cortes que las gráficas del artículo)
+HAMILTON_BANDS = [(5, 'minima'), (14, 'leve_moderada'), (23, 'moderada_alta'), (28, 'severa')]
+
+
+def hamilton_band(total):
+    for limit, band in HAMILTON_BANDS:
+        if total <= limit:
+            return band
+    return HAMILTON_BANDS[-1][1]
+
+
+class SessionCatalog:
+    """Catálogo SQLite de las sesiones guardadas en sessions/
+
+    Guarda por sesión los datos demográficos, las puntuaciones de Hamilton,
+    las estadísticas del resumen, la ruta del CSV y su SHA-256, con índices
+    para filtrar por edad, sexo y banda de Hamilton sin recorrer carpetas.
+    Cada sesión se agrega al terminar de guardarse; `rebuild` reindexa
+    todas las carpetas leyéndolas en paralelo (un proceso por núcleo).
+    """
+
+    def __init__(self, root='sessions'):
+        self.root = root
+        self.path = os.path.join(root, CATALOG_NAME)
+        os.makedirs(root, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')   # Lecturas de la API mientras se indexa
+            columns = ', '.join(f'{name} {kind}' for name, kind in CATALOG_COLUMNS)
+            conn.execute(f'CREATE TABLE IF NOT EXISTS sesiones ({columns})')
+            for name, columns in CATALOG_INDEXES.items():
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON sesiones {columns}')
+
+    @contextmanager
+    def _connect(self):
+        # Una conexión por operación: la usan el hilo de E/S y los hilos de Flask
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:   # Commit al salir (rollback si hubo un error)
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def describe(folder):
+        """Fila del catálogo para una carpeta (None si la sesión no está terminada)"""
+        hamilton_file = os.path.join(folder, 'hamilton_pre.json')
+        summary_file = os.path.join(folder, 'resumen_sesion.json')
+        csv_file = os.path.join(folder, 'datos_sensores.csv')
+        if not all(os.path.exists(path) for path in (hamilton_file, summary_file, csv_file)):
+            return None
+
+        with open(hamilton_file, encoding='utf-8') as f:
+            hamilton = json.load(f)
+        with open(summary_file, encoding='utf-8') as f:
+            summary = json.load(f)
+        metadata = {}
+        metadata_file = os.path.join(folder, 'metadatos.json')
+        if os.path.exists(metadata_file):
+            with open(metadata_file, encoding='utf-8') as f:
+                metadata = json.load(f)
+
+        name = os.path.basename(os.path.normpath(folder))
+        # Sesiones sin metadatos: la fecha sale del nombre de la carpeta
+        date = metadata.get('inicio') or datetime.strptime(name[:15], '%Y%m%d_%H%M%S').isoformat()
+        scores = hamilton['puntuaciones']
+        row = {
+            'carpeta': name,
+            'fecha': date,
+            'edad': hamilton['demographics'].get('edad'),
+            'sexo': hamilton['demographics'].get('sexo'),
+            **{f'hamilton_q{i}': hamilton['responses'].get(f'q{i}') for i in range(1, 8)},
+            'hamilton_psiquica': scores['psiquica'],
+            'hamilton_somatica': scores['somatica'],
+            'hamilton_total': scores['total'],
+            'banda_hamilton': hamilton_band(scores['total']),
+            'frecuencia_muestreo_hz': summary.get('frecuencia_muestreo_hz', metadata.get('frecuencia_muestreo_hz', 10)),
+            'duracion_segundos': summary['duracion_segundos'],
+            'puntos_datos': summary['puntos_datos'],
+            'baseline_ecg_voltaje': summary['baseline']['ecg_voltaje'],
+            'baseline_temperatura_celsius': summary['baseline']['temperatura_celsius'],
+            'ruta_csv': csv_file,
+            'sha256_csv': file_sha256(csv_file),
+            'bytes_csv': os.path.getsize(csv_file),
+            'formato_columnar': int(os.path.exists(os.path.join(folder, 'columnas', 'esquema.json'))),
+            'indexada': datetime.now().isoformat(),
+        }
+        for prefix, key in (('ecg', 'ecg'), ('temp', 'temperatura'), ('bpm', 'bpm')):
+            for stat in ('promedio', 'minimo', 'maximo', 'desviacion'):
+                row[f'{prefix}_{stat}'] = summary[key][stat] if summary.get(key) else None
+        return row
+
+    def upsert(self, rows):
+        names = [name for name, _ in CATALOG_COLUMNS]
+        sql = (f"INSERT OR REPLACE INTO sesiones ({', '.join(names)}) "
+               f"VALUES ({', '.join('?' for _ in names)})")
+        with self._connect() as conn:
+            conn.executemany(sql, [[row[name] for name in names] for row in rows])
+
+    def index_folder(self, folder):
+        """Agrega o actualiza una sesión (se llama al terminar de guardarla)"""
+        row = self.describe(folder)
+        if row is not None:
+            self.upsert([row])
+        return row
+
+    def rebuild(self, workers=None):
+        """Reindexa todas las carpetas en paralelo; quita las que ya no existen
+
+        Si una carpeta no se puede leer se avisa y se conserva su fila
+        anterior (se reintenta en la próxima reindexación).
+        """
+        rows, failed = self._describe_all(self._folders(), workers)
+        self.upsert(rows)
+        with self._connect() as conn:
+            present = {row['carpeta'] for row in rows} | failed
+            stale = [(name,) for (name,) in conn.execute('SELECT carpeta FROM sesiones')
+                     if name not in present]
+            conn.executemany('DELETE FROM sesiones WHERE carpeta = ?', stale)
+        return len(rows)
+
+    def refresh(self, workers=None):
+        """Pone al día el catálogo al arrancar el servidor
+
+        Si está vacío se reindexa todo; si no, solo se agregan las carpetas
+        que todavía no tiene (p. ej. sesiones grabadas antes del catálogo).
+        Devuelve la cantidad de sesiones indexadas.
+        """
+        with self._connect() as conn:
+            indexed = {name for (name,) in conn.execute('SELECT carpeta FROM sesiones')}
+        if not indexed:
+            return self.rebuild(workers)
+        missing = [folder for folder in self._folders() if os.path.basename(folder) not in indexed]
+        if not missing:
+            return 0
+        rows, _ = self._describe_all(missing, workers)
+        self.upsert(rows)
+        return len(rows)
+
+    def _folders(self):
+        return [os.path.join(self.root, name) for name in sorted(os.listdir(self.root))
+                if os.path.isdir(os.path.join(self.root, name))]
+
+    @staticmethod
+    def _describe_all(folders, workers=None):
+        """Filas de las carpetas terminadas, leídas en paralelo; devuelve (filas, fallidas)"""
+        rows, failed = [], set()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for folder, row, error in pool.map(_describe, folders, chunksize=8):
+                if error:
+                    name = os.path.basename(folder)
+                    failed.add(name)
+                    print(f"✗ {name}: {error} (se mantiene la fila anterior, si la hay)")
+                elif row is not None:
+                    rows.append(row)
+        return rows, failed
+
+    def query(self, edad_min=None, edad_max=None, sexo=None, banda=None, page=1, per_page=50):
+        """Sesiones filtradas, de la más reciente a la más antigua; devuelve (total, filas)"""
+        conditions, params = [], []
+        if edad_min is not None:
+            conditions.append('edad >= ?')
+            params.append(edad_min)
+        if edad_max is not None:
+            conditions.append('edad <= ?')
+            params.append(edad_max)
+        if sexo:
+            conditions.append('sexo = ?')
+            params.append(sexo)
+        if banda:
+            conditions.append('banda_hamilton = ?')
+            params.append(banda)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with self._connect() as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM sesiones {where}', params).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT * FROM sesiones {where} ORDER BY fecha DESC, carpeta DESC LIMIT ? OFFSET ?',
+                params + [per_page, (page - 1) * per_page]
+            ).fetchall()
+        return total, [dict(row) for row in rows]
+
+
+def _describe(folder):
+    try:
+        return folder, SessionCatalog.describe(folder), None
+    except Exception as e:   # Una carpeta dañada no frena la reindexación
+        return folder, None, str(e)
+
+
+if __name__ == '__main__':
+    # Reindexa todas las sesiones:  python SessionCatalog.py [carpeta_sessions]
+    catalog = SessionCatalog(sys.argv[1] if len(sys.argv) > 1 else 'sessions')
+    print(f"✓ {catalog.rebuild()} sesiones indexadas en {catalog.path}")
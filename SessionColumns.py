@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from SessionStore import SessionStore
+
+
+# columnas/: un .npy por canal de datos_sensores.csv (mismo tipo que en
+# memoria) y esquema.json con los nombres y la cantidad de filas. El
+# esquema se escribe al final: sin él la carpeta está incompleta.
+COLUMNS_DIR = 'columnas'
+COLUMNS_SCHEMA = 'esquema.json'
+
+
+class SessionColumns:
+    """Formato columnar binario de una sesión, junto al CSV
+
+    Cargar una sesión es mapear sus .npy en memoria: no se parsea texto y
+    solo se leen del disco las páginas que se usan. `load_columns` devuelve
+    las columnas de una carpeta y, si la sesión solo tiene CSV, lo lee (y
+    con `convert=True` deja escrito el formato columnar para la próxima vez).
+    """
+
+    @staticmethod
+    def path(folder):
+        return os.path.join(folder, COLUMNS_DIR)
+
+    @classmethod
+    def exists(cls, folder):
+        return os.path.exists(os.path.join(cls.path(folder), COLUMNS_SCHEMA))
+
+    @classmethod
+    def write(cls, folder, columns):
+        """Escribe las columnas (dict de arreglos) en una carpeta temporal y la renombra"""
+        target = cls.path(folder)
+        temporary = target + '.tmp'
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for name, values in columns.items():
+            np.save(os.path.join(temporary, f'{name}.npy'), np.ascontiguousarray(values))
+        with open(os.path.join(temporary, COLUMNS_SCHEMA), 'w', encoding='utf-8') as f:
+            json.dump({
+                'columnas': list(columns),
+                'filas': len(next(iter(columns.values()))) if columns else 0
+            }, f, ensure_ascii=False)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(temporary, target)
+
+    @classmethod
+    def load(cls, folder, names=None):
+        """Columnas mapeadas en memoria (solo lectura), o None si no hay formato columnar"""
+        if not cls.exists(folder):
+            return None
+        with open(os.path.join(cls.path(folder), COLUMNS_SCHEMA), encoding='utf-8') as f:
+            schema = json.load(f)
+        names = schema['columnas'] if names is None else names
+        return {name: np.load(os.path.join(cls.path(folder), f'{name}.npy'), mmap_mode='r')
+                for name in names}
+
+    @classmethod
+    def load_columns(cls, folder, names=None, convert=False):
+        """Columnas de una sesión: del formato columnar o, si no existe, de su CSV"""
+        columns = cls.load(folder, names)
+        if columns is not None:
+            return columns
+        columns = SessionStore.from_csv(os.path.join(folder, 'datos_sensores.csv')).columns()
+        if convert:
+            cls.write(folder, columns)
+        return columns if names is None else {name: columns[name] for name in names}
+
+    @classmethod
+    def to_dataframe(cls, folder, names=None):
+        """DataFrame de pandas con las columnas de la sesión"""
+        import pandas as pd   # Solo lo necesitan los scripts de análisis
+        return pd.DataFrame(cls.load_columns(folder, names), copy=False)
+
+
+if __name__ == '__main__':
+    # Escribe el formato columnar de las sesiones guardadas que aún no lo tienen:
+    #   python SessionColumns.py [carpeta_sessions]
+    root = sys.argv[1] if len(sys.argv) > 1 else 'sessions'
+    for name in sorted(os.listdir(root)):
+        folder = os.path.join(root, name)
+        if os.path.exists(os.path.join(folder, 'datos_sensores.csv')) and not SessionColumns.exists(folder):
+            columns = SessionColumns.load_columns(folder, convert=True)
+            print(f"✓ {name}: {len(columns['timestamp'])} filas")
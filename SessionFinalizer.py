@@ -0,0 +1,89 @@
+import atexit
+import queue
+import threading
+
+
+class SessionFinalizer:
+    """Hilo de E/S que cierra las sesiones en segundo plano
+
+    Cada trabajo es una lista de pasos `(nombre, función)` que se ejecutan en
+    orden. Un único hilo atiende a todas las estaciones: el disco nunca
+    bloquea a quien detiene una sesión y las escrituras en archivos
+    compartidos (todas_las_sesiones.csv) quedan serializadas. `on_progress`
+    se llama después de cada paso y `on_done` al terminar (con el error si
+    algún paso falló). `key` (la carpeta de la sesión) identifica los trabajos
+    en curso, para no ofrecer como interrumpida una sesión que se está
+    cerrando. Al salir del intérprete se espera a que terminen los trabajos
+    pendientes.
+    """
+
+    def __init__(self, name='session-finalizer', exit_timeout=30.0):
+        self.jobs = queue.Queue()
+        self.exit_timeout = exit_timeout
+        self.completed = 0
+        self.failed = 0
+        self._keys = set()               # Carpetas con un trabajo pendiente
+        self._keys_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, steps, on_progress=None, on_done=None, key=None):
+        if key is not None:
+            with self._keys_lock:
+                self._keys.add(key)
+        self.jobs.put((list(steps), on_progress, on_done, key))
+
+    def in_progress(self):
+        with self._keys_lock:
+            return set(self._keys)
+
+    @property
+    def pending(self):
+        return self.jobs.unfinished_tasks
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            steps, on_progress, on_done, key = job
+            error = None
+            try:
+                for done, (name, step) in enumerate(steps, start=1):
+                    step()
+                    if on_progress:
+                        on_progress(name, done, len(steps))
+                self.completed += 1
+            except Exception as e:
+                print(f"✗ Error finalizando sesión: {e}")
+                error = e
+                self.failed += 1
+            finally:
+                with self._keys_lock:
+                    self._keys.discard(key)
+                if on_done:
+                    try:
+                        on_done(error)
+                    except Exception as e:
+                        print(f"Error notificando fin de sesión: {e}")
+                self.jobs.task_done()
+
+    def wait(self):
+        """Bloquea hasta que no queden trabajos pendientes"""
+        self.jobs.join()
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self.jobs.put(None)
+        self._thread.join(self.exit_timeout)
+
+    def stats(self):
+        return {
+            'pendientes': self.pending,
+            'completadas': self.completed,
+            'fallidas': self.failed
+        }
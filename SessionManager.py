@@ -0,0 +1,151 @@
+import threading
+
+from BioSensorSystem import BioSensorSystem
+from Station import Station
+from SessionFinalizer import SessionFinalizer
+
+
+class SessionManager:
+    """Registro de estaciones activas, indexadas por session_id
+
+    Cada estación tiene su propio BioSensorSystem, su adquisición y su sala
+    de Socket.IO, así un mismo servidor atiende varios participantes a la
+    vez (uno por puerto USB, o flujos demo). También recuerda qué cliente
+    web controla cada estación.
+    """
+
+    def __init__(self, emit_to_room, **station_options):
+        self.emit_to_room = emit_to_room    # emit_to_room(evento, datos, sala)
+        self.station_options = station_options
+        self.finalizer = SessionFinalizer()  # Cierre de sesiones en segundo plano, compartido
+        self._stations = {}
+        self._clients = {}                  # sid del cliente -> session_id
+        self._reserved = set()              # Puertos de estaciones que se están conectando
+        self._lock = threading.Lock()
+        self._recovery_lock = threading.Lock()   # Una sesión interrumpida se retoma una sola vez
+
+    def __len__(self):
+        return len(self._stations)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._stations.values()))
+
+    def ports_in_use(self):
+        with self._lock:
+            return self._ports_in_use()
+
+    def _ports_in_use(self):
+        # Con self._lock tomado: estaciones registradas y reservas en curso
+        return {station.port for station in self._stations.values() if station.port} | self._reserved
+
+    def free_ports(self):
+        """Puertos de Arduino detectados que ninguna estación está usando"""
+        in_use = self.ports_in_use()
+        return [port for port in BioSensorSystem.find_arduino_ports() if port not in in_use]
+
+    def _reserve_port(self, port=None):
+        """Reserva el puerto indicado (o el primero libre) antes de conectar; None si no hay"""
+        detected = BioSensorSystem.find_arduino_ports() if port is None else None
+        with self._lock:
+            in_use = self._ports_in_use()
+            if port is None:
+                free = [candidate for candidate in detected if candidate not in in_use]
+                if not free:
+                    print("✗ No hay puertos de Arduino libres")
+                    return None
+                port = free[0]
+            elif port in in_use:
+                print(f"✗ El puerto {port} ya está en uso")
+                return None
+            self._reserved.add(port)
+            return port
+
+    def create(self, demo_mode=None, port=None, **options):
+        """Crea y conecta una estación; sin puerto se toma el primero libre
+
+        Devuelve la estación, o None si no se pudo conectar.
+        """
+        settings = {**self.station_options, **options}
+        station = Station(None, port=port, demo_mode=demo_mode, finalizer=self.finalizer, **settings)
+        station.emit = lambda event, data: self.emit_to_room(event, data, station.room)
+
+        # El puerto queda reservado mientras se conecta: dos altas simultáneas no
+        # pueden elegir el mismo
+        reserved = None
+        if not station.demo_mode:
+            reserved = self._reserve_port(port)
+            if reserved is None:
+                return None
+            station.set_port(reserved)
+
+        try:
+            if not station.connect():
+                station.close()
+                return None
+            with self._lock:
+                self._stations[station.session_id] = station
+        finally:
+            if reserved is not None:
+                with self._lock:
+                    self._reserved.discard(reserved)
+        print(f"✓ Estación {station.session_id} lista ({station.port or 'demo'})")
+        return station
+
+    def get(self, session_id):
+        with self._lock:
+            return self._stations.get(session_id)
+
+    def attach_client(self, sid, session_id):
+        with self._lock:
+            self._clients[sid] = session_id
+
+    def detach_client(self, sid):
+        with self._lock:
+            return self._clients.pop(sid, None)
+
+    def for_client(self, sid, session_id=None):
+        """Estación indicada explícitamente o, si no, la que controla el cliente"""
+        with self._lock:
+            session_id = session_id or self._clients.get(sid)
+            return self._stations.get(session_id)
+
+    def remove(self, session_id):
+        """Cierra la estación y libera su puerto"""
+        with self._lock:
+            station = self._stations.pop(session_id, None)
+            self._clients = {sid: sess for sid, sess in self._clients.items() if sess != session_id}
+        if station:
+            station.close()
+        return station
+
+    def close_all(self):
+        for station in self:
+            self.remove(station.session_id)
+
+    def unfinished_sessions(self):
+        """Sesiones interrumpidas que nadie está grabando ni cerrando"""
+        busy = self.finalizer.in_progress()
+        busy.update(station.bio_system.session_folder for station in self
+                    if station.bio_system.session_active)
+        return [folder for folder in BioSensorSystem.find_unfinished_sessions() if folder not in busy]
+
+    def resume(self, station, folder, phase=None):
+        """Reanuda en la estación una sesión interrumpida; False si ya no lo está"""
+        with self._recovery_lock:
+            if folder not in self.unfinished_sessions():
+                return False
+            station.resume_session(folder, phase)
+            return True
+
+    def finalize_unfinished(self, folder, on_progress=None, on_done=None):
+        """Cierra en el hilo de E/S una sesión interrumpida sin reanudarla"""
+        with self._recovery_lock:
+            if folder not in self.unfinished_sessions():
+                return False
+            # La recuperación solo usa archivos: no hace falta una estación conectada
+            BioSensorSystem().finalize_unfinished(folder, self.finalizer, on_progress, on_done)
+            return True
+
+    def status(self):
+        return [station.status() for station in self]
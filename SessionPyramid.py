@@ -0,0 +1,164 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+from SessionColumns import SessionColumns
+
+
+# piramide.npy: todos los niveles concatenados en un arreglo estructurado
+# (memory-mappable); piramide.json: canales y filas de cada nivel
+PYRAMID_NAME = 'piramide.npy'
+PYRAMID_INDEX = 'piramide.json'
+PYRAMID_CHANNELS = ['ecg_voltage', 'temperature', 'ecg_change_percent', 'temp_change_celsius', 'bpm']
+
+
+class SessionPyramid:
+    """Pirámide multirresolución (mínimo, máximo y promedio por bucket)
+
+    El nivel 1 agrupa `factor` muestras por bucket y cada nivel siguiente
+    agrupa `factor` buckets del anterior. Una consulta de rango elige el
+    nivel más grueso que todavía tiene al menos los puntos pedidos en el
+    rango, lee solo esos buckets del archivo mapeado en memoria (menos de
+    `factor` veces los puntos pedidos) y los reagrupa en exactamente esa
+    cantidad: el costo depende de los puntos devueltos, no de la duración de
+    la sesión. Si ni el nivel 1 llega a los puntos pedidos, `query` devuelve
+    None y se usan los datos originales.
+    """
+
+    def __init__(self, levels, channels, factor, samples):
+        self.levels = levels          # Lista de arreglos estructurados, del más fino al más grueso
+        self.channels = channels
+        self.factor = factor
+        self.samples = samples        # Muestras originales
+
+    @staticmethod
+    def dtype(channels):
+        fields = [('t_inicio', '<f8'), ('t_fin', '<f8'), ('muestras', '<u4')]
+        for name in channels:
+            fields += [(f'{name}_min', '<f8'), (f'{name}_max', '<f8'), (f'{name}_mean', '<f8')]
+        return np.dtype(fields)
+
+    @classmethod
+    def from_columns(cls, columns, channels=PYRAMID_CHANNELS, factor=4, time_name='timestamp'):
+        times = np.asarray(columns[time_name], dtype=np.float64)
+        dtype = cls.dtype(channels)
+        levels = []
+
+        # Nivel 1: buckets de `factor` muestras
+        starts = np.arange(0, len(times), factor)
+        level = np.empty(len(starts), dtype=dtype)
+        if len(starts):
+            level['t_inicio'] = times[starts]
+            level['t_fin'] = times[np.minimum(starts + factor, len(times)) - 1]
+            level['muestras'] = np.diff(np.append(starts, len(times)))
+            for name in channels:
+                values = np.asarray(columns[name], dtype=np.float64)
+                level[f'{name}_min'] = np.minimum.reduceat(values, starts)
+                level[f'{name}_max'] = np.maximum.reduceat(values, starts)
+                level[f'{name}_mean'] = np.add.reduceat(values, starts) / level['muestras']
+        levels.append(level)
+
+        # Niveles siguientes a partir del anterior, hasta que quepa en un bucket
+        while len(level) > factor:
+            level = cls._merge(level, np.arange(0, len(level), factor), channels)
+            levels.append(level)
+
+        return cls(levels, list(channels), factor, len(times))
+
+    @staticmethod
+    def _merge(level, starts, channels):
+        """Buckets que agrupan los de `level` desde cada índice de `starts`"""
+        ends = np.append(starts[1:], len(level)) - 1
+        merged = np.empty(len(starts), dtype=level.dtype)
+        merged['t_inicio'] = level['t_inicio'][starts]
+        merged['t_fin'] = level['t_fin'][ends]
+        counts = np.add.reduceat(level['muestras'].astype(np.float64), starts)
+        merged['muestras'] = counts
+        for name in channels:
+            merged[f'{name}_min'] = np.minimum.reduceat(level[f'{name}_min'], starts)
+            merged[f'{name}_max'] = np.maximum.reduceat(level[f'{name}_max'], starts)
+            # Promedio ponderado por muestras (el último bucket puede estar incompleto)
+            weighted = level[f'{name}_mean'] * level['muestras']
+            merged[f'{name}_mean'] = np.add.reduceat(weighted, starts) / counts
+        return merged
+
+    def save(self, folder):
+        """Guarda la pirámide; el índice se escribe al final (marca que está completa)"""
+        path = os.path.join(folder, PYRAMID_NAME)
+        index_path = os.path.join(folder, PYRAMID_INDEX)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            np.save(f, np.concatenate(self.levels))
+        os.replace(temporary, path)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({
+                'canales': self.channels,
+                'factor': self.factor,
+                'muestras': self.samples,
+                'filas_por_nivel': [len(level) for level in self.levels]
+            }, f, ensure_ascii=False)
+        os.replace(index_path + '.tmp', index_path)
+
+    @classmethod
+    def build(cls, folder, columns=None):
+        """Construye y guarda la pirámide de una sesión (desde sus archivos si no se pasan columnas)"""
+        if columns is None:
+            columns = SessionColumns.load_columns(folder)
+        pyramid = cls.from_columns(columns)
+        pyramid.save(folder)
+        return pyramid
+
+    @classmethod
+    def load(cls, folder):
+        """Pirámide mapeada en memoria, o None si la sesión no tiene una"""
+        index_path = os.path.join(folder, PYRAMID_INDEX)
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+        data = np.load(os.path.join(folder, PYRAMID_NAME), mmap_mode='r')
+        bounds = np.cumsum([0] + index['filas_por_nivel'])
+        levels = [data[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+        return cls(levels, index['canales'], index['factor'], index['muestras'])
+
+    def query(self, start=None, end=None, max_points=1000, channels=None):
+        """Exactamente max_points buckets (o los que haya) dentro de [start, end]
+
+        Devuelve (nivel, columnas) con 'timestamp' (centro del bucket), el
+        promedio de cada canal con su nombre y sus extremos como
+        '<canal>_min'/'<canal>_max'; o None si conviene usar las muestras.
+        """
+        channels = self.channels if channels is None else channels
+        chosen = None
+        for number, level in enumerate(self.levels, start=1):
+            lo = 0 if start is None else int(np.searchsorted(level['t_fin'], start, side='left'))
+            hi = len(level) if end is None else int(np.searchsorted(level['t_inicio'], end, side='right'))
+            if hi - lo < max_points:
+                break
+            chosen = number, lo, hi
+        if chosen is None:
+            return None   # Las muestras originales del rango alcanzan para la resolución pedida
+
+        number, lo, hi = chosen
+        buckets = np.asarray(self.levels[number - 1][lo:hi])
+        # Reagrupar en max_points buckets de tamaño casi igual
+        starts = np.floor(np.linspace(0, len(buckets), max_points, endpoint=False)).astype(np.int64)
+        buckets = self._merge(buckets, starts, channels)
+        columns = {'timestamp': (buckets['t_inicio'] + buckets['t_fin']) / 2}
+        for name in channels:
+            columns[name] = buckets[f'{name}_mean']
+            columns[f'{name}_min'] = buckets[f'{name}_min']
+            columns[f'{name}_max'] = buckets[f'{name}_max']
+        return number, columns
+
+if __name__ == '__main__':
+    # Construye las pirámides de las sesiones guardadas que aún no la tienen:
+    #   python SessionPyramid.py [carpeta_sessions]
+    root = sys.argv[1] if len(sys.argv) > 1 else 'sessions'
+    for name in sorted(os.listdir(root)):
+        folder = os.path.join(root, name)
+        if os.path.exists(os.path.join(folder, 'datos_sensores.csv')) and SessionPyramid.load(folder) is None:
+            pyramid = SessionPyramid.build(folder)
+            print(f"✓ {name}: {len(pyramid.levels)} niveles ({pyramid.samples} muestras)")
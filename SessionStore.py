@@ -0,0 +1,174 @@
+import numpy as np
+
+from Downsampler import downsample
+
+
+# Columnas de datos_sensores.csv con su tipo en memoria
+SENSOR_SCHEMA = [
+    ('timestamp', np.float64),
+    ('ecg_raw', np.int32),
+    ('ecg_voltage', np.float64),
+    ('temperature', np.float64),
+    ('ecg_change_percent', np.float64),
+    ('temp_change_celsius', np.float64),
+    ('bpm', np.int16),
+    ('device_time', np.float64),   # Segundos en el reloj del Arduino (base de tiempo)
+]
+
+
+class SessionStore:
+    """Almacén columnar en memoria para los puntos de una sesión
+
+    Cada columna es un arreglo NumPy tipado que crece al doble cuando se
+    llena (append en O(1) amortizado). Un punto ocupa ~46 bytes frente a los
+    cientos de bytes de un dict de Python, y las estadísticas, la exportación
+    a CSV y el diezmado para gráficas trabajan sobre rebanadas de columnas.
+    """
+
+    def __init__(self, schema=SENSOR_SCHEMA, initial_capacity=1024):
+        self.schema = list(schema)
+        self.names = [name for name, _ in self.schema]
+        self._capacity = max(1, int(initial_capacity))
+        self._columns = {name: np.empty(self._capacity, dtype=dtype) for name, dtype in self.schema}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @classmethod
+    def from_csv(cls, path):
+        """Carga un datos_sensores.csv guardado (las columnas que falten quedan en 0)
+
+        Las sesiones anteriores al reloj del dispositivo no tienen device_time:
+        se usa el timestamp relativo al inicio.
+        """
+        with open(path, encoding='utf-8') as f:
+            header = f.readline().strip().split(',')
+        data = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+        store = cls(initial_capacity=len(data))
+        columns = {name: data[:, i] for i, name in enumerate(header) if name in store.names}
+        if 'device_time' not in columns and 'timestamp' in columns:
+            columns['device_time'] = columns['timestamp'] - (columns['timestamp'][0] if len(data) else 0.0)
+        store.extend({name: columns.get(name, 0) for name in store.names})
+        return store
+
+    @property
+    def nbytes(self):
+        return sum(column[:self._count].nbytes for column in self._columns.values())
+
+    def append(self, point):
+        """Agrega un punto (dict con una clave por columna)"""
+        if self._count == self._capacity:
+            self._grow()
+        i = self._count
+        for name in self.names:
+            self._columns[name][i] = point[name]
+        self._count = i + 1
+
+    def extend(self, columns):
+        """Agrega varias filas de una vez (dict de columnas o arreglo estructurado)"""
+        count = len(columns[self.names[0]])
+        while self._count + count > self._capacity:
+            self._grow()
+        for name in self.names:
+            self._columns[name][self._count:self._count + count] = columns[name]
+        self._count += count
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(self._capacity, dtype=column.dtype)
+            grown[:self._count] = column[:self._count]
+            self._columns[name] = grown
+
+    def column(self, name, start=0, end=None):
+        """Vista (sin copia) de una columna entre las filas start y end"""
+        end = self._count if end is None else min(end, self._count)
+        return self._columns[name][start:end]
+
+    def columns(self, start=0, end=None):
+        return {name: self.column(name, start, end) for name in self.names}
+
+    def point(self, index):
+        """Reconstruye un punto como dict (para compatibilidad)"""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return {name: self._columns[name][index].item() for name in self.names}
+
+    def __getitem__(self, index):
+        return self.point(index)
+
+    def stats(self, name):
+        """Promedio, mínimo, máximo y desviación (poblacional) de una columna"""
+        values = self.column(name)
+        if len(values) == 0:
+            return None
+        return {
+            'promedio': float(values.mean()),
+            'minimo': values.min().item(),
+            'maximo': values.max().item(),
+            'desviacion': float(values.std())
+        }
+
+    def decimate(self, max_points, names=None, channels=('ecg_voltage', 'temperature', 'bpm'),
+                 method='lttb'):
+        """Columnas reducidas a ~max_points puntos conservando picos y extremos de `channels`"""
+        names = self.names if names is None else names
+        columns = {name: self.column(name) for name in set(names) | set(channels) | {'timestamp'}}
+        reduced = downsample(columns, max_points, list(channels), method=method)
+        return {name: reduced[name] for name in names}
+
+    def resample(self, sample_rate, names=None, time_name='device_time', max_gap=None):
+        """Columnas remuestreadas sobre una grilla uniforme del tiempo del dispositivo
+
+        Las columnas de punto flotante se interpolan linealmente; las enteras
+        (ecg_raw, bpm) conservan el valor de la última muestra. Si se indica
+        `max_gap` (s), los puntos de la grilla que caen dentro de un hueco
+        más largo quedan en NaN (o -1 en las columnas enteras).
+        """
+        names = [name for name in (self.names if names is None else names) if name != time_name]
+        times = self.column(time_name)
+        if len(times) < 2:
+            return {time_name: times.copy(), **{name: self.column(name).copy() for name in names}}
+
+        grid = np.arange(times[0], times[-1] + 0.5 / sample_rate, 1.0 / sample_rate)
+        # Índice de la muestra anterior a cada punto de la grilla
+        previous = np.clip(np.searchsorted(times, grid, side='right') - 1, 0, len(times) - 1)
+        in_gap = None
+        if max_gap is not None:
+            following = np.minimum(previous + 1, len(times) - 1)
+            # Tolerancia de 1 µs: un punto de la grilla que coincide con la muestra
+            # que abre el hueco (salvo redondeo) conserva su valor
+            in_gap = ((times[following] - times[previous]) > max_gap) & (grid - times[previous] > 1e-6)
+
+        resampled = {time_name: grid}
+        for name in names:
+            values = self.column(name)
+            if np.issubdtype(values.dtype, np.floating):
+                column = np.interp(grid, times, values)
+                if in_gap is not None:
+                    column[in_gap] = np.nan
+            else:
+                column = values[previous]
+                if in_gap is not None:
+                    column = column.copy()
+                    column[in_gap] = -1
+            resampled[name] = column
+        return resampled
+
+    def format_rows(self, start=0, end=None, names=None):
+        """Filas CSV (texto) de un rango, formateadas columna por columna"""
+        names = self.names if names is None else names
+        end = self._count if end is None else min(end, self._count)
+        if end <= start:
+            return ''
+
+        rows = self._columns[names[0]][start:end].astype(str)
+        for name in names[1:]:
+            rows = np.char.add(np.char.add(rows, ','), self._columns[name][start:end].astype(str))
+        return '\r\n'.join(rows.tolist()) + '\r\n'
+
+    def clear(self):
+        self._count = 0
@@ -0,0 +1,128 @@
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from SessionStore import SENSOR_SCHEMA
+
+
+# sesion.wal: registro binario de solo-agregado de una sesión
+#   encabezado: b'BWAL' + versión (uint16) + reservado (uint16)
+#   registros:  tipo (uint8) + 3 reservados + largo (uint32) + crc32 (uint32) + datos
+#     ROWS  → filas de ROW_DTYPE (columnas de SENSOR_SCHEMA, little-endian)
+#     EVENT → JSON en UTF-8 (cambios de fase)
+# Un registro con CRC inválido o incompleto marca el final útil del archivo
+# (corte de luz a mitad de una escritura): se trunca ahí al recuperar.
+WAL_NAME = 'sesion.wal'
+CHECKPOINT_NAME = 'checkpoint.json'
+WAL_MAGIC = b'BWAL'
+WAL_VERSION = 1
+FILE_HEADER = struct.Struct('<4sHxx')
+RECORD_HEADER = struct.Struct('<BxxxII')
+ROWS, EVENT = 1, 2
+ROW_DTYPE = np.dtype([(name, np.dtype(dtype).newbyteorder('<')) for name, dtype in SENSOR_SCHEMA])
+
+
+class SessionWAL:
+    """Registro de escritura anticipada (WAL) con checkpoints de la sesión
+
+    El `SessionWriter` agrega aquí cada lote de filas antes de escribir el
+    CSV, y cada pocos segundos guarda en checkpoint.json (reemplazo atómico)
+    las estadísticas acumuladas junto con los tamaños del WAL y del CSV en
+    ese instante. Para recuperar una sesión basta leer el checkpoint y
+    recorrer solo los registros posteriores: el tiempo de recuperación
+    depende del intervalo de checkpoint, no de la duración de la sesión.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        if append and os.path.exists(path):
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(FILE_HEADER.pack(WAL_MAGIC, WAL_VERSION))
+            self._file.flush()
+
+    @property
+    def offset(self):
+        return self._file.tell()
+
+    def _append(self, kind, payload):
+        self._file.write(RECORD_HEADER.pack(kind, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+
+    def append_rows(self, columns):
+        """Agrega un lote de filas (dict de columnas del mismo largo)"""
+        count = len(next(iter(columns.values())))
+        if count == 0:
+            return
+        rows = np.empty(count, dtype=ROW_DTYPE)
+        for name in ROW_DTYPE.names:
+            rows[name] = columns[name]
+        self._append(ROWS, rows.tobytes())
+
+    def append_event(self, event):
+        self._append(EVENT, json.dumps(event, ensure_ascii=False).encode('utf-8'))
+
+    def sync(self, fsync=True):
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
+
+    @staticmethod
+    def scan(path, start=FILE_HEADER.size):
+        """Registros válidos desde `start`
+
+        Devuelve (arreglo de filas, lista de eventos, fin válido en bytes).
+        """
+        with open(path, 'rb') as f:
+            if start < FILE_HEADER.size:
+                start = FILE_HEADER.size
+            magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+            if magic != WAL_MAGIC or version != WAL_VERSION:
+                raise ValueError(f"{path} no es un WAL de sesión válido")
+            f.seek(start)
+            data = f.read()
+
+        rows, events = [], []
+        position = 0
+        while len(data) - position >= RECORD_HEADER.size:
+            kind, length, crc = RECORD_HEADER.unpack_from(data, position)
+            body_start = position + RECORD_HEADER.size
+            payload = data[body_start:body_start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            if kind == ROWS:
+                rows.append(np.frombuffer(payload, dtype=ROW_DTYPE))
+            elif kind == EVENT:
+                events.append(json.loads(payload.decode('utf-8')))
+            position = body_start + length
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=ROW_DTYPE)
+        return rows, events, start + position
+
+    @staticmethod
+    def write_checkpoint(folder, state):
+        """Guarda el checkpoint de forma atómica (archivo temporal + os.replace)"""
+        path = os.path.join(folder, CHECKPOINT_NAME)
+        temporary = path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    @staticmethod
+    def read_checkpoint(folder):
+        path = os.path.join(folder, CHECKPOINT_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
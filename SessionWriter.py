@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from DeviceClock import DeviceClock
+from SessionWAL import SessionWAL
+
+
+class SessionWriter:
+    """Escribe datos_sensores.csv en segundo plano, por lotes, mientras dura la sesión
+
+    El hilo escritor toma periódicamente las filas nuevas del `SessionStore`
+    y las vuelca al archivo formateadas columna por columna.
+
+    Con un `SessionWAL`, cada lote (y cada cambio de fase) se agrega primero
+    al WAL y cada `checkpoint_interval` segundos se guarda un checkpoint con
+    las estadísticas acumuladas hasta ese lote (`snapshot()` las devuelve
+    junto con la cantidad de filas, tomadas de forma consistente). Con
+    `resume` (estado devuelto por la recuperación) se continúa una sesión
+    interrumpida agregando a los archivos existentes.
+
+    Política de fsync:
+      - 'batch': fsync después de cada lote (ante un corte se pierde como
+        máximo el lote en curso)
+      - 'close': fsync solo al cerrar la sesión
+      - 'never': se deja la sincronización al sistema operativo
+    """
+
+    FSYNC_POLICIES = ('batch', 'close', 'never')
+
+    def __init__(self, path, store, flush_interval=1.0, fsync_policy='batch',
+                 wal=None, snapshot=None, checkpoint_interval=5.0, sample_rate=10, resume=None):
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync no válida: {fsync_policy}")
+
+        self.path = path
+        self.store = store
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.points_written = 0
+
+        self.wal = wal
+        self.snapshot = snapshot
+        self.checkpoint_interval = checkpoint_interval
+        self.period = 1.0 / sample_rate
+        self.resume = resume
+        self.row_offset = resume['filas'] if resume else 0   # Filas anteriores a la reanudación
+        self._events_logged = len(resume['cambios_fase']) if resume else 0
+        self._first_device_time = None
+        self._last_device_time = None
+        self._gaps = {'cantidad': 0, 'muestras_perdidas': 0, 'duracion_total_segundos': 0.0}
+        self._last_checkpoint = 0.0
+
+        self._closing = threading.Event()
+        self._thread = None
+        self._file = None
+        self.error = None
+
+    def start(self):
+        """Crea el archivo con su encabezado y arranca el hilo escritor"""
+        if self.resume:
+            self._file = open(self.path, 'ab')
+        else:
+            self._file = open(self.path, 'wb')
+            self._file.write((','.join(self.store.names) + '\r\n').encode('utf-8'))
+        self._file.flush()
+        if self.wal:
+            # Checkpoint inicial: la sesión es recuperable desde el primer lote
+            self._flush(sync=True, checkpoint=True)
+
+        self._thread = threading.Thread(target=self._run, name='session-writer')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self, timeout=None):
+        """Escribe el último lote y cierra el archivo"""
+        if self._thread is None:
+            return
+        self._closing.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        try:
+            closing = False
+            while not closing:
+                closing = self._closing.wait(self.flush_interval)
+                checkpoint = closing or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+                self._flush(sync=self.fsync_policy == 'batch', checkpoint=checkpoint)
+        except Exception as e:
+            self.error = e
+            print(f"✗ Error escribiendo {self.path}: {e}")
+        finally:
+            if self.fsync_policy != 'never' and not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            if self.wal:
+                self.wal.close()
+
+    def _flush(self, sync, checkpoint=False):
+        if self.snapshot:
+            end, state = self.snapshot()
+        else:
+            end, state = len(self.store), None
+
+        start = self.points_written
+        if self.wal:
+            # Primero el WAL: si se corta aquí, el CSV se reconstruye desde él
+            for event in state['cambios_fase'][self._events_logged:]:
+                self.wal.append_event(event)
+            self._events_logged = len(state['cambios_fase'])
+            if end > start:
+                self.wal.append_rows(self.store.columns(start, end))
+            self.wal.sync(fsync=sync)
+
+        if end > start:
+            self._track_gaps(self.store.column('device_time', start, end))
+            self._file.write(self.store.format_rows(start, end).encode('utf-8'))
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+            self.points_written = end
+
+        if self.wal and checkpoint:
+            self._write_checkpoint(state)
+
+    def _track_gaps(self, device_time):
+        if self._first_device_time is None:
+            self._first_device_time = float(device_time[0])
+        else:
+            device_time = np.concatenate(([self._last_device_time], device_time))
+        gaps = DeviceClock.gap_summary(device_time, self.period)
+        for key, value in gaps.items():
+            self._gaps[key] += value
+        self._last_device_time = float(device_time[-1])
+
+    def _write_checkpoint(self, state):
+        base = self.resume or {}
+        segment = 0.0
+        if self._first_device_time is not None:
+            segment = self._last_device_time - self._first_device_time + self.period
+        gaps = dict(self._gaps)
+        for key, value in base.get('huecos', {}).items():
+            gaps[key] += value
+
+        SessionWAL.write_checkpoint(os.path.dirname(self.path), {
+            'filas': self.row_offset + self.points_written,
+            'wal_bytes': self.wal.offset,
+            'csv_bytes': self._file.tell(),
+            # Duración de los tramos anteriores + el tramo actual (el reloj del
+            # Arduino puede reiniciarse entre tramos)
+            'duracion_segundos': base.get('duracion_segundos', 0.0) + segment,
+            # Último tiempo del tramo actual (None si aún no tiene filas)
+            'ultimo_device_time': self._last_device_time,
+            'huecos': gaps,
+            **state
+        })
+        self._last_checkpoint = time.monotonic()
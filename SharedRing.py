@@ -0,0 +1,100 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Posiciones del encabezado (int64) del buffer compartido
+HEADER_SLOTS = 8
+COUNT, READS, MISSED, DROPPED, JITTER_MEAN_US, JITTER_MAX_US = range(6)
+
+
+class SharedRing:
+    """Buffer circular en memoria compartida: un proceso escritor, una copia por lectura
+
+    La memoria contiene un encabezado de enteros (el primero es el total de
+    filas escritas; el resto queda para contadores del escritor) seguido de
+    una matriz float64 `capacity x len(fields)`. El escritor publica cada fila
+    incrementando el contador después de escribirla; los lectores llevan su
+    propia posición y copian las filas nuevas de una vez (una sola copia por
+    lectura, como arreglo estructurado con un campo por columna), sin pasar
+    por objetos de Python. No se entregan vistas: el escritor reutiliza esas
+    filas al dar la vuelta al buffer.
+
+    No hay bloqueo entre procesos: como en un seqlock, el lector vuelve a
+    leer el contador después de copiar y descarta las filas que el escritor
+    pudo haber sobrescrito mientras tanto.
+    """
+
+    def __init__(self, fields, capacity=4096, name=None, create=False):
+        self.fields = list(fields)
+        self.capacity = int(capacity)
+        header_bytes = HEADER_SLOTS * 8
+        size = header_bytes + self.capacity * len(self.fields) * 8
+
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self._shm.name
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self._shm.buf)
+        self.data = np.ndarray((self.capacity, len(self.fields)), dtype=np.float64,
+                               buffer=self._shm.buf, offset=header_bytes)
+        self.row_dtype = np.dtype([(field, np.float64) for field in self.fields])
+        self.rows = self.data.view(self.row_dtype).reshape(self.capacity)
+        if create:
+            self.header[:] = 0
+
+    @classmethod
+    def create(cls, fields, capacity=4096):
+        return cls(fields, capacity, create=True)
+
+    @classmethod
+    def attach(cls, name, fields, capacity):
+        return cls(fields, capacity, name=name)
+
+    @property
+    def count(self):
+        return int(self.header[COUNT])
+
+    def write(self, point):
+        """Escribe una fila (dict con una clave por campo) y la publica"""
+        count = int(self.header[COUNT])
+        row = self.data[count % self.capacity]
+        for i, field in enumerate(self.fields):
+            row[i] = point[field]
+        self.header[COUNT] = count + 1
+
+    def read_since(self, position):
+        """Filas publicadas desde `position`
+
+        Devuelve (filas, nueva_posición, perdidas): una copia estructurada de
+        las filas en orden cronológico. Si el lector se atrasó más que la
+        capacidad, o el escritor alcanzó alguna fila mientras se copiaba, esas
+        filas se cuentan como perdidas y no se entregan.
+        """
+        count = self.count
+        lost = max(0, count - position - self.capacity)
+        position += lost
+        if position >= count:
+            return np.empty(0, dtype=self.row_dtype), count, lost
+
+        start = position % self.capacity
+        end = start + (count - position)
+        if end <= self.capacity:
+            rows = self.rows[start:end].copy()
+        else:
+            rows = np.concatenate((self.rows[start:], self.rows[:end - self.capacity]))
+
+        # La fila `c - capacity` comparte lugar con la que el escritor está escribiendo (la `c`)
+        overwritten = min(self.count - self.capacity + 1 - position, len(rows))
+        if overwritten > 0:
+            rows = rows[overwritten:]
+            lost += overwritten
+        return rows, count, lost
+
+    def close(self):
+        # Soltar las vistas antes de cerrar el mapeo
+        self.header = None
+        self.data = None
+        self.rows = None
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
@@ -0,0 +1,290 @@
+import threading
+import time
+import uuid
+
+from BioSensorSystem import BioSensorSystem
+from AcquisitionScheduler import AcquisitionScheduler
+from AcquisitionProcess import AcquisitionProcess, row_to_point
+from SampleBatcher import SampleBatcher
+
+
+class Station:
+    """Una estación de medición: un participante con su Arduino (o flujo demo)
+
+    Reúne el estado que antes eran variables globales de app.py
+    (bio_system, acquisition, is_streaming, current_phase, Hamilton PRE...)
+    y su propio hilo de adquisición. Todo lo que emite va a la sala de
+    Socket.IO de la estación a través de `emit(evento, datos)`.
+    """
+
+    def __init__(self, emit, port=None, demo_mode=None, sample_rate=10,
+                 acquisition_mode='thread', emit_mode='batch', batch_samples=50, batch_ms=100,
+                 finalizer=None):
+        self.session_id = uuid.uuid4().hex[:8]
+        self.room = f'station:{self.session_id}'
+        self.emit = emit
+        self.port = port
+        self.acquisition_mode = acquisition_mode
+        self.emit_mode = emit_mode
+        self.batch_samples = batch_samples
+        self.batch_ms = batch_ms
+        self.finalizer = finalizer   # SessionFinalizer compartido (None: guardar en línea)
+        self.hrv_interval = 1.0      # Segundos entre eventos 'hrv_update'
+
+        self.bio_system = BioSensorSystem(sample_rate=sample_rate, port=port)
+        if demo_mode is not None:   # None: se respeta el MODO DEMO de BioSensorSystem
+            self.bio_system.DEMO_MODE = demo_mode
+        self.acquisition = None
+        self.is_streaming = False
+        self.current_phase = 'idle'
+        self.hamilton_pre = None
+        self.demographics_data = None
+        self._stream_thread = None
+
+    @property
+    def demo_mode(self):
+        return self.bio_system.DEMO_MODE
+
+    def set_port(self, port):
+        self.port = port
+        self.bio_system.port = port
+
+    def connect(self):
+        """Abre el puerto (o el proceso de adquisición); True si se conectó"""
+        bio_system = self.bio_system
+        if self.acquisition_mode == 'process':
+            # El proceso hijo abre el puerto y muestrea durante toda la sesión
+            self.acquisition = AcquisitionProcess(demo_mode=bio_system.DEMO_MODE,
+                                                  sample_rate=bio_system.sample_rate,
+                                                  port=self.port).start()
+            bio_system.connected = self.acquisition.wait_ready()
+            if bio_system.connected:
+                bio_system.set_sample_rate(self.acquisition.sample_rate)
+            else:
+                self.acquisition.stop()
+                self.acquisition = None
+        else:
+            bio_system.connect()
+            self.port = bio_system.port
+
+        if bio_system.connected:
+            self.current_phase = 'connected'
+        return bio_system.connected
+
+    def save_hamilton_pre(self, data):
+        self.hamilton_pre = data
+        self.demographics_data = data.get('demographics', {})
+
+    def start_baseline(self, duration):
+        """Calcula el baseline en segundo plano y emite 'baseline_complete'"""
+        self.current_phase = 'baseline'
+
+        def calculate_baseline():
+            try:
+                if self.acquisition_mode == 'process':
+                    baseline = self.bio_system.set_baseline(duration=duration, source=self.acquisition)
+                    self.acquisition.set_baseline(baseline['ecg'], baseline['temperature'])
+                else:
+                    baseline = self.bio_system.set_baseline(duration=duration)
+
+                self.emit('baseline_complete', {
+                    'baseline_ecg': baseline['ecg'],
+                    'baseline_temp': baseline['temperature'],
+                    'baseline_bpm': baseline['bpm']
+                })
+
+                print(f"✓ [{self.session_id}] Baseline calculado: ECG={baseline['ecg']:.4f}V, "
+                      f"Temp={baseline['temperature']:.2f}°C, BPM={baseline['bpm']:.0f}")
+
+            except Exception as e:
+                print(f"✗ [{self.session_id}] Error en baseline: {e}")
+                self.emit('error', {'message': f'Error en baseline: {str(e)}'})
+
+        thread = threading.Thread(target=calculate_baseline, name=f'baseline-{self.session_id}')
+        thread.daemon = True
+        thread.start()
+
+    def start_session(self, phase):
+        """Inicia la grabación y el hilo que guarda y emite las muestras"""
+        self.current_phase = phase
+        session_folder = self.bio_system.start_session(
+            demographics=self.demographics_data,
+            hamilton_data=self.hamilton_pre,
+            phase=phase
+        )
+        print(f"✓ [{self.session_id}] Sesión iniciada en: {session_folder}")
+        self._start_streaming()
+        return session_folder
+
+    def resume_session(self, folder, phase=None):
+        """Continúa una sesión interrumpida (caída del servidor) en su misma carpeta"""
+        session_folder = self.bio_system.resume_session(folder, phase=phase)
+        hamilton = self.bio_system.hamilton_data
+        self.hamilton_pre = hamilton
+        self.demographics_data = hamilton['demographics']
+        self.current_phase = self.bio_system.current_phase
+        print(f"✓ [{self.session_id}] Sesión reanudada en: {session_folder}")
+        self._start_streaming()
+        return session_folder
+
+    def _start_streaming(self):
+        # La lectura de sensores corre en su propio hilo (o proceso) con plazos fijos;
+        # el hilo de streaming solo consume las muestras (guardar y emitir)
+        if self.acquisition_mode == 'process':
+            self.acquisition.skip_to_latest()
+        else:
+            self.acquisition = AcquisitionScheduler(self.bio_system.read_sensor_batch,
+                                                    period=self.bio_system.acquisition_period,
+                                                    name=f'acquisition-{self.session_id}').start()
+
+        self.is_streaming = True
+        self._stream_thread = threading.Thread(target=self._stream_data, name=f'stream-{self.session_id}')
+        self._stream_thread.daemon = True
+        self._stream_thread.start()
+
+    def _stream_data(self):
+        print(f"🎬 [{self.session_id}] Streaming iniciado...")
+
+        acquisition = self.acquisition
+        batcher = SampleBatcher(self.batch_samples, self.batch_ms / 1000) if self.emit_mode == 'batch' else None
+        next_hrv = time.monotonic() + self.hrv_interval
+
+        while self.is_streaming:
+            try:
+                # Con un lote pendiente se espera solo hasta que venza
+                pending = batcher.time_left() if batcher else None
+                data = acquisition.get(timeout=0.5 if pending is None else pending)
+                self._consume(acquisition, data, batcher)
+
+                # VFC a ritmo acotado, sin importar la frecuencia de muestreo
+                if time.monotonic() >= next_hrv:
+                    next_hrv = time.monotonic() + self.hrv_interval
+                    self.emit('hrv_update', self.bio_system.hrv.metrics())
+
+            except Exception as e:
+                # Una muestra defectuosa no corta el resto de la sesión
+                print(f"Error en streaming [{self.session_id}]: {e}")
+                continue
+
+        # Lo que quedó en la cola pertenece a la sesión: se guarda antes de cerrar el CSV
+        if self.acquisition_mode != 'process':
+            acquisition.stop()
+        while True:
+            try:
+                data = acquisition.get(timeout=0)
+                if data is None:
+                    break
+                self._consume(acquisition, data, batcher)
+            except Exception as e:
+                print(f"Error en streaming [{self.session_id}]: {e}")
+
+        if batcher is not None and len(batcher):
+            self.emit('sensor_batch', batcher.flush())
+
+        print(f"🛑 [{self.session_id}] Streaming detenido. Total de puntos: {len(self.bio_system.session_data)}")
+        print(f"  Adquisición: {acquisition.stats()}")
+
+    def _consume(self, acquisition, data, batcher):
+        """Guarda una muestra (o None) y emite lo que corresponda"""
+        if self.acquisition_mode == 'process':
+            # Los picos R los detecta el hijo; aquí solo alimentan la VFC
+            for event in acquisition.peak_events():
+                self.bio_system.hrv.on_peak(event)
+
+        # En modo 'process' las muestras son filas estructuradas, no dicts
+        if data is not None:
+            self.bio_system.add_data_point(data)  # ← GUARDAR DATOS
+            if batcher is None:
+                self.emit('sensor_data', row_to_point(data) if self.acquisition_mode == 'process' else data)
+
+        if batcher is not None:
+            payload = batcher.add(data) if data is not None else batcher.poll()
+            if payload:
+                self.emit('sensor_batch', payload)
+
+    def stop_session(self):
+        """Detiene la grabación; devuelve (resumen, datos diezmados para las gráficas)
+
+        Con un finalizador, los archivos se terminan de escribir en segundo
+        plano y se emiten 'finalization_progress' y 'session_finalized'.
+        """
+        self.is_streaming = False
+        self.current_phase = 'analysis'
+        if self._stream_thread is not None:
+            # Las muestras en cola y el último lote se guardan antes de cerrar el CSV
+            self._stream_thread.join(timeout=2.0)
+            self._stream_thread = None
+
+        folder = self.bio_system.session_folder
+
+        def on_progress(step, done, total):
+            self.emit('finalization_progress', {
+                'session_id': self.session_id,
+                'paso': step,
+                'completados': done,
+                'total': total
+            })
+
+        def on_done(error):
+            self.emit('session_finalized', {
+                'success': error is None,
+                'session_id': self.session_id,
+                'session_folder': folder,
+                'error': str(error) if error else None
+            })
+
+        summary = self.bio_system.stop_session(self.finalizer, on_progress, on_done)
+
+        chart_data = []
+        if self.bio_system.session_data:
+            # Diezmado sobre rebanadas de columnas (~120 puntos)
+            chart_columns = self.bio_system.session_data.decimate(120, names=[
+                'timestamp', 'ecg_voltage', 'temperature',
+                'ecg_change_percent', 'temp_change_celsius', 'bpm'
+            ])
+            names = list(chart_columns)
+            values = [chart_columns[name].tolist() for name in names]
+            chart_data = [dict(zip(names, row)) for row in zip(*values)]
+
+        print(f"✓ [{self.session_id}] Sesión detenida. Guardando en: {folder}")
+        return summary, chart_data
+
+    def set_phase(self, phase):
+        self.current_phase = phase
+        # Los puntos siguientes se acumulan en las estadísticas de la nueva fase
+        if self.bio_system.session_active:
+            self.bio_system.set_phase(phase)
+
+    def reset(self):
+        """Vuelve al estado inicial sin cerrar la estación"""
+        self.is_streaming = False
+        self.current_phase = 'idle'
+        self.hamilton_pre = None
+        self.demographics_data = None
+
+    def close(self):
+        """Detiene la adquisición y libera el puerto"""
+        self.reset()
+        if self._stream_thread is not None:
+            self._stream_thread.join(timeout=2.0)
+            self._stream_thread = None
+        if self.acquisition:
+            self.acquisition.stop()
+            self.acquisition = None
+        self.bio_system.disconnect()
+
+    def status(self):
+        bio_system = self.bio_system
+        return {
+            'session_id': self.session_id,
+            'port': self.port,
+            'demo': bio_system.DEMO_MODE,
+            'phase': self.current_phase,
+            'connected': bio_system.connected,
+            'sample_rate': bio_system.sample_rate,
+            'session_folder': bio_system.session_folder,
+            'acquisition': self.acquisition.stats() if self.acquisition else None,
+            'serial': bio_system.serial_stats(),
+            # En modo 'process' el reloj del dispositivo vive en el proceso hijo
+            'reloj': bio_system.device_clock.stats() if self.acquisition_mode != 'process' else None
+        }
@@ -1,19 +1,146 @@
-from flask import Flask, render_template, jsonify
-from flask_socketio import SocketIO, emit
-from BioSensorSystem import BioSensorSystem
+import math
+import os
 import threading
-import time
+from flask import Flask, render_template, jsonify, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from SessionManager import SessionManager
+from SessionColumns import SessionColumns
+from BroadcastHub import BroadcastHub, POLICIES
+from Downsampler import query_range, METHODS
+from SessionPyramid import SessionPyramid, PYRAMID_CHANNELS
+from SessionCatalog import SessionCatalog, HAMILTON_BANDS
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Variables globales
-bio_system = None
-is_streaming = False
-current_phase = 'idle'
-hamilton_pre = None
-demographics_data = None
+#! ADQUISICIÓN - 'thread': hilo dentro del servidor
+#! ADQUISICIÓN - 'process': proceso hijo con memoria compartida (aislado del tráfico web)
+ACQUISITION_MODE = 'thread'
+
+# Frecuencia de muestreo (Hz) del modo demo y del protocolo ASCII;
+# el protocolo binario usa la del Arduino (BINARY_SAMPLE_RATE)
+SAMPLE_RATE = 10
+
+#! EMISIÓN - 'sample': un mensaje JSON 'sensor_data' por muestra
+#! EMISIÓN - 'batch': lotes binarios 'sensor_batch' de hasta N muestras o T ms
+EMIT_MODE = 'batch'
+EMIT_BATCH_SAMPLES = 50
+EMIT_BATCH_MS = 100   # ~10 mensajes por segundo, independiente de SAMPLE_RATE
+
+# Observadores (pantalla del terapeuta, monitor de supervisión): reciben los
+# mismos eventos de una estación como 'observer_frame' (evento, trama), con
+# cada trama serializada una sola vez y control de flujo por cliente
+OBSERVER_MAX_IN_FLIGHT = 4
+OBSERVER_MAX_QUEUE = 32
+hub = BroadcastHub(
+    send=lambda sid, event, frame, callback: socketio.emit('observer_frame', (event, frame),
+                                                          to=sid, callback=callback),
+    disconnect=lambda sid: socketio.server.disconnect(sid),
+    max_in_flight=OBSERVER_MAX_IN_FLIGHT,
+    max_queue=OBSERVER_MAX_QUEUE
+)
+
+
+def broadcast(event, data, room):
+    socketio.emit(event, data, to=room)   # Cliente que controla la estación
+    hub.publish(room, event, data)        # Observadores
+
+
+# Estaciones (participante + Arduino o flujo demo) indexadas por session_id.
+# Cada una tiene su sala de Socket.IO; los eventos del navegador se aplican a
+# la estación que ese cliente inicializó (o a la indicada con 'session_id').
+sessions = SessionManager(broadcast)
+
+
+def station_options():
+    # Se leen al crear cada estación para respetar cambios en la configuración
+    return {
+        'sample_rate': SAMPLE_RATE,
+        'acquisition_mode': ACQUISITION_MODE,
+        'emit_mode': EMIT_MODE,
+        'batch_samples': EMIT_BATCH_SAMPLES,
+        'batch_ms': EMIT_BATCH_MS
+    }
+
+
+def current_station(data=None):
+    """Estación del cliente actual; emite 'error' si no hay ninguna"""
+    session_id = data.get('session_id') if isinstance(data, dict) else None
+    station = sessions.for_client(request.sid, session_id)
+    if station is None:
+        emit('error', {'message': 'Sistema no inicializado'})
+    return station
+
+
+# Consultas de rango para las gráficas: el navegador pide solo los puntos que puede dibujar
+SERIES_MAX_POINTS = 5000
+SERIES_CHANNELS = PYRAMID_CHANNELS
+
+
+def session_folder(session):
+    """Carpeta guardada de la sesión (solo dentro de sessions/, sin rutas arbitrarias)"""
+    if os.path.isdir('sessions') and session in os.listdir('sessions'):
+        folder = os.path.join('sessions', session)
+        if os.path.exists(os.path.join(folder, 'datos_sensores.csv')):
+            return folder
+    return None
+
+
+def session_columns(session):
+    """Columnas de una sesión: en memoria si es de una estación, si no mapeadas desde su carpeta"""
+    station = sessions.get(session)
+    if station is not None and len(station.bio_system.session_data):
+        return station.bio_system.session_data.columns()
+    folder = session_folder(session)
+    return SessionColumns.load_columns(folder) if folder else None
+
+
+def session_pyramid(session):
+    """Pirámide de una sesión terminada; las sesiones anteriores la construyen al pedirla"""
+    if sessions.get(session) is not None:
+        return None   # Sesión en curso: se consulta la memoria
+    folder = session_folder(session)
+    if folder is None or not os.path.exists(os.path.join(folder, 'resumen_sesion.json')):
+        return None
+    return SessionPyramid.load(folder) or SessionPyramid.build(folder)
+
+
+# Catálogo de sesiones para /api/sessions: una sola instancia, puesta al día al
+# arrancar con las carpetas que aún no tenía (las sesiones nuevas se agregan al finalizar)
+catalog = None
+catalog_lock = threading.Lock()
+
+
+def session_catalog():
+    global catalog
+    with catalog_lock:
+        if catalog is None:
+            catalog = SessionCatalog()
+            indexed = catalog.refresh()
+            if indexed:
+                print(f"✓ Catálogo: {indexed} sesiones indexadas")
+        return catalog
+
+
+def float_arg(name):
+    """Parámetro numérico opcional; ValueError si viene pero no es un número finito"""
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return None
+    value = float(raw)
+    if not math.isfinite(value):
+        raise ValueError(f'{name} no es un número finito')
+    return value
+
+
+def station_from_query():
+    session_id = request.args.get('session_id')
+    if session_id:
+        return sessions.get(session_id)
+    # Sin session_id solo es inequívoco si hay una única estación
+    stations = list(sessions)
+    return stations[0] if len(stations) == 1 else None
 
 @app.route('/')
 def index():
@@ -21,38 +148,135 @@ def index():
 
 @app.route('/api/status')
 def status():
+    station = station_from_query()
+    return jsonify({
+        'phase': station.current_phase if station else 'idle',
+        'connected': station is not None,
+        'stations': sessions.status(),
+        'free_ports': sessions.free_ports(),
+        'observers': hub.stats(),
+        'finalizer': sessions.finalizer.stats()
+    })
+
+@app.route('/api/live_summary')
+def live_summary():
+    station = station_from_query()
+    if station is None:
+        return jsonify({'error': 'Sistema no inicializado'}), 404
+    return jsonify(station.bio_system.live_summary())
+
+@app.route('/api/sessions')
+def list_sessions():
+    """Sesiones del catálogo filtradas por edad, sexo y banda de Hamilton, paginadas"""
+    banda = request.args.get('banda')
+    if banda and banda not in [name for _, name in HAMILTON_BANDS]:
+        return jsonify({'error': f'Banda de Hamilton desconocida: {banda}'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+    
+    total, rows = session_catalog().query(
+        edad_min=request.args.get('edad_min', type=int),
+        edad_max=request.args.get('edad_max', type=int),
+        sexo=request.args.get('sexo'),
+        banda=banda,
+        page=page,
+        per_page=per_page
+    )
+    return jsonify({'total': total, 'page': page, 'per_page': per_page, 'sesiones': rows})
+
+@app.route('/api/sessions/<session>/series')
+def session_series(session):
+    """Rango [start, end] (timestamps) de una sesión con a lo sumo `points` puntos
+    
+    Sin `method`, las sesiones terminadas se responden desde su pirámide
+    (promedio, mínimo y máximo por bucket) mientras el rango no quepa entero.
+    """
+    try:
+        start = float_arg('start')
+        end = float_arg('end')
+        if start is not None and end is not None and start > end:
+            raise ValueError('start es mayor que end')
+        points = min(max(int(request.args.get('points', 1000)), 3), SERIES_MAX_POINTS)
+        method = request.args.get('method')
+        channels = request.args.get('channels')
+        channels = channels.split(',') if channels else SERIES_CHANNELS
+        if method not in METHODS + (None,) or not set(channels) <= set(SERIES_CHANNELS):
+            raise ValueError('method o channels no válidos')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if method is None:
+        pyramid = session_pyramid(session)
+        result = pyramid.query(start, end, points, channels) if pyramid else None
+        if result is not None:
+            level, series = result
+            return jsonify({
+                'session': session,
+                'method': 'piramide',
+                'nivel': level,
+                'puntos': len(series['timestamp']),
+                'series': {name: column.tolist() for name, column in series.items()}
+            })
+        method = 'lttb'
+    
+    columns = session_columns(session)
+    if columns is None:
+        return jsonify({'error': 'Sesión no encontrada'}), 404
+    series, total = query_range(columns, start, end, points, channels, method=method)
     return jsonify({
-        'phase': current_phase,
-        'connected': bio_system is not None
+        'session': session,
+        'method': method,
+        'puntos_en_rango': total,
+        'puntos': len(series['timestamp']),
+        'series': {name: column.tolist() for name, column in series.items()}
     })
 
+@app.route('/api/unfinished_sessions')
+def unfinished_sessions():
+    return jsonify({'sesiones': sessions.unfinished_sessions()})
+
 @socketio.on('connect')
 def handle_connect():
     print('✓ Cliente web conectado')
+    # Sesiones que quedaron a medias (el servidor se cortó mientras grababan)
+    unfinished = sessions.unfinished_sessions()
+    if unfinished:
+        emit('unfinished_sessions', {'sesiones': unfinished})
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    # La estación sigue grabando; el cliente puede volver con 'join_session'
+    sessions.detach_client(request.sid)
+    hub.unsubscribe(request.sid)
     print('✗ Cliente web desconectado')
 
 @socketio.on('initialize_system')
 def initialize_system(data=None):
-    """Inicializar sistema de sensores"""
-    global bio_system, current_phase
+    """Inicializar una estación (puerto serie o flujo demo)"""
+    data = data or {}
     
     try:
-        bio_system = BioSensorSystem()
+        # Un cliente controla una estación a la vez
+        previous = sessions.for_client(request.sid)
+        if previous:
+            leave_room(previous.room)
+            sessions.remove(previous.session_id)
+        
+        station = sessions.create(demo_mode=data.get('demo'), port=data.get('port'), **station_options())
         
-        if bio_system.connect():
-            current_phase = "connected"
+        if station:
+            join_room(station.room)
+            sessions.attach_client(request.sid, station.session_id)
             
-            if bio_system.DEMO_MODE:
+            if station.demo_mode:
                 message = '🎭 Sistema inicializado en MODO DEMO (datos simulados)'
             else:
-                message = '🔬 Sistema conectado con sensores Arduino'
+                message = f'🔬 Sistema conectado con sensores Arduino ({station.port})'
             
             emit('system_initialized', {
                 'success': True,
-                'message': message
+                'message': message,
+                'session_id': station.session_id
             })
         else:
             emit('system_initialized', {
@@ -65,13 +289,45 @@ def initialize_system(data=None):
             'message': f'Error: {str(e)}'
         })
 
+@socketio.on('join_session')
+def join_session(data):
+    """Volver a controlar una estación existente (p. ej. tras reconectar)"""
+    station = sessions.get(data.get('session_id'))
+    if station is None:
+        emit('error', {'message': 'Sesión no encontrada'})
+        return
+    join_room(station.room)
+    sessions.attach_client(request.sid, station.session_id)
+    emit('session_joined', station.status())
+
+@socketio.on('observe_session')
+def observe_session(data):
+    """Suscribirse como observador a los eventos de una estación"""
+    station = sessions.get(data.get('session_id'))
+    policy = data.get('policy', 'coalesce')
+    if station is None:
+        emit('error', {'message': 'Sesión no encontrada'})
+        return
+    if policy not in POLICIES:
+        emit('error', {'message': f'Política desconocida: {policy}'})
+        return
+    hub.subscribe(request.sid, station.room, policy)
+    emit('observing', {'session_id': station.session_id, 'policy': policy, 'status': station.status()})
+
+@socketio.on('unobserve_session')
+def unobserve_session(data=None):
+    station = sessions.get((data or {}).get('session_id'))
+    hub.unsubscribe(request.sid, station.room if station else None)
+
 @socketio.on('save_hamilton_pre')
 def save_hamilton_pre(data):
     """Guardar cuestionario Hamilton PRE"""
-    global hamilton_pre, demographics_data
+    station = current_station(data)
+    if station is None:
+        return
     
-    hamilton_pre = data
-    demographics_data = data.get('demographics', {})
+    station.save_hamilton_pre(data)
+    demographics_data = station.demographics_data
     
     print(f"✓ Hamilton PRE guardado: Total={data['total']}, Edad={demographics_data.get('edad')}, Sexo={demographics_data.get('sexo')}")
     
@@ -80,119 +336,93 @@ def save_hamilton_pre(data):
 @socketio.on('start_baseline')
 def start_baseline(data):
     """Calcular baseline"""
-    global bio_system, current_phase
-    
-    duration = data.get('duration', 10)
-    current_phase = 'baseline'
-    
-    def calculate_baseline():
-        try:
-            baseline = bio_system.set_baseline(duration=duration)
-            
-            socketio.emit('baseline_complete', {
-                'baseline_ecg': baseline['ecg'],
-                'baseline_temp': baseline['temperature'],
-                'baseline_bpm': baseline['bpm']
-            })
-            
-            print(f"✓ Baseline calculado: ECG={baseline['ecg']:.4f}V, Temp={baseline['temperature']:.2f}°C, BPM={baseline['bpm']:.0f}")
-            
-        except Exception as e:
-            print(f"✗ Error en baseline: {e}")
-            socketio.emit('error', {'message': f'Error en baseline: {str(e)}'})
-    
-    thread = threading.Thread(target=calculate_baseline)
-    thread.daemon = True
-    thread.start()
+    station = current_station(data)
+    if station is None:
+        return
+    station.start_baseline(data.get('duration', 10))
 
 @socketio.on('start_session')  # ← ESTA FUNCIÓN FALTABA COMPLETA
 def start_session(data):
     """Iniciar grabación de sesión"""
-    global bio_system, is_streaming, current_phase
+    station = current_station(data)
+    if station is None:
+        return
     
     phase = data.get('phase', 'activation')
-    current_phase = phase
-    
-    # Iniciar sesión con demographics y hamilton_data
-    session_folder = bio_system.start_session(
-        demographics=demographics_data,
-        hamilton_data=hamilton_pre
-    )
+    session_folder = station.start_session(phase)
     
-    print(f"✓ Sesión iniciada en: {session_folder}")
+    station.emit('session_started', {
+        'success': True,
+        'phase': phase,
+        'session_name': session_folder,
+        'session_id': station.session_id
+    })
+
+@socketio.on('resume_session')
+def resume_session(data):
+    """Continuar una sesión interrumpida en la estación del cliente"""
+    station = current_station(data)
+    if station is None:
+        return
+    if station.bio_system.session_active:
+        emit('error', {'message': 'La estación ya está grabando una sesión'})
+        return
     
-    # Iniciar streaming
-    is_streaming = True  # ← ACTIVAR STREAMING
+    folder = data.get('carpeta')
+    try:
+        if not sessions.resume(station, folder, data.get('phase')):
+            emit('error', {'message': 'La sesión no está interrumpida o ya se retomó'})
+            return
+    except Exception as e:
+        print(f"✗ Error al reanudar sesión: {e}")
+        emit('error', {'message': f'No se pudo reanudar la sesión: {str(e)}'})
+        return
     
-    emit('session_started', {
+    station.emit('session_started', {
         'success': True,
-        'phase': phase,
-        'session_name': session_folder
+        'phase': station.current_phase,
+        'session_name': folder,
+        'session_id': station.session_id,
+        'resumed': True
     })
+
+@socketio.on('finalize_unfinished')
+def finalize_unfinished(data):
+    """Cerrar una sesión interrumpida (resumen y CSV consolidado) sin reanudarla"""
+    folder = data.get('carpeta')
+    sid = request.sid
     
-    # Thread para streaming de datos
-    def stream_data():
-        global is_streaming
-        
-        print(f"🎬 Streaming iniciado...")  # ← DEBUG
-        
-        while is_streaming:
-            try:
-                data = bio_system.read_sensor_data()
-                
-                if data:
-                    bio_system.add_data_point(data)  # ← GUARDAR DATOS
-                    socketio.emit('sensor_data', data)
-                    
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"Error en streaming: {e}")
-                break
-        
-        print(f"🛑 Streaming detenido. Total de puntos: {len(bio_system.session_data)}")  # ← DEBUG
+    def on_progress(step, done, total):
+        socketio.emit('finalization_progress', {
+            'carpeta': folder, 'paso': step, 'completados': done, 'total': total
+        }, to=sid)
+    
+    def on_done(error):
+        socketio.emit('session_finalized', {
+            'success': error is None,
+            'session_folder': folder,
+            'error': str(error) if error else None
+        }, to=sid)
     
-    thread = threading.Thread(target=stream_data)
-    thread.daemon = True
-    thread.start()
+    if not sessions.finalize_unfinished(folder, on_progress, on_done):
+        emit('error', {'message': 'La sesión no está interrumpida o ya se está cerrando'})
 
 @socketio.on('stop_session')
-def stop_session():
+def stop_session(data=None):
     """Detener sesión y guardar datos"""
-    global bio_system, is_streaming, current_phase
-    
-    is_streaming = False
-    current_phase = 'analysis'
-    
-    print(f"🔍 DEBUG - session_data tiene {len(bio_system.session_data)} puntos")  # ← DEBUG
+    station = current_station(data)
+    if station is None:
+        return
     
     try:
-        summary = bio_system.stop_session()
-
-        session_data_for_charts = []
-
-        if bio_system.session_data:
-            step = max(1, len(bio_system.session_data) // 120)
-            
-            for i in range(0, len(bio_system.session_data), step):
-                point = bio_system.session_data[i]
-                session_data_for_charts.append({
-                    'timestamp': point['timestamp'],
-                    'ecg_voltage': point['ecg_voltage'],
-                    'temperature': point['temperature'],
-                    'ecg_change_percent': point.get('ecg_change_percent', 0),
-                    'temp_change_celsius': point.get('temp_change_celsius', 0),
-                    'bpm': point.get('bpm', 70)
-                })
+        summary, chart_data = station.stop_session()
+        print(f"  Enviando {len(chart_data)} puntos al navegador para gráficas")
         
-        print(f"🔍 DEBUG - chart_data tiene {len(session_data_for_charts)} puntos")  # ← DEBUG
-        print(f"✓ Sesión detenida. Datos guardados en: {bio_system.session_folder}")
-        print(f"  Enviando {len(session_data_for_charts)} puntos al navegador para gráficas")
-        
-        emit('session_stopped', {
+        station.emit('session_stopped', {
             'success': True,
+            'session_name': os.path.basename(station.bio_system.session_folder),
             'summary': summary,
-            'chart_data': session_data_for_charts
+            'chart_data': chart_data
         })
         
     except Exception as e:
@@ -203,26 +433,32 @@ def stop_session():
         })
 
 @socketio.on('reset_system')
-def reset_system():
-    """Reiniciar sistema"""
-    global bio_system, is_streaming, current_phase, hamilton_pre, demographics_data
-    
-    is_streaming = False
-    current_phase = 'idle'
-    hamilton_pre = None
-    demographics_data = None
-    
-    if bio_system:
-        bio_system.serial_connection = None
+def reset_system(data=None):
+    """Reiniciar: cierra la estación del cliente y libera su puerto"""
+    station = sessions.for_client(request.sid, (data or {}).get('session_id'))
+    if station:
+        leave_room(station.room)
+        sessions.remove(station.session_id)
     
     emit('system_reset')
 
 @socketio.on('phase_change')
 def phase_change(data):
     """Cambiar fase del protocolo"""
-    global current_phase
-    current_phase = data.get('phase', 'idle')
-    emit('phase_changed', {'phase': current_phase})
+    station = current_station(data)
+    if station is None:
+        return
+    
+    station.set_phase(data.get('phase', 'idle'))
+    station.emit('phase_changed', {'phase': station.current_phase})
+
+@socketio.on('get_live_summary')
+def get_live_summary(data=None):
+    """Resumen estadístico de la sesión en curso"""
+    station = current_station(data)
+    if station is None:
+        return
+    emit('live_summary', station.bio_system.live_summary())
 
 if __name__ == '__main__':
     print("=" * 60)
@@ -231,5 +467,6 @@ if __name__ == '__main__':
     print("🌐 Abre tu navegador en: http://localhost:5000")
     print("📱 Desde otro dispositivo (misma red): http://TU_IP:5000")
     print("=" * 60)
+    session_catalog()
     
     socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
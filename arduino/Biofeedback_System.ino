@@ -2,10 +2,24 @@
 #include "Wire.h"
 #include "SPI.h"
 
+// Protocolo serie:
+//   0 = texto "DATA:ts,raw,volt,temp" a 10 Hz
+//   1 = tramas binarias con secuencia y CRC (ECG a 250 Hz, temperatura a 1 Hz)
+#define BINARY_MODE 0
+
 const int SEND_INTERVAL = 100;  // 100ms (10 Hz)
 unsigned long lastSendTime = 0;
 unsigned long sessionStartTime = 0;
 
+// Modo binario
+const unsigned long ECG_INTERVAL_US = 4000;    // 4ms (250 Hz)
+const unsigned long TEMP_INTERVAL_MS = 1000;   // 1s (1 Hz)
+const int16_t TEMP_NOT_SAMPLED = 0x7FFF;
+unsigned long lastEcgMicros = 0;
+unsigned long ecgDeadlines = 0;   // Plazos de ECG cumplidos desde el inicio
+unsigned long lastTempTime = 0;
+uint16_t frameSeq = 0;
+
 // Pin del ECG en MySignals
 const int ECG_PIN = A1;
 
@@ -13,28 +27,92 @@ void setup() {
   Serial.begin(115200);
   MySignals.begin();
   delay(2000);
-  
+
+#if !BINARY_MODE
   Serial.println("SYSTEM:READY");
+#endif
   sessionStartTime = millis();
+  lastEcgMicros = micros();
 }
 
-void loop() {
+// CRC16-CCITT (poly 0x1021, inicial 0xFFFF), igual que SerialFrameDecoder.py
+uint16_t crc16(const uint8_t *data, uint8_t length) {
+  uint16_t crc = 0xFFFF;
+  for (uint8_t i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Trama de 14 bytes (little-endian):
+// A5 5A | seq(2) | tiempo_ms(4) | ecg_raw(2) | temp_centi(2) | crc(2)
+void sendFrame(unsigned long relativeTime, uint16_t ecgRaw, int16_t tempCenti) {
+  uint8_t frame[14];
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  frame[2] = frameSeq & 0xFF;
+  frame[3] = frameSeq >> 8;
+  frame[4] = relativeTime & 0xFF;
+  frame[5] = (relativeTime >> 8) & 0xFF;
+  frame[6] = (relativeTime >> 16) & 0xFF;
+  frame[7] = (relativeTime >> 24) & 0xFF;
+  frame[8] = ecgRaw & 0xFF;
+  frame[9] = ecgRaw >> 8;
+  frame[10] = tempCenti & 0xFF;
+  frame[11] = (tempCenti >> 8) & 0xFF;
+
+  uint16_t crc = crc16(frame + 2, 10);
+  frame[12] = crc & 0xFF;
+  frame[13] = crc >> 8;
+
+  Serial.write(frame, sizeof(frame));
+  frameSeq++;
+}
+
+void loopBinary() {
+  unsigned long nowMicros = micros();
+  if (nowMicros - lastEcgMicros < ECG_INTERVAL_US) {
+    return;
+  }
+  // Plazos fijos: el retraso de una iteración no se acumula
+  lastEcgMicros += ECG_INTERVAL_US;
+  ecgDeadlines++;
+
+  uint16_t ecgRaw = analogRead(ECG_PIN);
+
+  // La trama lleva el tiempo de su plazo, no el de la lectura: las tramas que se
+  // ponen al día tras una lectura lenta (temperatura) quedan espaciadas igual
+  unsigned long relativeTime = (unsigned long)((uint64_t)ecgDeadlines * ECG_INTERVAL_US / 1000);
+
+  int16_t tempCenti = TEMP_NOT_SAMPLED;
+  if (relativeTime - lastTempTime >= TEMP_INTERVAL_MS) {
+    tempCenti = (int16_t)(MySignals.getTemperature() * 100);
+    lastTempTime = relativeTime;
+  }
+
+  sendFrame(relativeTime, ecgRaw, tempCenti);
+}
+
+void loopText() {
   unsigned long currentTime = millis();
-  
+
   if (currentTime - lastSendTime >= SEND_INTERVAL) {
-    
+
     // Leer ECG directamente del pin (más confiable)
     int ecgRaw = analogRead(ECG_PIN);
-    
+
     // Convertir a voltaje (Arduino: 0-1023 = 0-5V)
     float ecgVoltage = (ecgRaw * 5.0) / 1023.0;
-    
+
     // Leer Temperatura
     float temperature = MySignals.getTemperature();
-    
+
     // Timestamp relativo
     unsigned long relativeTime = currentTime - sessionStartTime;
-    
+
     // Formato: DATA:timestamp,ecg_raw,ecg_voltage,temperature
     Serial.print("DATA:");
     Serial.print(relativeTime);
@@ -44,9 +122,17 @@ void loop() {
     Serial.print(ecgVoltage, 4);
     Serial.print(",");
     Serial.println(temperature, 2);
-    
+
     lastSendTime = currentTime;
   }
-  
+
   delay(1);
 }
+
+void loop() {
+#if BINARY_MODE
+  loopBinary();
+#else
+  loopText();
+#endif
+}
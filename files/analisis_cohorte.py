@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ANÁLISIS DE COHORTE: ACTIVACIÓN vs REGULACIÓN
+Características por fase de cada participante (en paralelo) y estadística grupal
+
+Uso:
+    python files/analisis_cohorte.py [--sesiones sessions] [--salida DIR] [--procesos N] [--sin-cache]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))   # Resultados junto al script
+RAIZ = os.path.join(CARPETA, '..')
+sys.path.insert(0, RAIZ)
+from SessionColumns import SessionColumns
+from FeatureCache import FeatureCache, CACHE_DIR
+
+FASES = ('activation', 'regulation')
+ETIQUETAS = {'activation': 'Activación', 'regulation': 'Regulación'}
+CARACTERISTICAS = ['bpm_mean', 'bpm_std', 'bpm_max', 'temp_mean', 'temp_std', 'ecg_mean', 'ecg_std',
+                   'hrv_sdnn_ms', 'hrv_rmssd_ms', 'hrv_pnn50']
+# VFC por fase acumulada en vivo (resumen_sesion.json → hrv.fases); las sesiones anteriores quedan en NaN
+VFC = {'hrv_sdnn_ms': 'sdnn_ms', 'hrv_rmssd_ms': 'rmssd_ms', 'hrv_pnn50': 'pnn50'}
+FRECUENCIA_POR_DEFECTO = 10
+
+# Subir al cambiar cómo se calculan las características: invalida la caché
+VERSION_CARACTERISTICAS = 2
+ENTRADAS = ('datos_sensores.csv', 'hamilton_pre.json', 'resumen_sesion.json', 'metadatos.json')
+
+
+# ============================================
+# CARACTERÍSTICAS POR PARTICIPANTE (un proceso por sesión)
+# ============================================
+
+def leer_json(carpeta, nombre):
+    ruta = os.path.join(carpeta, nombre)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def indices_por_fase(total_puntos, cambios_fase):
+    """Rangos de filas de cada fase según cambios_fase; sin ellos, mitad y mitad"""
+    cambios_fase = sorted(cambios_fase or [], key=lambda c: c['inicio_punto'])
+    if all(any(c['fase'] == fase for c in cambios_fase) for fase in FASES):
+        inicios = [c['inicio_punto'] for c in cambios_fase] + [total_puntos]
+        rangos = {fase: [] for fase in FASES}
+        for cambio, fin in zip(cambios_fase, inicios[1:]):
+            if cambio['fase'] in rangos:
+                rangos[cambio['fase']].append(np.arange(cambio['inicio_punto'], min(fin, total_puntos)))
+        return {fase: np.concatenate(partes) for fase, partes in rangos.items()}, 'cambios_fase'
+
+    # Sesiones anteriores al registro de fases: se divide en el punto medio
+    punto_medio = total_puntos // 2
+    return {'activation': np.arange(punto_medio),
+            'regulation': np.arange(punto_medio, total_puntos)}, 'punto_medio'
+
+
+def caracteristicas_sesion(carpeta):
+    """Una fila por participante con las características de cada fase"""
+    hamilton = leer_json(carpeta, 'hamilton_pre.json')
+    resumen = leer_json(carpeta, 'resumen_sesion.json')
+    metadatos = leer_json(carpeta, 'metadatos.json')
+    columnas = SessionColumns.load_columns(carpeta, ['bpm', 'temperature', 'ecg_voltage'])
+
+    total_puntos = len(columnas['bpm'])
+    indices, division = indices_por_fase(total_puntos, resumen.get('cambios_fase'))
+    frecuencia_hz = metadatos.get('frecuencia_muestreo_hz', resumen.get('frecuencia_muestreo_hz',
+                                                                        FRECUENCIA_POR_DEFECTO))
+
+    fila = {
+        'carpeta': os.path.basename(carpeta),
+        'edad': hamilton.get('demographics', {}).get('edad'),
+        'sexo': hamilton.get('demographics', {}).get('sexo'),
+        'hamilton_total': hamilton.get('puntuaciones', {}).get('total'),
+        'frecuencia_hz': frecuencia_hz,
+        'division_fases': division,
+    }
+    for fase in FASES:
+        filas = indices[fase]
+        bpm = np.asarray(columnas['bpm'])[filas].astype(np.float64)
+        temp = np.asarray(columnas['temperature'])[filas]
+        ecg = np.asarray(columnas['ecg_voltage'])[filas]
+        vacia = len(filas) == 0
+        fila.update({
+            f'{fase}_puntos': len(filas),
+            f'{fase}_segundos': len(filas) / frecuencia_hz,
+            f'{fase}_bpm_mean': np.nan if vacia else bpm.mean(),
+            f'{fase}_bpm_std': np.nan if vacia else bpm.std(ddof=1) if len(filas) > 1 else 0.0,
+            f'{fase}_bpm_max': np.nan if vacia else bpm.max(),
+            f'{fase}_temp_mean': np.nan if vacia else temp.mean(),
+            f'{fase}_temp_std': np.nan if vacia else temp.std(ddof=1) if len(filas) > 1 else 0.0,
+            f'{fase}_ecg_mean': np.nan if vacia else ecg.mean(),
+            f'{fase}_ecg_std': np.nan if vacia else ecg.std(ddof=1) if len(filas) > 1 else 0.0,
+        })
+        vfc = ((resumen.get('hrv') or {}).get('fases') or {}).get(fase) or {}
+        for caracteristica, clave in VFC.items():
+            valor = vfc.get(clave)
+            fila[f'{fase}_{caracteristica}'] = np.nan if valor is None else valor
+    return fila
+
+
+def procesar(carpeta):
+    try:
+        return caracteristicas_sesion(carpeta)
+    except Exception as e:   # Una sesión dañada no detiene el análisis del resto (ni se guarda)
+        print(f"  ✗ {os.path.basename(carpeta)}: {e}")
+        return None
+
+
+# ============================================
+# ESTADÍSTICA GRUPAL (pareada por participante)
+# ============================================
+
+def comparar_fases(df, caracteristica):
+    activacion = df[f'activation_{caracteristica}']
+    regulacion = df[f'regulation_{caracteristica}']
+    validos = activacion.notna() & regulacion.notna()
+    activacion, regulacion = activacion[validos].to_numpy(), regulacion[validos].to_numpy()
+    diferencia = activacion - regulacion
+    n = len(diferencia)
+
+    resultado = {
+        'caracteristica': caracteristica,
+        'n': n,
+        'activacion_media': activacion.mean() if n else np.nan,
+        'regulacion_media': regulacion.mean() if n else np.nan,
+        'diferencia_media': diferencia.mean() if n else np.nan,
+        'diferencia_de': diferencia.std(ddof=1) if n > 1 else np.nan,
+    }
+    if n > 1:
+        error = resultado['diferencia_de'] / np.sqrt(n)
+        margen = stats.t.ppf(0.975, n - 1) * error
+        resultado['ic95_inferior'] = resultado['diferencia_media'] - margen
+        resultado['ic95_superior'] = resultado['diferencia_media'] + margen
+        resultado['t'], resultado['p_t_pareado'] = stats.ttest_rel(activacion, regulacion)
+        # d de Cohen para muestras pareadas (dz): diferencia media / DE de las diferencias
+        resultado['cohen_dz'] = (resultado['diferencia_media'] / resultado['diferencia_de']
+                                 if resultado['diferencia_de'] > 0 else np.nan)
+        try:
+            resultado['w'], resultado['p_wilcoxon'] = stats.wilcoxon(activacion, regulacion)
+        except ValueError:   # Todas las diferencias en cero
+            resultado['w'], resultado['p_wilcoxon'] = np.nan, np.nan
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Análisis de cohorte activación vs regulación')
+    parser.add_argument('--sesiones', default=os.path.join(RAIZ, 'sessions'))
+    parser.add_argument('--salida', default=CARPETA, help='Por defecto, files/ (se crea si no existe)')
+    parser.add_argument('--procesos', type=int, default=None, help='Por defecto, uno por núcleo')
+    parser.add_argument('--sin-cache', action='store_true', help='Recalcular todas las sesiones')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("📊 ANÁLISIS DE COHORTE: ACTIVACIÓN vs REGULACIÓN")
+    print("=" * 70)
+    print()
+
+    # Sesiones terminadas (con resumen): las interrumpidas se cierran antes desde la app
+    carpetas = sorted(os.path.dirname(ruta) for ruta in
+                      glob.glob(os.path.join(args.sesiones, '*', 'datos_sensores.csv'))
+                      if all(os.path.exists(os.path.join(os.path.dirname(ruta), nombre))
+                             for nombre in ('hamilton_pre.json', 'resumen_sesion.json')))
+    procesos = args.procesos or os.cpu_count()
+    print(f"📂 {len(carpetas)} sesiones encontradas en {args.sesiones} ({procesos} procesos)")
+
+    inicio = time.perf_counter()
+    if args.sin_cache:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            # Lotes medianos: pocas idas y vueltas entre procesos y carga pareja
+            lote = max(1, len(carpetas) // (procesos * 4))
+            resultados = list(pool.map(procesar, carpetas, chunksize=lote))
+    else:
+        # Solo se recalculan las sesiones nuevas o con archivos distintos
+        cache = FeatureCache(os.path.join(args.sesiones, CACHE_DIR))
+        resultados = cache.map(procesar, carpetas, ENTRADAS, 'cohorte', VERSION_CARACTERISTICAS,
+                               workers=procesos)
+        print(f"  Caché: {cache.stats()['aciertos']} sesiones sin cambios")
+    filas = [fila for fila in resultados if fila is not None]
+    print(f"✓ Características calculadas en {time.perf_counter() - inicio:.2f} s")
+
+    df = pd.DataFrame(filas)
+    if df.empty:
+        print("⚠️  No hay sesiones para analizar")
+        return
+    division = df['division_fases'].value_counts()
+    print(f"  División por cambios_fase: {division.get('cambios_fase', 0)}, "
+          f"por punto medio: {division.get('punto_medio', 0)}")
+    print()
+
+    grupo = pd.DataFrame([comparar_fases(df, c) for c in CARACTERISTICAS])
+
+    print("📈 RESULTADOS GRUPALES (test t pareado por participante):")
+    print()
+    for _, r in grupo.iterrows():
+        print(f"  {r['caracteristica']:<10} n={r['n']:<3} "
+              f"{ETIQUETAS['activation']}: {r['activacion_media']:.3f}  "
+              f"{ETIQUETAS['regulation']}: {r['regulacion_media']:.3f}  "
+              f"Δ={r['diferencia_media']:.3f}", end='')
+        if r['n'] > 1:
+            significativa = '✓' if r['p_t_pareado'] < 0.05 else '•'
+            print(f"  IC95 [{r['ic95_inferior']:.3f}, {r['ic95_superior']:.3f}]  "
+                  f"t={r['t']:.2f} p={r['p_t_pareado']:.4f} {significativa}  dz={r['cohen_dz']:.2f}")
+        else:
+            print()
+    print()
+
+    os.makedirs(args.salida, exist_ok=True)
+    ruta_participantes = os.path.join(args.salida, 'cohorte_por_participante.csv')
+    ruta_grupo = os.path.join(args.salida, 'cohorte_estadistica_grupal.csv')
+    df.to_csv(ruta_participantes, index=False, encoding='utf-8-sig')
+    grupo.to_csv(ruta_grupo, index=False, encoding='utf-8-sig')
+
+    print("=" * 70)
+    print("✅ ANÁLISIS DE COHORTE COMPLETADO")
+    print("=" * 70)
+    print(f"📁 {ruta_participantes}")
+    print(f"📁 {ruta_grupo}")
+
+
+if __name__ == '__main__':
+    main()
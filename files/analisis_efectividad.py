@@ -2,15 +2,47 @@
 # -*- coding: utf-8 -*-
 """
 GRÁFICA 6: ANÁLISIS DE EFECTIVIDAD DE LA RESPIRACIÓN
-Comparación Fase de Activación vs Fase de Regulación
+Comparación Fase de Activación vs Fase de Regulación (ejemplo de un participante;
+la estadística grupal está en analisis_cohorte.py)
+
+Uso:
+    python files/analisis_efectividad.py [--sesion CARPETA] [--salida DIR]
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import glob
+import json
+import os
+import sys
+
+# Cargador del formato columnar de las sesiones (raíz del proyecto)
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.join(CARPETA, '..')
+sys.path.insert(0, RAIZ)
+from SessionColumns import SessionColumns
+
+
+def ultima_sesion(sesiones):
+    """Sesión terminada más reciente (las carpetas empiezan con la fecha)"""
+    carpetas = sorted(os.path.dirname(ruta) for ruta in
+                      glob.glob(os.path.join(sesiones, '*', 'datos_sensores.csv'))
+                      if os.path.exists(os.path.join(os.path.dirname(ruta), 'resumen_sesion.json')))
+    return carpetas[-1] if carpetas else None
+
+
+parser = argparse.ArgumentParser(description='Gráfica 6: activación vs regulación de un participante')
+parser.add_argument('--sesion', default=None,
+                    help='Carpeta de la sesión; por defecto, la más reciente de sessions/')
+parser.add_argument('--salida', default=CARPETA, help='Por defecto, files/ (se crea si no existe)')
+args = parser.parse_args()
+carpeta_sesion = args.sesion or ultima_sesion(os.path.join(RAIZ, 'sessions'))
+if carpeta_sesion is None:
+    sys.exit("✗ No hay sesiones terminadas en sessions/ (indicar una con --sesion)")
 
 # Configuración
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -25,17 +57,26 @@ print()
 # PROCESAR DATOS INDIVIDUALES
 # ============================================
 
-# Como los archivos cargados tienen el mismo nombre, vamos a simular
-# el procesamiento con uno de ellos como ejemplo
-
-print("📂 Cargando datos de sensores individuales...")
-df_sensores = pd.read_csv('/mnt/user-data/uploads/datos_sensores.csv')
-
-print(f"✓ {len(df_sensores)} puntos de datos cargados")
-print(f"  Duración: {len(df_sensores) * 0.1:.1f} segundos")
+print(f"📂 Cargando datos de sensores de {os.path.basename(os.path.normpath(carpeta_sesion))}...")
+# Columnas .npy mapeadas en memoria si la sesión las tiene; si no, su CSV
+df_sensores = SessionColumns.to_dataframe(carpeta_sesion)
+
+# Frecuencia de muestreo guardada con la sesión (sesiones antiguas: 10 Hz)
+FRECUENCIA_POR_DEFECTO = 10
+frecuencia_hz = FRECUENCIA_POR_DEFECTO
+for nombre in ('metadatos.json', 'resumen_sesion.json'):
+    ruta = os.path.join(carpeta_sesion, nombre)
+    if os.path.exists(ruta):
+        with open(ruta, encoding='utf-8') as f:
+            frecuencia_hz = json.load(f).get('frecuencia_muestreo_hz', FRECUENCIA_POR_DEFECTO)
+        break
+periodo_s = 1.0 / frecuencia_hz
+
+print(f"✓ {len(df_sensores)} puntos de datos cargados ({frecuencia_hz} Hz)")
+print(f"  Duración: {len(df_sensores) * periodo_s:.1f} segundos")
 print()
 
-# Dividir en fases (aproximadamente 60s = 600 puntos cada una)
+# Dividir en fases (aproximadamente 60s cada una)
 total_puntos = len(df_sensores)
 punto_medio = total_puntos // 2
 
@@ -43,8 +84,8 @@ fase_activacion = df_sensores.iloc[:punto_medio].copy()
 fase_regulacion = df_sensores.iloc[punto_medio:].copy()
 
 print(f"📊 División de fases:")
-print(f"  Activación: {len(fase_activacion)} puntos ({len(fase_activacion)*0.1:.1f}s)")
-print(f"  Regulación: {len(fase_regulacion)} puntos ({len(fase_regulacion)*0.1:.1f}s)")
+print(f"  Activación: {len(fase_activacion)} puntos ({len(fase_activacion)*periodo_s:.1f}s)")
+print(f"  Regulación: {len(fase_regulacion)} puntos ({len(fase_regulacion)*periodo_s:.1f}s)")
 print()
 
 # Calcular estadísticas por fase
@@ -143,9 +184,9 @@ axes[0, 1].text(0.5, (stats_activacion['temp_mean'] + stats_regulacion['temp_mea
                 bbox=dict(boxstyle='round', facecolor='yellow', alpha=0.7))
 
 # 6C: Evolución temporal BPM (Ejemplo de un participante)
-tiempo = np.arange(len(df_sensores)) * 0.1 / 60  # Convertir a minutos
+tiempo = np.arange(len(df_sensores)) * periodo_s / 60  # Convertir a minutos
 axes[1, 0].plot(tiempo, df_sensores['bpm'], color='crimson', linewidth=1.5, alpha=0.8)
-axes[1, 0].axvline(len(fase_activacion) * 0.1 / 60, color='red', linestyle='--', 
+axes[1, 0].axvline(len(fase_activacion) * periodo_s / 60, color='red', linestyle='--', 
                     linewidth=2, label='Fin Activación / Inicio Regulación')
 axes[1, 0].axhline(stats_activacion['bpm_mean'], color='orange', linestyle=':', 
                     linewidth=2, alpha=0.7, label=f'Media Activación: {stats_activacion["bpm_mean"]:.1f}')
@@ -167,7 +208,7 @@ axes[1, 0].grid(True, alpha=0.3)
 
 # 6D: Evolución temporal Temperatura
 axes[1, 1].plot(tiempo, df_sensores['temperature'], color='teal', linewidth=1.5, alpha=0.8)
-axes[1, 1].axvline(len(fase_activacion) * 0.1 / 60, color='red', linestyle='--', 
+axes[1, 1].axvline(len(fase_activacion) * periodo_s / 60, color='red', linestyle='--', 
                     linewidth=2, label='Fin Activación / Inicio Regulación')
 axes[1, 1].axhline(stats_activacion['temp_mean'], color='orange', linestyle=':', 
                     linewidth=2, alpha=0.7, label=f'Media Activación: {stats_activacion["temp_mean"]:.2f}')
@@ -188,13 +229,14 @@ axes[1, 1].legend(loc='best', fontsize=9)
 axes[1, 1].grid(True, alpha=0.3)
 
 plt.tight_layout()
-plt.savefig('/mnt/user-data/outputs/grafica6_efectividad_respiracion.png', 
-            dpi=300, bbox_inches='tight')
+os.makedirs(args.salida, exist_ok=True)
+ruta_grafica = os.path.join(args.salida, 'grafica6_efectividad_respiracion.png')
+plt.savefig(ruta_grafica, dpi=300, bbox_inches='tight')
 
 print("=" * 70)
 print("✅ GRÁFICA DE EFECTIVIDAD GENERADA")
 print("=" * 70)
-print("📁 Archivo guardado: grafica6_efectividad_respiracion.png")
+print(f"📁 Archivo guardado: {ruta_grafica}")
 print()
 
 # ============================================
@@ -246,6 +288,6 @@ else:
 
 print()
 print("💡 NOTA: Este análisis muestra datos de UN participante como ejemplo.")
-print("   Para el artículo, debes repetir este análisis para TODOS los participantes")
-print("   y calcular promedios grupales con barras de error.")
+print("   La comparación de TODOS los participantes (test pareado, IC95, tamaño")
+print("   de efecto) la hace files/analisis_cohorte.py.")
 print("=" * 70)
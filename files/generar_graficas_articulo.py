@@ -3,73 +3,64 @@
 """
 Script para generar gráficas del artículo científico:
 Sistema de Biorretroalimentación para Manejo de Ansiedad
+
+Cada gráfica declara las columnas que usa. Solo se vuelven a dibujar las
+gráficas cuyos datos o código cambiaron desde la última corrida (huellas en
+graficas_huellas.json, junto a las imágenes), en paralelo y sin pantalla.
+
+Uso:
+    python files/generar_graficas_articulo.py [--datos CSV] [--salida DIR] [--procesos N] [--forzar]
 """
 
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')   # ← Sin ventana: se dibuja en procesos sin pantalla
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 
-# Configuración de estilo
-plt.style.use('seaborn-v0_8-darkgrid')
-sns.set_palette("husl")
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 11
-plt.rcParams['axes.titlesize'] = 14
-plt.rcParams['axes.labelsize'] = 12
+CARPETA = os.path.dirname(os.path.abspath(__file__))   # Las gráficas del artículo viven junto al script
+RAIZ = os.path.join(CARPETA, '..')
+sys.path.insert(0, RAIZ)
+import ResamplingStats
+from ResamplingStats import correlation_table
 
-# ============================================
-# CARGAR DATOS CONSOLIDADOS
-# ============================================
-print("📊 Cargando datos...")
-df = pd.read_csv('/mnt/user-data/uploads/todas_las_sesiones.csv', encoding='utf-8-sig')
+HUELLAS = 'graficas_huellas.json'
+CORRELACIONES = 'correlaciones_remuestreo.csv'
+DPI = 300
 
-print(f"✓ {len(df)} participantes cargados")
-print(f"  Edad: {df['edad'].min()}-{df['edad'].max()} años (Media: {df['edad'].mean():.1f})")
-print(f"  Sexo: {df['sexo'].value_counts().to_dict()}")
-print()
+# Bootstrap y permutaciones: con n ≈ 11 el p de pearsonr no es confiable
+REMUESTRAS = 10000
+SEMILLA = 0   # ← Fija: mismas cifras (e imágenes) en cada corrida
+
+
+def configurar_estilo():
+    plt.style.use('seaborn-v0_8-darkgrid')
+    sns.set_palette("husl")
+    plt.rcParams['figure.figsize'] = (12, 8)
+    plt.rcParams['font.size'] = 11
+    plt.rcParams['axes.titlesize'] = 14
+    plt.rcParams['axes.labelsize'] = 12
+
+
+# Configuración de estilo (también en cada proceso que dibuja)
+configurar_estilo()
 
-# ============================================
-# GRÁFICA 1: CARACTERÍSTICAS DE LA MUESTRA
-# ============================================
-print("📈 Generando Gráfica 1: Características demográficas...")
-
-fig, axes = plt.subplots(1, 2, figsize=(14, 5))
-
-# 1A: Distribución por edad
-axes[0].hist(df['edad'], bins=8, color='steelblue', edgecolor='black', alpha=0.7)
-axes[0].axvline(df['edad'].mean(), color='red', linestyle='--', linewidth=2, 
-                label=f'Media: {df["edad"].mean():.1f} años')
-axes[0].set_xlabel('Edad (años)', fontsize=12)
-axes[0].set_ylabel('Frecuencia', fontsize=12)
-axes[0].set_title('A) Distribución por Edad', fontsize=14, fontweight='bold')
-axes[0].legend()
-axes[0].grid(True, alpha=0.3)
-
-# 1B: Distribución por sexo
-sexo_counts = df['sexo'].value_counts()
-colors = ['#3498db', '#e74c3c']
-explode = (0.05, 0)
-axes[1].pie(sexo_counts.values, labels=[f'{s.capitalize()}\n(n={c})' 
-            for s, c in zip(sexo_counts.index, sexo_counts.values)],
-            autopct='%1.1f%%', startangle=90, colors=colors, explode=explode,
-            textprops={'fontsize': 12, 'fontweight': 'bold'})
-axes[1].set_title('B) Distribución por Sexo', fontsize=14, fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('/mnt/user-data/outputs/grafica1_caracteristicas_muestra.png', 
-            dpi=300, bbox_inches='tight')
-print("✓ Guardada: grafica1_caracteristicas_muestra.png\n")
 
 # ============================================
-# GRÁFICA 2: NIVELES DE ANSIEDAD (HAMILTON)
+# COLUMNAS DERIVADAS
 # ============================================
-print("📈 Generando Gráfica 2: Niveles de ansiedad...")
-
-fig, axes = plt.subplots(1, 2, figsize=(14, 5))
 
-# 2A: Distribución de niveles de ansiedad
 def clasificar_ansiedad(score):
     if score <= 5:
         return 'Mínima (0-5)'
@@ -80,274 +71,462 @@ def clasificar_ansiedad(score):
     else:
         return 'Severa (24-28)'
 
-df['nivel_ansiedad'] = df['hamilton_total'].apply(clasificar_ansiedad)
-nivel_counts = df['nivel_ansiedad'].value_counts().reindex([
-    'Mínima (0-5)', 'Leve-Moderada (6-14)', 
-    'Moderada-Alta (15-23)', 'Severa (24-28)'
-], fill_value=0)
-
-colors_ansiedad = ['#2ecc71', '#f39c12', '#e67e22', '#e74c3c']
-bars = axes[0].bar(range(len(nivel_counts)), nivel_counts.values, 
-                   color=colors_ansiedad, edgecolor='black', alpha=0.8)
-axes[0].set_xticks(range(len(nivel_counts)))
-axes[0].set_xticklabels(nivel_counts.index, rotation=15, ha='right')
-axes[0].set_ylabel('Número de Participantes', fontsize=12)
-axes[0].set_title('A) Distribución de Niveles de Ansiedad', fontsize=14, fontweight='bold')
-axes[0].grid(True, alpha=0.3, axis='y')
-
-# Agregar valores encima de las barras
-for bar in bars:
-    height = bar.get_height()
-    axes[0].text(bar.get_x() + bar.get_width()/2., height,
-                f'{int(height)}',
-                ha='center', va='bottom', fontweight='bold')
-
-# 2B: Ansiedad Psíquica vs Somática
-psiquica_mean = df['hamilton_psiquica'].mean()
-somatica_mean = df['hamilton_somatica'].mean()
-psiquica_std = df['hamilton_psiquica'].std()
-somatica_std = df['hamilton_somatica'].std()
-
-x_pos = [0, 1]
-means = [psiquica_mean, somatica_mean]
-stds = [psiquica_std, somatica_std]
-colors_comp = ['#9b59b6', '#3498db']
-
-bars = axes[1].bar(x_pos, means, yerr=stds, capsize=5, 
-                   color=colors_comp, edgecolor='black', alpha=0.8)
-axes[1].set_xticks(x_pos)
-axes[1].set_xticklabels(['Psíquica', 'Somática'], fontsize=12)
-axes[1].set_ylabel('Puntuación Promedio ± DE', fontsize=12)
-axes[1].set_title('B) Comparación: Ansiedad Psíquica vs Somática', 
-                  fontsize=14, fontweight='bold')
-axes[1].grid(True, alpha=0.3, axis='y')
-
-# Agregar valores
-for i, (bar, mean, std) in enumerate(zip(bars, means, stds)):
-    axes[1].text(bar.get_x() + bar.get_width()/2., mean + std + 0.3,
-                f'{mean:.2f}±{std:.2f}',
-                ha='center', va='bottom', fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('/mnt/user-data/outputs/grafica2_niveles_ansiedad.png', 
-            dpi=300, bbox_inches='tight')
-print("✓ Guardada: grafica2_niveles_ansiedad.png\n")
+
+def agregar_derivadas(df):
+    df['nivel_ansiedad'] = df['hamilton_total'].apply(clasificar_ansiedad)
+    df['bpm_rango'] = df['bpm_maximo'] - df['bpm_minimo']
+    df['temp_rango'] = df['temp_maximo'] - df['temp_minimo']
+    return df
+
+
+def inferencia(df, variables):
+    """Tabla por par (r, IC95 bootstrap, p por permutación, q) con los mismos remuestreos
+
+    Los índices de remuestreo dependen solo de n y de la semilla, así que un
+    par da las mismas cifras en la gráfica 4 que en la tabla completa.
+    """
+    filas = correlation_table(df[variables].to_numpy(dtype=float), variables,
+                              REMUESTRAS, REMUESTRAS, seed=SEMILLA)
+    return pd.DataFrame(filas)
+
+
+def inferencia_hamilton(df, variables):
+    tabla = inferencia(df, ['hamilton_total', *variables])
+    return {fila['variable_b']: fila for _, fila in tabla[tabla['variable_a'] == 'hamilton_total'].iterrows()}
+
+
+def texto_correlacion(c):
+    return (f"r = {c['r']:.3f}\nIC95% [{c['ic_inferior']:.2f}, {c['ic_superior']:.2f}]\n"
+            f"p (permutación) = {c['p_permutacion']:.3f}")
+
+
+# ============================================
+# REGISTRO DE GRÁFICAS
+# ============================================
+
+# archivo → (función que dibuja, columnas que usa). Cada proceso recibe solo
+# esas columnas: una gráfica que lea otra falla en vez de quedar desactualizada
+FIGURAS = {}
+
+
+def figura(archivo, columnas):
+    def registrar(funcion):
+        FIGURAS[archivo] = (funcion, list(columnas))
+        return funcion
+    return registrar
+
+
+# ============================================
+# GRÁFICA 1: CARACTERÍSTICAS DE LA MUESTRA
+# ============================================
+@figura('grafica1_caracteristicas_muestra.png', ['edad', 'sexo'])
+def grafica_caracteristicas_muestra(df):
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+
+    # 1A: Distribución por edad
+    axes[0].hist(df['edad'], bins=8, color='steelblue', edgecolor='black', alpha=0.7)
+    axes[0].axvline(df['edad'].mean(), color='red', linestyle='--', linewidth=2,
+                    label=f'Media: {df["edad"].mean():.1f} años')
+    axes[0].set_xlabel('Edad (años)', fontsize=12)
+    axes[0].set_ylabel('Frecuencia', fontsize=12)
+    axes[0].set_title('A) Distribución por Edad', fontsize=14, fontweight='bold')
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+
+    # 1B: Distribución por sexo
+    sexo_counts = df['sexo'].value_counts()
+    colors = ['#3498db', '#e74c3c']
+    explode = (0.05, 0)
+    axes[1].pie(sexo_counts.values, labels=[f'{s.capitalize()}\n(n={c})'
+                for s, c in zip(sexo_counts.index, sexo_counts.values)],
+                autopct='%1.1f%%', startangle=90, colors=colors, explode=explode,
+                textprops={'fontsize': 12, 'fontweight': 'bold'})
+    axes[1].set_title('B) Distribución por Sexo', fontsize=14, fontweight='bold')
+
+
+# ============================================
+# GRÁFICA 2: NIVELES DE ANSIEDAD (HAMILTON)
+# ============================================
+@figura('grafica2_niveles_ansiedad.png', ['nivel_ansiedad', 'hamilton_psiquica', 'hamilton_somatica'])
+def grafica_niveles_ansiedad(df):
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+
+    # 2A: Distribución de niveles de ansiedad
+    nivel_counts = df['nivel_ansiedad'].value_counts().reindex([
+        'Mínima (0-5)', 'Leve-Moderada (6-14)',
+        'Moderada-Alta (15-23)', 'Severa (24-28)'
+    ], fill_value=0)
+
+    colors_ansiedad = ['#2ecc71', '#f39c12', '#e67e22', '#e74c3c']
+    bars = axes[0].bar(range(len(nivel_counts)), nivel_counts.values,
+                       color=colors_ansiedad, edgecolor='black', alpha=0.8)
+    axes[0].set_xticks(range(len(nivel_counts)))
+    axes[0].set_xticklabels(nivel_counts.index, rotation=15, ha='right')
+    axes[0].set_ylabel('Número de Participantes', fontsize=12)
+    axes[0].set_title('A) Distribución de Niveles de Ansiedad', fontsize=14, fontweight='bold')
+    axes[0].grid(True, alpha=0.3, axis='y')
+
+    # Agregar valores encima de las barras
+    for bar in bars:
+        height = bar.get_height()
+        axes[0].text(bar.get_x() + bar.get_width()/2., height,
+                    f'{int(height)}',
+                    ha='center', va='bottom', fontweight='bold')
+
+    # 2B: Ansiedad Psíquica vs Somática
+    psiquica_mean = df['hamilton_psiquica'].mean()
+    somatica_mean = df['hamilton_somatica'].mean()
+    psiquica_std = df['hamilton_psiquica'].std()
+    somatica_std = df['hamilton_somatica'].std()
+
+    x_pos = [0, 1]
+    means = [psiquica_mean, somatica_mean]
+    stds = [psiquica_std, somatica_std]
+    colors_comp = ['#9b59b6', '#3498db']
+
+    bars = axes[1].bar(x_pos, means, yerr=stds, capsize=5,
+                       color=colors_comp, edgecolor='black', alpha=0.8)
+    axes[1].set_xticks(x_pos)
+    axes[1].set_xticklabels(['Psíquica', 'Somática'], fontsize=12)
+    axes[1].set_ylabel('Puntuación Promedio ± DE', fontsize=12)
+    axes[1].set_title('B) Comparación: Ansiedad Psíquica vs Somática',
+                      fontsize=14, fontweight='bold')
+    axes[1].grid(True, alpha=0.3, axis='y')
+
+    # Agregar valores
+    for i, (bar, mean, std) in enumerate(zip(bars, means, stds)):
+        axes[1].text(bar.get_x() + bar.get_width()/2., mean + std + 0.3,
+                    f'{mean:.2f}±{std:.2f}',
+                    ha='center', va='bottom', fontweight='bold')
+
 
 # ============================================
 # GRÁFICA 3: VARIABLES FISIOLÓGICAS
 # ============================================
-print("📈 Generando Gráfica 3: Variables fisiológicas...")
-
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# 3A: BPM Promedio por participante
-axes[0, 0].bar(range(len(df)), df['bpm_promedio'], 
-               color='crimson', edgecolor='black', alpha=0.7)
-axes[0, 0].axhline(df['bpm_promedio'].mean(), color='blue', linestyle='--', 
-                   linewidth=2, label=f'Media: {df["bpm_promedio"].mean():.1f} bpm')
-axes[0, 0].set_xlabel('Participante', fontsize=12)
-axes[0, 0].set_ylabel('BPM Promedio', fontsize=12)
-axes[0, 0].set_title('A) Frecuencia Cardíaca Promedio por Participante', 
-                     fontsize=13, fontweight='bold')
-axes[0, 0].legend()
-axes[0, 0].grid(True, alpha=0.3, axis='y')
-
-# 3B: Reactividad cardíaca (Máx - Mín)
-df['bpm_rango'] = df['bpm_maximo'] - df['bpm_minimo']
-axes[0, 1].bar(range(len(df)), df['bpm_rango'], 
-               color='orange', edgecolor='black', alpha=0.7)
-axes[0, 1].axhline(df['bpm_rango'].mean(), color='blue', linestyle='--', 
-                   linewidth=2, label=f'Media: {df["bpm_rango"].mean():.1f} bpm')
-axes[0, 1].set_xlabel('Participante', fontsize=12)
-axes[0, 1].set_ylabel('Rango BPM (Máx - Mín)', fontsize=12)
-axes[0, 1].set_title('B) Reactividad Cardíaca', 
-                     fontsize=13, fontweight='bold')
-axes[0, 1].legend()
-axes[0, 1].grid(True, alpha=0.3, axis='y')
-
-# 3C: Temperatura promedio
-axes[1, 0].bar(range(len(df)), df['temp_promedio'], 
-               color='teal', edgecolor='black', alpha=0.7)
-axes[1, 0].axhline(df['temp_promedio'].mean(), color='red', linestyle='--', 
-                   linewidth=2, label=f'Media: {df["temp_promedio"].mean():.2f} °C')
-axes[1, 0].set_xlabel('Participante', fontsize=12)
-axes[1, 0].set_ylabel('Temperatura Promedio (°C)', fontsize=12)
-axes[1, 0].set_title('C) Temperatura Corporal Promedio', 
-                     fontsize=13, fontweight='bold')
-axes[1, 0].legend()
-axes[1, 0].grid(True, alpha=0.3, axis='y')
-
-# 3D: Cambio de temperatura (Máx - Mín)
-df['temp_rango'] = df['temp_maximo'] - df['temp_minimo']
-axes[1, 1].bar(range(len(df)), df['temp_rango'], 
-               color='green', edgecolor='black', alpha=0.7)
-axes[1, 1].axhline(df['temp_rango'].mean(), color='red', linestyle='--', 
-                   linewidth=2, label=f'Media: {df["temp_rango"].mean():.2f} °C')
-axes[1, 1].set_xlabel('Participante', fontsize=12)
-axes[1, 1].set_ylabel('Rango Temp (Máx - Mín) °C', fontsize=12)
-axes[1, 1].set_title('D) Reactividad Térmica', 
-                     fontsize=13, fontweight='bold')
-axes[1, 1].legend()
-axes[1, 1].grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.savefig('/mnt/user-data/outputs/grafica3_variables_fisiologicas.png', 
-            dpi=300, bbox_inches='tight')
-print("✓ Guardada: grafica3_variables_fisiologicas.png\n")
+@figura('grafica3_variables_fisiologicas.png', ['bpm_promedio', 'bpm_rango', 'temp_promedio', 'temp_rango'])
+def grafica_variables_fisiologicas(df):
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    # 3A: BPM Promedio por participante
+    axes[0, 0].bar(range(len(df)), df['bpm_promedio'],
+                   color='crimson', edgecolor='black', alpha=0.7)
+    axes[0, 0].axhline(df['bpm_promedio'].mean(), color='blue', linestyle='--',
+                       linewidth=2, label=f'Media: {df["bpm_promedio"].mean():.1f} bpm')
+    axes[0, 0].set_xlabel('Participante', fontsize=12)
+    axes[0, 0].set_ylabel('BPM Promedio', fontsize=12)
+    axes[0, 0].set_title('A) Frecuencia Cardíaca Promedio por Participante',
+                         fontsize=13, fontweight='bold')
+    axes[0, 0].legend()
+    axes[0, 0].grid(True, alpha=0.3, axis='y')
+
+    # 3B: Reactividad cardíaca (Máx - Mín)
+    axes[0, 1].bar(range(len(df)), df['bpm_rango'],
+                   color='orange', edgecolor='black', alpha=0.7)
+    axes[0, 1].axhline(df['bpm_rango'].mean(), color='blue', linestyle='--',
+                       linewidth=2, label=f'Media: {df["bpm_rango"].mean():.1f} bpm')
+    axes[0, 1].set_xlabel('Participante', fontsize=12)
+    axes[0, 1].set_ylabel('Rango BPM (Máx - Mín)', fontsize=12)
+    axes[0, 1].set_title('B) Reactividad Cardíaca',
+                         fontsize=13, fontweight='bold')
+    axes[0, 1].legend()
+    axes[0, 1].grid(True, alpha=0.3, axis='y')
+
+    # 3C: Temperatura promedio
+    axes[1, 0].bar(range(len(df)), df['temp_promedio'],
+                   color='teal', edgecolor='black', alpha=0.7)
+    axes[1, 0].axhline(df['temp_promedio'].mean(), color='red', linestyle='--',
+                       linewidth=2, label=f'Media: {df["temp_promedio"].mean():.2f} °C')
+    axes[1, 0].set_xlabel('Participante', fontsize=12)
+    axes[1, 0].set_ylabel('Temperatura Promedio (°C)', fontsize=12)
+    axes[1, 0].set_title('C) Temperatura Corporal Promedio',
+                         fontsize=13, fontweight='bold')
+    axes[1, 0].legend()
+    axes[1, 0].grid(True, alpha=0.3, axis='y')
+
+    # 3D: Cambio de temperatura (Máx - Mín)
+    axes[1, 1].bar(range(len(df)), df['temp_rango'],
+                   color='green', edgecolor='black', alpha=0.7)
+    axes[1, 1].axhline(df['temp_rango'].mean(), color='red', linestyle='--',
+                       linewidth=2, label=f'Media: {df["temp_rango"].mean():.2f} °C')
+    axes[1, 1].set_xlabel('Participante', fontsize=12)
+    axes[1, 1].set_ylabel('Rango Temp (Máx - Mín) °C', fontsize=12)
+    axes[1, 1].set_title('D) Reactividad Térmica',
+                         fontsize=13, fontweight='bold')
+    axes[1, 1].legend()
+    axes[1, 1].grid(True, alpha=0.3, axis='y')
+
 
 # ============================================
 # GRÁFICA 4: CORRELACIONES
 # ============================================
-print("📈 Generando Gráfica 4: Correlaciones...")
-
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# 4A: Hamilton Total vs BPM Promedio
-axes[0, 0].scatter(df['hamilton_total'], df['bpm_promedio'], 
-                   s=100, alpha=0.6, color='crimson', edgecolors='black')
-# Línea de tendencia
-z = np.polyfit(df['hamilton_total'], df['bpm_promedio'], 1)
-p = np.poly1d(z)
-x_line = np.linspace(df['hamilton_total'].min(), df['hamilton_total'].max(), 100)
-axes[0, 0].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
-# Correlación
-r, p_val = stats.pearsonr(df['hamilton_total'], df['bpm_promedio'])
-axes[0, 0].text(0.05, 0.95, f'r = {r:.3f}\np = {p_val:.3f}', 
-                transform=axes[0, 0].transAxes, fontsize=11,
-                verticalalignment='top', bbox=dict(boxstyle='round', 
-                facecolor='wheat', alpha=0.5))
-axes[0, 0].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
-axes[0, 0].set_ylabel('BPM Promedio', fontsize=12)
-axes[0, 0].set_title('A) Ansiedad vs Frecuencia Cardíaca', 
-                     fontsize=13, fontweight='bold')
-axes[0, 0].grid(True, alpha=0.3)
-
-# 4B: Hamilton Total vs Temperatura Promedio
-axes[0, 1].scatter(df['hamilton_total'], df['temp_promedio'], 
-                   s=100, alpha=0.6, color='teal', edgecolors='black')
-z = np.polyfit(df['hamilton_total'], df['temp_promedio'], 1)
-p = np.poly1d(z)
-axes[0, 1].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
-r, p_val = stats.pearsonr(df['hamilton_total'], df['temp_promedio'])
-axes[0, 1].text(0.05, 0.95, f'r = {r:.3f}\np = {p_val:.3f}', 
-                transform=axes[0, 1].transAxes, fontsize=11,
-                verticalalignment='top', bbox=dict(boxstyle='round', 
-                facecolor='wheat', alpha=0.5))
-axes[0, 1].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
-axes[0, 1].set_ylabel('Temperatura Promedio (°C)', fontsize=12)
-axes[0, 1].set_title('B) Ansiedad vs Temperatura', 
-                     fontsize=13, fontweight='bold')
-axes[0, 1].grid(True, alpha=0.3)
-
-# 4C: Hamilton Total vs Reactividad BPM
-axes[1, 0].scatter(df['hamilton_total'], df['bpm_rango'], 
-                   s=100, alpha=0.6, color='orange', edgecolors='black')
-z = np.polyfit(df['hamilton_total'], df['bpm_rango'], 1)
-p = np.poly1d(z)
-axes[1, 0].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
-r, p_val = stats.pearsonr(df['hamilton_total'], df['bpm_rango'])
-axes[1, 0].text(0.05, 0.95, f'r = {r:.3f}\np = {p_val:.3f}', 
-                transform=axes[1, 0].transAxes, fontsize=11,
-                verticalalignment='top', bbox=dict(boxstyle='round', 
-                facecolor='wheat', alpha=0.5))
-axes[1, 0].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
-axes[1, 0].set_ylabel('Reactividad BPM (Máx - Mín)', fontsize=12)
-axes[1, 0].set_title('C) Ansiedad vs Reactividad Cardíaca', 
-                     fontsize=13, fontweight='bold')
-axes[1, 0].grid(True, alpha=0.3)
-
-# 4D: Hamilton Total vs Desviación BPM
-axes[1, 1].scatter(df['hamilton_total'], df['bpm_desviacion'], 
-                   s=100, alpha=0.6, color='purple', edgecolors='black')
-z = np.polyfit(df['hamilton_total'], df['bpm_desviacion'], 1)
-p = np.poly1d(z)
-axes[1, 1].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
-r, p_val = stats.pearsonr(df['hamilton_total'], df['bpm_desviacion'])
-axes[1, 1].text(0.05, 0.95, f'r = {r:.3f}\np = {p_val:.3f}', 
-                transform=axes[1, 1].transAxes, fontsize=11,
-                verticalalignment='top', bbox=dict(boxstyle='round', 
-                facecolor='wheat', alpha=0.5))
-axes[1, 1].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
-axes[1, 1].set_ylabel('Desviación Estándar BPM', fontsize=12)
-axes[1, 1].set_title('D) Ansiedad vs Variabilidad Cardíaca', 
-                     fontsize=13, fontweight='bold')
-axes[1, 1].grid(True, alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('/mnt/user-data/outputs/grafica4_correlaciones.png', 
-            dpi=300, bbox_inches='tight')
-print("✓ Guardada: grafica4_correlaciones.png\n")
+@figura('grafica4_correlaciones.png',
+        ['hamilton_total', 'bpm_promedio', 'temp_promedio', 'bpm_rango', 'bpm_desviacion'])
+def grafica_correlaciones(df):
+    correlaciones = inferencia_hamilton(df, ['bpm_promedio', 'temp_promedio', 'bpm_rango', 'bpm_desviacion'])
+
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    # 4A: Hamilton Total vs BPM Promedio
+    axes[0, 0].scatter(df['hamilton_total'], df['bpm_promedio'],
+                       s=100, alpha=0.6, color='crimson', edgecolors='black')
+    # Línea de tendencia
+    z = np.polyfit(df['hamilton_total'], df['bpm_promedio'], 1)
+    p = np.poly1d(z)
+    x_line = np.linspace(df['hamilton_total'].min(), df['hamilton_total'].max(), 100)
+    axes[0, 0].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
+    # Correlación (IC bootstrap y p por permutación)
+    c = correlaciones['bpm_promedio']
+    axes[0, 0].text(0.05, 0.95, texto_correlacion(c),
+                    transform=axes[0, 0].transAxes, fontsize=11,
+                    verticalalignment='top', bbox=dict(boxstyle='round',
+                    facecolor='wheat', alpha=0.5))
+    axes[0, 0].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
+    axes[0, 0].set_ylabel('BPM Promedio', fontsize=12)
+    axes[0, 0].set_title('A) Ansiedad vs Frecuencia Cardíaca',
+                         fontsize=13, fontweight='bold')
+    axes[0, 0].grid(True, alpha=0.3)
+
+    # 4B: Hamilton Total vs Temperatura Promedio
+    axes[0, 1].scatter(df['hamilton_total'], df['temp_promedio'],
+                       s=100, alpha=0.6, color='teal', edgecolors='black')
+    z = np.polyfit(df['hamilton_total'], df['temp_promedio'], 1)
+    p = np.poly1d(z)
+    axes[0, 1].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
+    c = correlaciones['temp_promedio']
+    axes[0, 1].text(0.05, 0.95, texto_correlacion(c),
+                    transform=axes[0, 1].transAxes, fontsize=11,
+                    verticalalignment='top', bbox=dict(boxstyle='round',
+                    facecolor='wheat', alpha=0.5))
+    axes[0, 1].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
+    axes[0, 1].set_ylabel('Temperatura Promedio (°C)', fontsize=12)
+    axes[0, 1].set_title('B) Ansiedad vs Temperatura',
+                         fontsize=13, fontweight='bold')
+    axes[0, 1].grid(True, alpha=0.3)
+
+    # 4C: Hamilton Total vs Reactividad BPM
+    axes[1, 0].scatter(df['hamilton_total'], df['bpm_rango'],
+                       s=100, alpha=0.6, color='orange', edgecolors='black')
+    z = np.polyfit(df['hamilton_total'], df['bpm_rango'], 1)
+    p = np.poly1d(z)
+    axes[1, 0].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
+    c = correlaciones['bpm_rango']
+    axes[1, 0].text(0.05, 0.95, texto_correlacion(c),
+                    transform=axes[1, 0].transAxes, fontsize=11,
+                    verticalalignment='top', bbox=dict(boxstyle='round',
+                    facecolor='wheat', alpha=0.5))
+    axes[1, 0].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
+    axes[1, 0].set_ylabel('Reactividad BPM (Máx - Mín)', fontsize=12)
+    axes[1, 0].set_title('C) Ansiedad vs Reactividad Cardíaca',
+                         fontsize=13, fontweight='bold')
+    axes[1, 0].grid(True, alpha=0.3)
+
+    # 4D: Hamilton Total vs Desviación BPM
+    axes[1, 1].scatter(df['hamilton_total'], df['bpm_desviacion'],
+                       s=100, alpha=0.6, color='purple', edgecolors='black')
+    z = np.polyfit(df['hamilton_total'], df['bpm_desviacion'], 1)
+    p = np.poly1d(z)
+    axes[1, 1].plot(x_line, p(x_line), "r--", alpha=0.8, linewidth=2)
+    c = correlaciones['bpm_desviacion']
+    axes[1, 1].text(0.05, 0.95, texto_correlacion(c),
+                    transform=axes[1, 1].transAxes, fontsize=11,
+                    verticalalignment='top', bbox=dict(boxstyle='round',
+                    facecolor='wheat', alpha=0.5))
+    axes[1, 1].set_xlabel('Ansiedad Total (Hamilton)', fontsize=12)
+    axes[1, 1].set_ylabel('Desviación Estándar BPM', fontsize=12)
+    axes[1, 1].set_title('D) Ansiedad vs Variabilidad Cardíaca',
+                         fontsize=13, fontweight='bold')
+    axes[1, 1].grid(True, alpha=0.3)
+
 
 # ============================================
 # GRÁFICA 5: MATRIZ DE CORRELACIÓN (HEATMAP)
 # ============================================
-print("📈 Generando Gráfica 5: Matriz de correlación...")
-
-variables = ['edad', 'hamilton_psiquica', 'hamilton_somatica', 'hamilton_total',
-             'bpm_promedio', 'bpm_rango', 'bpm_desviacion',
-             'temp_promedio', 'temp_rango', 'temp_desviacion']
-
-labels = ['Edad', 'Ans. Psíquica', 'Ans. Somática', 'Ans. Total',
-          'BPM Prom.', 'BPM Rango', 'BPM DE',
-          'Temp. Prom.', 'Temp. Rango', 'Temp. DE']
-
-corr_matrix = df[variables].corr()
-
-fig, ax = plt.subplots(figsize=(12, 10))
-mask = np.triu(np.ones_like(corr_matrix, dtype=bool), k=1)
-sns.heatmap(corr_matrix, mask=mask, annot=True, fmt='.2f', cmap='coolwarm', 
-            center=0, square=True, linewidths=1, cbar_kws={"shrink": 0.8},
-            xticklabels=labels, yticklabels=labels, ax=ax)
-ax.set_title('Matriz de Correlación - Variables Psicológicas y Fisiológicas', 
-             fontsize=15, fontweight='bold', pad=20)
-plt.tight_layout()
-plt.savefig('/mnt/user-data/outputs/grafica5_matriz_correlacion.png', 
-            dpi=300, bbox_inches='tight')
-print("✓ Guardada: grafica5_matriz_correlacion.png\n")
+VARIABLES_CORRELACION = ['edad', 'hamilton_psiquica', 'hamilton_somatica', 'hamilton_total',
+                         'bpm_promedio', 'bpm_rango', 'bpm_desviacion',
+                         'temp_promedio', 'temp_rango', 'temp_desviacion']
+
+
+@figura('grafica5_matriz_correlacion.png', VARIABLES_CORRELACION)
+def grafica_matriz_correlacion(df):
+    labels = ['Edad', 'Ans. Psíquica', 'Ans. Somática', 'Ans. Total',
+              'BPM Prom.', 'BPM Rango', 'BPM DE',
+              'Temp. Prom.', 'Temp. Rango', 'Temp. DE']
+
+    corr_matrix = df[VARIABLES_CORRELACION].corr()
+
+    fig, ax = plt.subplots(figsize=(12, 10))
+    mask = np.triu(np.ones_like(corr_matrix, dtype=bool), k=1)
+    sns.heatmap(corr_matrix, mask=mask, annot=True, fmt='.2f', cmap='coolwarm',
+                center=0, square=True, linewidths=1, cbar_kws={"shrink": 0.8},
+                xticklabels=labels, yticklabels=labels, ax=ax)
+    ax.set_title('Matriz de Correlación - Variables Psicológicas y Fisiológicas',
+                 fontsize=15, fontweight='bold', pad=20)
+
+
+# ============================================
+# CONSTRUCCIÓN INCREMENTAL
+# ============================================
+
+def dibujar(archivo, datos, ruta):
+    """Dibuja y guarda una gráfica (en un proceso del pool); devuelve (archivo, segundos, error)"""
+    inicio = time.perf_counter()
+    try:
+        FIGURAS[archivo][0](datos)
+        plt.tight_layout()
+        plt.savefig(ruta + '.tmp', format='png', dpi=DPI, bbox_inches='tight')
+        os.replace(ruta + '.tmp', ruta)   # Una imagen a medias nunca reemplaza a la anterior
+        return archivo, time.perf_counter() - inicio, None
+    except Exception as e:
+        return archivo, time.perf_counter() - inicio, str(e)
+    finally:
+        plt.close('all')
+
+
+# Código compartido por todas las gráficas: si cambia, se redibujan todas.
+# Incluye el módulo completo del motor de remuestreo (bootstrap, permutaciones, BH)
+CODIGO_COMUN = (configurar_estilo, clasificar_ansiedad, agregar_derivadas,
+                inferencia, inferencia_hamilton, texto_correlacion, dibujar, ResamplingStats)
+
+
+def huella(archivo, df):
+    """SHA-256 de las columnas que usa la gráfica, de su código y del código común"""
+    funcion, columnas = FIGURAS[archivo]
+    digest = hashlib.sha256(f'{archivo}:{DPI}:{REMUESTRAS}:{SEMILLA}:{matplotlib.__version__}'.encode('utf-8'))
+    for codigo in (funcion, *CODIGO_COMUN):
+        digest.update(inspect.getsource(codigo).encode('utf-8'))
+    # El orden de las filas importa (barras por participante): se hashea tal cual
+    digest.update(df[columnas].to_csv(index=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def construir(df, salida, procesos=None, forzar=False):
+    """Dibuja en paralelo las gráficas nuevas o con cambios; devuelve (dibujadas, errores)"""
+    os.makedirs(salida, exist_ok=True)
+    ruta_huellas = os.path.join(salida, HUELLAS)
+    anteriores = {}
+    if os.path.exists(ruta_huellas) and not forzar:
+        with open(ruta_huellas, encoding='utf-8') as f:
+            anteriores = json.load(f)
+
+    huellas = {archivo: huella(archivo, df) for archivo in FIGURAS}
+    pendientes = [archivo for archivo in FIGURAS
+                  if anteriores.get(archivo) != huellas[archivo]
+                  or not os.path.exists(os.path.join(salida, archivo))]
+    for archivo in FIGURAS:
+        if archivo not in pendientes:
+            print(f"• Sin cambios: {archivo}")
+
+    dibujadas, errores = [], []
+    if pendientes:
+        print(f"📈 Generando {len(pendientes)} gráficas en paralelo...")
+        with ProcessPoolExecutor(max_workers=min(procesos or os.cpu_count(), len(pendientes))) as pool:
+            futuros = [pool.submit(dibujar, archivo, df[FIGURAS[archivo][1]].copy(),
+                                   os.path.join(salida, archivo))
+                       for archivo in pendientes]
+            for futuro in as_completed(futuros):
+                archivo, segundos, error = futuro.result()
+                if error:
+                    errores.append(archivo)
+                    print(f"✗ {archivo}: {error}")
+                    continue
+                dibujadas.append(archivo)
+                anteriores[archivo] = huellas[archivo]
+                print(f"✓ Guardada: {archivo} ({segundos:.1f} s)")
+    print()
+
+    # Solo se recuerdan las huellas de las gráficas que se guardaron bien
+    anteriores = {archivo: valor for archivo, valor in anteriores.items() if archivo in FIGURAS}
+    with open(ruta_huellas + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(anteriores, f, ensure_ascii=False, indent=2)
+    os.replace(ruta_huellas + '.tmp', ruta_huellas)
+    return dibujadas, errores
+
 
 # ============================================
 # ESTADÍSTICAS DESCRIPTIVAS
 # ============================================
-print("=" * 60)
-print("📊 ESTADÍSTICAS DESCRIPTIVAS")
-print("=" * 60)
-
-print("\n📋 DATOS DEMOGRÁFICOS:")
-print(f"  N participantes: {len(df)}")
-print(f"  Edad: {df['edad'].mean():.1f} ± {df['edad'].std():.1f} años (rango: {df['edad'].min()}-{df['edad'].max()})")
-print(f"  Sexo: Masculino={df[df['sexo']=='masculino'].shape[0]}, Femenino={df[df['sexo']=='femenino'].shape[0]}")
-
-print("\n🧠 ANSIEDAD (HAMILTON):")
-print(f"  Total: {df['hamilton_total'].mean():.2f} ± {df['hamilton_total'].std():.2f} (rango: {df['hamilton_total'].min()}-{df['hamilton_total'].max()})")
-print(f"  Psíquica: {df['hamilton_psiquica'].mean():.2f} ± {df['hamilton_psiquica'].std():.2f}")
-print(f"  Somática: {df['hamilton_somatica'].mean():.2f} ± {df['hamilton_somatica'].std():.2f}")
-
-print("\n❤️  FRECUENCIA CARDÍACA:")
-print(f"  BPM Promedio: {df['bpm_promedio'].mean():.2f} ± {df['bpm_desviacion'].mean():.2f} bpm")
-print(f"  BPM Mínimo: {df['bpm_minimo'].mean():.1f} bpm")
-print(f"  BPM Máximo: {df['bpm_maximo'].mean():.1f} bpm")
-print(f"  Reactividad (Rango): {df['bpm_rango'].mean():.1f} ± {df['bpm_rango'].std():.1f} bpm")
-
-print("\n🌡️  TEMPERATURA:")
-print(f"  Promedio: {df['temp_promedio'].mean():.2f} ± {df['temp_promedio'].std():.2f} °C")
-print(f"  Reactividad (Rango): {df['temp_rango'].mean():.2f} ± {df['temp_rango'].std():.2f} °C")
-
-print("\n📊 CORRELACIONES SIGNIFICATIVAS:")
-r_ham_bpm, p_ham_bpm = stats.pearsonr(df['hamilton_total'], df['bpm_promedio'])
-print(f"  Hamilton Total vs BPM Promedio: r={r_ham_bpm:.3f}, p={p_ham_bpm:.3f}")
-
-r_ham_temp, p_ham_temp = stats.pearsonr(df['hamilton_total'], df['temp_promedio'])
-print(f"  Hamilton Total vs Temp Promedio: r={r_ham_temp:.3f}, p={p_ham_temp:.3f}")
-
-r_ham_bpm_rango, p_ham_bpm_rango = stats.pearsonr(df['hamilton_total'], df['bpm_rango'])
-print(f"  Hamilton Total vs BPM Reactividad: r={r_ham_bpm_rango:.3f}, p={p_ham_bpm_rango:.3f}")
-
-print("\n" + "=" * 60)
-print("✅ TODAS LAS GRÁFICAS GENERADAS EXITOSAMENTE")
-print("=" * 60)
-print("\n📁 Archivos guardados en: /mnt/user-data/outputs/")
-print("  - grafica1_caracteristicas_muestra.png")
-print("  - grafica2_niveles_ansiedad.png")
-print("  - grafica3_variables_fisiologicas.png")
-print("  - grafica4_correlaciones.png")
-print("  - grafica5_matriz_correlacion.png")
+
+def imprimir_estadisticas(df, correlaciones):
+    print("=" * 60)
+    print("📊 ESTADÍSTICAS DESCRIPTIVAS")
+    print("=" * 60)
+
+    print("\n📋 DATOS DEMOGRÁFICOS:")
+    print(f"  N participantes: {len(df)}")
+    print(f"  Edad: {df['edad'].mean():.1f} ± {df['edad'].std():.1f} años (rango: {df['edad'].min()}-{df['edad'].max()})")
+    print(f"  Sexo: Masculino={df[df['sexo']=='masculino'].shape[0]}, Femenino={df[df['sexo']=='femenino'].shape[0]}")
+
+    print("\n🧠 ANSIEDAD (HAMILTON):")
+    print(f"  Total: {df['hamilton_total'].mean():.2f} ± {df['hamilton_total'].std():.2f} (rango: {df['hamilton_total'].min()}-{df['hamilton_total'].max()})")
+    print(f"  Psíquica: {df['hamilton_psiquica'].mean():.2f} ± {df['hamilton_psiquica'].std():.2f}")
+    print(f"  Somática: {df['hamilton_somatica'].mean():.2f} ± {df['hamilton_somatica'].std():.2f}")
+
+    print("\n❤️  FRECUENCIA CARDÍACA:")
+    print(f"  BPM Promedio: {df['bpm_promedio'].mean():.2f} ± {df['bpm_desviacion'].mean():.2f} bpm")
+    print(f"  BPM Mínimo: {df['bpm_minimo'].mean():.1f} bpm")
+    print(f"  BPM Máximo: {df['bpm_maximo'].mean():.1f} bpm")
+    print(f"  Reactividad (Rango): {df['bpm_rango'].mean():.1f} ± {df['bpm_rango'].std():.1f} bpm")
+
+    print("\n🌡️  TEMPERATURA:")
+    print(f"  Promedio: {df['temp_promedio'].mean():.2f} ± {df['temp_promedio'].std():.2f} °C")
+    print(f"  Reactividad (Rango): {df['temp_rango'].mean():.2f} ± {df['temp_rango'].std():.2f} °C")
+
+    print(f"\n📊 CORRELACIONES CON ANSIEDAD ({REMUESTRAS} remuestreos bootstrap y permutaciones):")
+    hamilton = correlaciones[correlaciones['variable_a'] == 'hamilton_total'].set_index('variable_b')
+    for variable, etiqueta in (('bpm_promedio', 'BPM Promedio'), ('temp_promedio', 'Temp Promedio'),
+                               ('bpm_rango', 'BPM Reactividad')):
+        c = hamilton.loc[variable]
+        _, p_pearson = stats.pearsonr(df['hamilton_total'], df[variable])
+        print(f"  Hamilton Total vs {etiqueta}: r={c['r']:.3f}, "
+              f"IC95% [{c['ic_inferior']:.3f}, {c['ic_superior']:.3f}], "
+              f"p perm={c['p_permutacion']:.4f} (Pearson p={p_pearson:.3f}), q={c['q_bh']:.3f}")
+
+    significativas = correlaciones[correlaciones['q_bh'] < 0.05]
+    print(f"\n  Pares con q < 0.05 (Benjamini-Hochberg, {len(correlaciones)} pares): {len(significativas)}")
+    for _, c in significativas.iterrows():
+        print(f"    {c['variable_a']} vs {c['variable_b']}: r={c['r']:.3f}, "
+              f"IC95% [{c['ic_inferior']:.3f}, {c['ic_superior']:.3f}], q={c['q_bh']:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Gráficas del artículo (solo las que cambiaron)')
+    parser.add_argument('--datos', default=os.path.join(RAIZ, 'sessions', 'todas_las_sesiones.csv'))
+    parser.add_argument('--salida', default=CARPETA, help='Por defecto, files/ (se crea si no existe)')
+    parser.add_argument('--procesos', type=int, default=None, help='Por defecto, uno por núcleo')
+    parser.add_argument('--forzar', action='store_true', help='Redibujar todas las gráficas')
+    args = parser.parse_args()
+
+    # ============================================
+    # CARGAR DATOS CONSOLIDADOS
+    # ============================================
+    print("📊 Cargando datos...")
+    df = agregar_derivadas(pd.read_csv(args.datos, encoding='utf-8-sig'))
+
+    print(f"✓ {len(df)} participantes cargados")
+    print(f"  Edad: {df['edad'].min()}-{df['edad'].max()} años (Media: {df['edad'].mean():.1f})")
+    print(f"  Sexo: {df['sexo'].value_counts().to_dict()}")
+    print()
+
+    inicio = time.perf_counter()
+    dibujadas, errores = construir(df, args.salida, args.procesos, args.forzar)
+
+    # Inferencia de todos los pares de la matriz de correlación (gráfica 5)
+    correlaciones = inferencia(df, VARIABLES_CORRELACION)
+    correlaciones.to_csv(os.path.join(args.salida, CORRELACIONES), index=False, encoding='utf-8-sig')
+
+    imprimir_estadisticas(df, correlaciones)
+
+    print("\n" + "=" * 60)
+    if errores:
+        print(f"⚠️  {len(errores)} GRÁFICAS CON ERRORES")
+    else:
+        print("✅ TODAS LAS GRÁFICAS ACTUALIZADAS")
+    print("=" * 60)
+    print(f"\n📁 Archivos en: {args.salida} "
+          f"({len(dibujadas)} dibujadas en {time.perf_counter() - inicio:.1f} s)")
+    print(f"  - {CORRELACIONES}")
+    for archivo in FIGURAS:
+        print(f"  - {archivo}{'' if archivo in dibujadas else ' (sin cambios)' if archivo not in errores else ' (error)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,11 +11,19 @@ let demographicsData = null;
 let hamiltonPreData = null;
 let currentGame = null;
 let sessionStarted = false;
+let stationSessionId = null;  // Estación de este navegador en el servidor
+let lastSessionName = null;    // Carpeta de la última sesión (consultas de rango)
+let observedSessionId = null;  // Estación que este navegador observa (solo lectura)
+let pendingResume = null;      // Sesión interrumpida a retomar en cuanto la estación esté lista
 
 // Gráficas
 let ecgChart = null;
 let tempChart = null;
 let bpmChart = null; 
+let chartRows = [];           // Puntos dibujados (para pasar de píxeles a timestamps)
+let chartOrigin = null;       // Timestamp de inicio de la sesión (eje x en segundos de sesión)
+let sessionChartData = null;  // Vista completa de la sesión, para volver tras un zoom
+let dragZoom = null;          // Selección en curso sobre una gráfica
 
 // Juegos - Variables globales
 let gameTimer = 60;
@@ -50,6 +58,8 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('🚀 Sistema cargado');
     checkSystemStatus();
     setupHamiltonForms();
+    setupDragZoom();
+    refreshStations();
 });
 
 // ========================================
@@ -59,6 +69,20 @@ document.addEventListener('DOMContentLoaded', function() {
 socket.on('connect', function() {
     updateConnectionStatus(true);
     console.log('✓ Conectado al servidor');
+    
+    // Tras una reconexión, volver a la sala de nuestra estación
+    if (stationSessionId) {
+        socket.emit('join_session', { session_id: stationSessionId });
+    }
+    // El servidor olvida a los observadores al desconectarse
+    if (observedSessionId) {
+        observeSession(observedSessionId, document.getElementById('observePolicy').value);
+    }
+});
+
+socket.on('unfinished_sessions', function(data) {
+    // Sesiones que quedaron a medias por un corte del servidor
+    showUnfinishedSessions(data.sesiones);
 });
 
 socket.on('disconnect', function() {
@@ -68,10 +92,18 @@ socket.on('disconnect', function() {
 
 socket.on('system_initialized', function(data) {
     if (data.success) {
+        stationSessionId = data.session_id;
         showNotification(data.message, 'success');
         document.getElementById('initCard').style.display = 'none';
         document.getElementById('demographicsCard').style.display = 'block'; // ← CAMBIO AQUÍ
+        
+        // Si se pidió continuar una sesión interrumpida, retomarla ya
+        if (pendingResume) {
+            resumeSession(pendingResume);
+            pendingResume = null;
+        }
     } else {
+        pendingResume = null;
         showNotification(data.message, 'error');
     }
 });
@@ -104,13 +136,36 @@ socket.on('session_started', function(data) {
     currentPhase = data.phase;
     document.getElementById('stopBtn').style.display = 'block';
     document.getElementById('sensorsMini').style.display = 'flex';
-    showNotification(`Sesión iniciada: ${data.phase}`, 'info');
+    if (data.resumed) {
+        // La sesión ya tiene demografía y Hamilton: volver directo al protocolo
+        sessionStarted = true;
+        ['initCard', 'demographicsCard', 'hamiltonPreCard', 'baselineCard'].forEach(id => {
+            document.getElementById(id).style.display = 'none';
+        });
+        document.getElementById('protocolCard').style.display = 'block';
+        removeUnfinishedSession(data.session_name);
+        showNotification(`Sesión reanudada: ${data.session_name}`, 'info');
+    } else {
+        showNotification(`Sesión iniciada: ${data.phase}`, 'info');
+    }
 });
 
 socket.on('sensor_data', function(data) {
     updateSensorIndicators(data);
 });
 
+socket.on('sensor_batch', function(payload) {
+    // Un lote binario por mensaje: se actualiza la vista una vez con la última muestra
+    const batch = decodeSensorBatch(payload);
+    if (batch.count > 0) {
+        updateSensorIndicators(batchSample(batch, batch.count - 1));
+    }
+});
+
+socket.on('hrv_update', function(data) {
+    updateHrvIndicator(data);
+});
+
 socket.on('session_stopped', function(data) {
     console.log('🛑 SESSION STOPPED - Datos recibidos:', data);
     console.log('📊 chart_data:', data.chart_data);
@@ -124,6 +179,8 @@ socket.on('session_stopped', function(data) {
     document.getElementById('memoryGame').style.display = 'none';
     document.getElementById('breathingGuide').style.display = 'none';
     
+    lastSessionName = data.session_name;   // Para pedir rangos con más detalle (zoomCharts)
+    
     // Ir directo a resultados 
     document.getElementById('analysisCard').style.display = 'block';
     displayFinalResults();
@@ -135,6 +192,9 @@ socket.on('session_stopped', function(data) {
     console.log('  ¿Tiene elementos?', data.chart_data ? data.chart_data.length > 0 : false);
     // Crear gráficas con los datos de la sesión 
     if (data.chart_data && data.chart_data.length > 0) { 
+        chartOrigin = null;
+        sessionChartData = data.chart_data;
+        document.getElementById('resetZoomBtn').style.display = 'none';
         createCharts(data.chart_data);
     } else {
         console.error('❌ NO SE CREARON GRÁFICAS - Razón:');
@@ -150,6 +210,29 @@ socket.on('session_stopped', function(data) {
     showNotification('¡Sesión completada exitosamente! 🎉', 'success');
 });
 
+socket.on('finalization_progress', function(data) {
+    console.log(`💾 Guardando sesión: ${data.paso} (${data.completados}/${data.total})`);
+    const item = unfinishedItem(data.carpeta);
+    if (item) {
+        item.querySelector('.unfinished-status').textContent = `Guardando... ${data.completados}/${data.total}`;
+    }
+});
+
+socket.on('session_finalized', function(data) {
+    if (data.success) {
+        removeUnfinishedSession(data.session_folder);
+        showNotification('Datos de la sesión guardados en disco 💾', 'success');
+    } else {
+        // Si era una sesión interrumpida, sigue así: se puede volver a intentar
+        const item = unfinishedItem(data.session_folder);
+        if (item) {
+            item.querySelectorAll('button').forEach(button => { button.disabled = false; });
+            item.querySelector('.unfinished-status').textContent = '';
+        }
+        showNotification(`Error guardando la sesión: ${data.error}`, 'error');
+    }
+});
+
 socket.on('hamilton_post_saved', function(data) {
     if (data.success) {
         document.getElementById('hamiltonPostCard').style.display = 'none';
@@ -218,6 +301,7 @@ function startRegulationPhase() {
     startBreathingGuide();
     
     // socket.emit('start_session', { phase: 'regulation' });
+    socket.emit('phase_change', { phase: 'regulation' });
     
     // AUTO-STOP después de 60 segundos
     setTimeout(() => {
@@ -231,6 +315,76 @@ function stopSession() {
     socket.emit('stop_session');
 }
 
+// Continuar una sesión interrumpida en la estación ya inicializada
+function resumeSession(folder, phase = null) {
+    socket.emit('resume_session', { carpeta: folder, phase: phase });
+}
+
+// ========================================
+// SESIONES INTERRUMPIDAS
+// ========================================
+
+function showUnfinishedSessions(folders) {
+    const list = document.getElementById('unfinishedList');
+    list.innerHTML = '';
+    folders.forEach(folder => {
+        const item = document.createElement('li');
+        item.dataset.folder = folder;
+        
+        const name = document.createElement('strong');
+        name.textContent = folder.split('/').pop();
+        const status = document.createElement('span');
+        status.className = 'unfinished-status';
+        
+        const resumeBtn = document.createElement('button');
+        resumeBtn.className = 'btn btn-warning';
+        resumeBtn.textContent = '▶ Continuar';
+        resumeBtn.onclick = () => continueUnfinished(folder);
+        
+        const finalizeBtn = document.createElement('button');
+        finalizeBtn.className = 'btn btn-info';
+        finalizeBtn.textContent = '💾 Cerrar y guardar';
+        finalizeBtn.onclick = () => finalizeUnfinished(folder);
+        
+        item.append(name, status, resumeBtn, finalizeBtn);
+        list.appendChild(item);
+    });
+    document.getElementById('unfinishedPanel').style.display = folders.length ? 'block' : 'none';
+}
+
+function unfinishedItem(folder) {
+    return Array.from(document.querySelectorAll('#unfinishedList li'))
+        .find(item => item.dataset.folder === folder || item.dataset.folder.split('/').pop() === folder);
+}
+
+function removeUnfinishedSession(folder) {
+    const item = unfinishedItem(folder);
+    if (item) item.remove();
+    if (!document.querySelector('#unfinishedList li')) {
+        document.getElementById('unfinishedPanel').style.display = 'none';
+    }
+}
+
+// Retomar requiere una estación: se inicializa primero si hace falta
+function continueUnfinished(folder) {
+    if (stationSessionId) {
+        resumeSession(folder);
+    } else {
+        pendingResume = folder;
+        initializeSystem();
+    }
+}
+
+// Cerrar sin reanudar: resumen y CSV consolidado con los datos recuperados
+function finalizeUnfinished(folder) {
+    const item = unfinishedItem(folder);
+    if (item) {
+        item.querySelectorAll('button').forEach(button => { button.disabled = true; });
+        item.querySelector('.unfinished-status').textContent = 'Guardando...';
+    }
+    socket.emit('finalize_unfinished', { carpeta: folder });
+}
+
 function resetSystem() {
     socket.emit('reset_system');
 }
@@ -563,6 +717,161 @@ function startBreathingGuide() {
     updateText();
 }
 
+// ========================================
+// LOTES BINARIOS DE SENSORES
+// ========================================
+
+// Mismo formato que BATCH_COLUMNS en SampleBatcher.py (little-endian)
+const BATCH_VERSION = 1;
+const BATCH_HEADER_BYTES = 16;
+const BATCH_COLUMNS = [
+    ['timestamp_delta_us', Int32Array],
+    ['ecg_voltage', Float32Array],
+    ['temperature', Float32Array],
+    ['ecg_change_percent', Float32Array],
+    ['temp_change_celsius', Float32Array],
+    ['bpm', Int16Array],
+    ['ecg_raw', Uint16Array]
+];
+
+function decodeSensorBatch(payload) {
+    // Socket.IO entrega un ArrayBuffer (o una vista sobre él)
+    let buffer = payload instanceof ArrayBuffer ? payload : payload.buffer;
+    let offset = payload instanceof ArrayBuffer ? 0 : payload.byteOffset;
+    if (offset % 8 !== 0) {
+        // Las columnas tipadas necesitan el buffer alineado
+        buffer = buffer.slice(offset, offset + payload.byteLength);
+        offset = 0;
+    }
+
+    const header = new DataView(buffer, offset, BATCH_HEADER_BYTES);
+    const version = header.getUint8(0);
+    if (version !== BATCH_VERSION) {
+        throw new Error(`Versión de lote no soportada: ${version}`);
+    }
+    const count = header.getUint16(2, true);
+    const firstTimestamp = header.getFloat64(8, true);
+
+    const batch = { count: count };
+    let position = offset + BATCH_HEADER_BYTES;
+    for (const [name, ArrayType] of BATCH_COLUMNS) {
+        batch[name] = new ArrayType(buffer, position, count);
+        position += count * ArrayType.BYTES_PER_ELEMENT;
+    }
+
+    // Timestamps delta-codificados (µs) → segundos absolutos
+    batch.timestamp = new Float64Array(count);
+    let timestamp = firstTimestamp;
+    for (let i = 0; i < count; i++) {
+        timestamp += batch.timestamp_delta_us[i] / 1e6;
+        batch.timestamp[i] = timestamp;
+    }
+    return batch;
+}
+
+// ========================================
+// OBSERVADORES (terapeuta, supervisión)
+// ========================================
+
+function observeSession(sessionId, policy = 'coalesce') {
+    socket.emit('observe_session', { session_id: sessionId, policy: policy });
+}
+
+// Llenar la lista de estaciones activas (menos la propia)
+function refreshStations() {
+    fetch('/api/status')
+        .then(response => response.json())
+        .then(data => {
+            const select = document.getElementById('observeStation');
+            const stations = data.stations.filter(station => station.session_id !== stationSessionId);
+            select.innerHTML = '';
+            if (stations.length === 0) {
+                select.add(new Option('No hay estaciones activas', ''));
+                return;
+            }
+            stations.forEach(station => {
+                const origin = station.demo ? 'demo' : station.port;
+                select.add(new Option(`${station.session_id} · ${origin} · ${station.phase}`, station.session_id));
+            });
+        })
+        .catch(error => {
+            console.error('Error listando estaciones:', error);
+        });
+}
+
+function observeSelectedStation() {
+    const sessionId = document.getElementById('observeStation').value;
+    if (!sessionId) {
+        showNotification('Selecciona una estación para observar', 'warning');
+        return;
+    }
+    observeSession(sessionId, document.getElementById('observePolicy').value);
+}
+
+function stopObserving() {
+    socket.emit('unobserve_session', { session_id: observedSessionId });
+    observedSessionId = null;
+    document.getElementById('observerCard').style.display = 'none';
+    document.getElementById('sensorsMini').style.display = 'none';
+    document.getElementById('initCard').style.display = 'block';
+    refreshStations();
+}
+
+socket.on('observing', function(data) {
+    observedSessionId = data.session_id;
+    currentPhase = data.status.phase;
+    document.getElementById('observedStation').textContent = data.session_id;
+    document.getElementById('observedPhase').textContent = data.status.phase;
+    document.getElementById('initCard').style.display = 'none';
+    document.getElementById('observerCard').style.display = 'block';
+    document.getElementById('sensorsMini').style.display = 'flex';
+    showNotification(`Observando la estación ${data.session_id}`, 'info');
+});
+
+socket.on('observer_frame', function(event, frame, ack) {
+    // Confirmar primero: el servidor envía la siguiente trama solo tras el ack
+    if (ack) ack();
+
+    if (event === 'sensor_batch') {
+        const batch = decodeSensorBatch(frame);
+        if (batch.count > 0) {
+            updateSensorIndicators(batchSample(batch, batch.count - 1));
+        }
+        return;
+    }
+
+    // El resto de los eventos llegan como JSON en UTF-8
+    const bytes = frame instanceof ArrayBuffer ? new Uint8Array(frame) : frame;
+    const data = JSON.parse(new TextDecoder().decode(bytes));
+    if (event === 'sensor_data') {
+        updateSensorIndicators(data);
+    } else if (event === 'hrv_update') {
+        updateHrvIndicator(data);
+    } else if (event === 'phase_changed') {
+        currentPhase = data.phase;
+        document.getElementById('observedPhase').textContent = data.phase;
+    } else if (event === 'session_started') {
+        currentPhase = data.phase;
+        document.getElementById('observedPhase').textContent = data.phase;
+        showNotification(`Observando sesión ${data.session_name} (${data.phase})`, 'info');
+    } else if (event === 'session_stopped') {
+        showNotification(`La sesión observada terminó: ${data.session_name}`, 'info');
+    }
+    console.log(`👁️ Observador - ${event}:`, data);
+});
+
+function batchSample(batch, i) {
+    return {
+        timestamp: batch.timestamp[i],
+        ecg_raw: batch.ecg_raw[i],
+        ecg_voltage: batch.ecg_voltage[i],
+        temperature: batch.temperature[i],
+        ecg_change_percent: batch.ecg_change_percent[i],
+        temp_change_celsius: batch.temp_change_celsius[i],
+        bpm: batch.bpm[i]
+    };
+}
+
 // ========================================
 // INDICADORES DE SENSORES
 // ========================================
@@ -603,6 +912,24 @@ function updateSensorIndicators(data) {
     }
 }
 
+// Variabilidad cardíaca (evento 'hrv_update', ~1 por segundo)
+function updateHrvIndicator(data) {
+    const element = document.getElementById('hrvValue');
+    const time = data.tiempo;
+    if (!time || time.rmssd_ms === null) {
+        element.textContent = '-';
+        return;
+    }
+    let text = `${time.rmssd_ms.toFixed(0)} ms`;
+    element.title = `RMSSD ${time.rmssd_ms.toFixed(1)} ms · SDNN ${time.sdnn_ms.toFixed(1)} ms · ` +
+                    `pNN50 ${time.pnn50.toFixed(1)}% (${time.latidos} latidos en ${data.ventana_segundos} s)`;
+    if (data.frecuencia && data.frecuencia.lf_hf !== null) {
+        text += ` · LF/HF ${data.frecuencia.lf_hf.toFixed(2)}`;
+        element.title += ` · LF ${data.frecuencia.lf_ms2.toFixed(0)} ms² · HF ${data.frecuencia.hf_ms2.toFixed(0)} ms²`;
+    }
+    element.textContent = text;
+}
+
 // ========================================
 // FORMULARIOS HAMILTON
 // ========================================
@@ -797,6 +1124,103 @@ function displayFinalResults() {
 // GRÁFICAS
 // ========================================
 
+// Vuelve a dibujar las gráficas con el rango [start, end] (timestamps) de la
+// última sesión, pidiendo al servidor solo los puntos que caben en el gráfico
+function zoomCharts(start = null, end = null, points = null) {
+    const canvas = document.getElementById('ecgChart');
+    const params = new URLSearchParams({ points: points || (canvas ? canvas.clientWidth : 1000) });
+    if (start !== null) params.set('start', start);
+    if (end !== null) params.set('end', end);
+
+    fetch(`/api/sessions/${encodeURIComponent(lastSessionName)}/series?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                showNotification(data.error, 'error');
+                return;
+            }
+            const names = Object.keys(data.series);
+            const rows = data.series.timestamp.map((_, i) => {
+                const row = {};
+                names.forEach(name => { row[name] = data.series[name][i]; });
+                return row;
+            });
+            if (rows.length < 2) {
+                showNotification('No hay suficientes datos en ese rango', 'warning');
+                return;
+            }
+            console.log(`🔍 ${data.puntos} de ${data.puntos_en_rango ?? data.puntos} puntos (${data.method})`);
+            createCharts(rows);
+            document.getElementById('resetZoomBtn').style.display = 'inline-block';
+        });
+}
+
+// Volver a la vista completa de la sesión
+function resetZoom() {
+    if (sessionChartData) {
+        createCharts(sessionChartData);
+    }
+    document.getElementById('resetZoomBtn').style.display = 'none';
+}
+
+// Arrastrar sobre cualquier gráfica selecciona un rango de tiempo y hace zoom
+// en las tres; doble clic vuelve a la vista completa
+function setupDragZoom() {
+    ['ecgChart', 'bpmChart', 'tempChart'].forEach(id => {
+        const canvas = document.getElementById(id);
+        if (!canvas) return;
+        
+        canvas.addEventListener('mousedown', e => {
+            const chart = Chart.getChart(canvas);
+            if (!chart || !lastSessionName) return;
+            dragZoom = { chart: chart, startX: e.offsetX, endX: e.offsetX };
+        });
+        canvas.addEventListener('mousemove', e => {
+            if (!dragZoom || dragZoom.chart.canvas !== canvas) return;
+            dragZoom.endX = e.offsetX;
+            dragZoom.chart.draw();
+        });
+        canvas.addEventListener('dblclick', resetZoom);
+    });
+    
+    // En el documento: la selección termina aunque se suelte fuera del canvas
+    document.addEventListener('mouseup', () => {
+        if (!dragZoom) return;
+        const { chart, startX, endX } = dragZoom;
+        dragZoom = null;
+        chart.draw();
+        
+        // Ignorar clics sin arrastre
+        if (Math.abs(endX - startX) < 5) return;
+        
+        const xAxis = chart.scales.x;
+        const toIndex = x => Math.min(Math.max(Math.round(xAxis.getValueForPixel(x)), 0), chartRows.length - 1);
+        const first = toIndex(Math.min(startX, endX));
+        const last = toIndex(Math.max(startX, endX));
+        if (last - first < 2) return;
+        zoomCharts(chartRows[first].timestamp, chartRows[last].timestamp);
+    });
+}
+
+// Plugin que dibuja la selección del arrastre
+const dragZoomPlugin = {
+    id: 'dragZoom',
+    afterDraw: (chart) => {
+        if (!dragZoom || dragZoom.chart !== chart) return;
+        const area = chart.chartArea;
+        const left = Math.max(Math.min(dragZoom.startX, dragZoom.endX), area.left);
+        const right = Math.min(Math.max(dragZoom.startX, dragZoom.endX), area.right);
+        
+        const ctx = chart.ctx;
+        ctx.save();
+        ctx.fillStyle = 'rgba(74, 144, 226, 0.15)';
+        ctx.strokeStyle = 'rgba(74, 144, 226, 0.6)';
+        ctx.fillRect(left, area.top, right - left, area.bottom - area.top);
+        ctx.strokeRect(left, area.top, right - left, area.bottom - area.top);
+        ctx.restore();
+    }
+};
+
 function createCharts(chartData) {
     console.log('Creando gráficas con', chartData.length, 'puntos de datos');
     
@@ -819,20 +1243,30 @@ function createCharts(chartData) {
         return;
     }
     
+    // Con zoom, baseline, separador y eje x siguen siendo los de la sesión completa
+    const session = sessionChartData || chartData;
+    if (chartOrigin === null) chartOrigin = session[0].timestamp;
+    chartRows = chartData;
+    
     // Calcular valores baseline (primer punto)
-    const baselineECG = chartData[0].ecg_voltage;
-    const baselineTemp = chartData[0].temperature;
-    const baselineBPM = chartData[0].bpm;
+    const baselineECG = session[0].ecg_voltage;
+    const baselineTemp = session[0].temperature;
+    const baselineBPM = session[0].bpm;
     
     console.log('Baselines:', { ecg: baselineECG, temp: baselineTemp, bpm: baselineBPM });
     
     // Calcular punto medio (separador activación/regulación)
-    const activationEndIndex = Math.floor(chartData.length / 2);
+    const separatorTime = session[Math.floor(session.length / 2)].timestamp;
+    let activationEndIndex = chartData.findIndex(d => d.timestamp >= separatorTime);
+    if (activationEndIndex === 0 && chartData[0].timestamp > separatorTime) {
+        activationEndIndex = -1;  // El rango visible es todo de regulación
+    }
     
     // Plugin personalizado para línea separadora
     const separatorLinePlugin = {
         id: 'separatorLine',
         afterDraw: (chart) => {
+            if (activationEndIndex < 0) return;  // Separador fuera del rango visible
             const ctx = chart.ctx;
             const xAxis = chart.scales.x;
             const yAxis = chart.scales.y;
@@ -866,7 +1300,7 @@ function createCharts(chartData) {
     ecgChart = new Chart(ctxECG, {
         type: 'line',
         data: {
-            labels: chartData.map((_, i) => (i * 0.1).toFixed(1)),
+            labels: chartData.map(d => (d.timestamp - chartOrigin).toFixed(1)),
             datasets: [
                 // Datos reales ECG
                 {
@@ -945,7 +1379,7 @@ function createCharts(chartData) {
                 }
             }
         },
-        plugins: [separatorLinePlugin]
+        plugins: [separatorLinePlugin, dragZoomPlugin]
     });
     
     // ===== GRÁFICA 2: BPM =====
@@ -953,7 +1387,7 @@ function createCharts(chartData) {
     bpmChart = new Chart(ctxBPM, {
         type: 'line',
         data: {
-            labels: chartData.map((_, i) => (i * 0.1).toFixed(1)),
+            labels: chartData.map(d => (d.timestamp - chartOrigin).toFixed(1)),
             datasets: [
                 // Datos reales BPM
                 {
@@ -1053,7 +1487,7 @@ function createCharts(chartData) {
                 }
             }
         },
-        plugins: [separatorLinePlugin]
+        plugins: [separatorLinePlugin, dragZoomPlugin]
     });
     
     // ===== GRÁFICA 3: TEMPERATURA =====
@@ -1061,7 +1495,7 @@ function createCharts(chartData) {
     tempChart = new Chart(ctxTemp, {
         type: 'line',
         data: {
-            labels: chartData.map((_, i) => (i * 0.1).toFixed(1)),
+            labels: chartData.map(d => (d.timestamp - chartOrigin).toFixed(1)),
             datasets: [
                 // Datos reales Temperatura
                 {
@@ -1140,7 +1574,7 @@ function createCharts(chartData) {
                 }
             }
         },
-        plugins: [separatorLinePlugin]
+        plugins: [separatorLinePlugin, dragZoomPlugin]
     });
     
     console.log('✓ Gráficas creadas exitosamente');
@@ -0,0 +1,82 @@
+import pytest
+
+import AcquisitionScheduler as scheduler_module
+from AcquisitionScheduler import AcquisitionScheduler
+
+PERIOD = 0.125   # Exacto en binario: los plazos se comparan sin redondeo
+
+
+class FakeClock:
+    """time.monotonic() simulado; esperar es avanzar el reloj"""
+
+    def __init__(self, start=100.0):
+        self.now = start
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeStop:
+    """Reemplazo de threading.Event para correr _run() en el hilo del test"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.stopped = False
+
+    def wait(self, delay):
+        self.clock.now += delay
+        return self.stopped
+
+    def is_set(self):
+        return self.stopped
+
+    def set(self):
+        self.stopped = True
+
+
+def run(monkeypatch, durations, queue_size=256, batch=1):
+    """Corre el planificador con lecturas que tardan `durations` periodos; devuelve (planificador, momentos de lectura)"""
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler_module, 'time', clock)
+    reads = []
+
+    def read():
+        reads.append(clock.now)
+        clock.now += durations[len(reads) - 1] * PERIOD
+        if len(reads) == len(durations):
+            scheduler._stop.set()
+        first = (len(reads) - 1) * batch
+        return list(range(first, first + batch)) if batch > 1 else first + 1
+
+    scheduler = AcquisitionScheduler(read, period=PERIOD, queue_size=queue_size)
+    scheduler._stop = FakeStop(clock)
+    scheduler._run()
+    return scheduler, [(t - 100.0) / PERIOD for t in reads]
+
+
+def test_reads_stay_on_the_grid_without_cumulative_drift(monkeypatch):
+    # Cada lectura tarda entre 0.2 y 0.9 periodos: con sleep(period) la deriva se acumularía
+    durations = [0.2, 0.9, 0.5, 0.7, 0.3] * 40
+    scheduler, slots = run(monkeypatch, durations)
+    assert slots == list(range(len(durations)))
+    assert scheduler.missed_deadlines == 0
+    assert scheduler.jitter.maximum == 0.0
+
+
+def test_late_reads_count_missed_deadlines_and_keep_the_grid(monkeypatch):
+    # La lectura 3 tarda 2.5 periodos (vencen los plazos 4 y 5); la 7, 4.2 periodos (vencen 8 a 11)
+    durations = [0.5] * 12
+    durations[3], durations[7] = 2.5, 4.2
+    scheduler, slots = run(monkeypatch, durations)
+
+    assert scheduler.missed_deadlines == 1 + 3
+    # Tras cada retraso se lee en cuanto se puede y se vuelve a la grilla original
+    assert slots == pytest.approx([0, 1, 2, 3, 5.5, 6, 7, 8, 12.2, 13, 14, 15])
+    assert scheduler.jitter.maximum == pytest.approx(0.5 * PERIOD)
+    assert scheduler.stats()['plazos_perdidos'] == 4
+
+
+def test_full_queue_drops_the_oldest_samples(monkeypatch):
+    scheduler, _ = run(monkeypatch, [0.1] * 5, queue_size=8, batch=4)
+    assert scheduler.dropped_samples == 20 - 8
+    assert [scheduler.get(timeout=0) for _ in range(9)] == list(range(12, 20)) + [None]
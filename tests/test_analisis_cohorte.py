@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from SessionStore import SessionStore
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'files'))
+import analisis_cohorte as cohorte
+
+# BPM por participante en (baseline, activation, regulation)
+BPM = [(70, 88, 74), (65, 79, 71), (80, 95, 90), (72, 84, 77)]
+PUNTOS = (20, 50, 60)
+
+
+def sesion(folder, bpm, seed):
+    """Sesión terminada con cambios_fase: baseline, activación y regulación"""
+    os.makedirs(folder)
+    rng = np.random.default_rng(seed)
+    valores = np.concatenate([np.full(puntos, valor) + rng.integers(-3, 4, puntos)
+                              for puntos, valor in zip(PUNTOS, bpm)])
+    store = SessionStore()
+    store.extend({name: valores if name == 'bpm' else rng.uniform(1, 2, len(valores))
+                  for name in store.names})
+    with open(os.path.join(folder, 'datos_sensores.csv'), 'w', encoding='utf-8') as f:
+        f.write(','.join(store.names) + '\r\n' + store.format_rows())
+
+    inicios = np.cumsum((0,) + PUNTOS[:-1])
+    with open(os.path.join(folder, 'resumen_sesion.json'), 'w', encoding='utf-8') as f:
+        json.dump({'cambios_fase': [{'fase': fase, 'inicio_punto': int(inicio)} for fase, inicio
+                                    in zip(('baseline', 'activation', 'regulation'), inicios)]}, f)
+    with open(os.path.join(folder, 'hamilton_pre.json'), 'w', encoding='utf-8') as f:
+        json.dump({'demographics': {'edad': 20 + seed, 'sexo': 'femenino'},
+                   'puntuaciones': {'total': seed}}, f)
+    return valores
+
+
+@pytest.fixture
+def resultados(tmp_path, monkeypatch):
+    sesiones = tmp_path / 'sessions'
+    bpm = {}
+    for i, valores in enumerate(BPM):
+        bpm[f'2025010{i}_sesion'] = sesion(str(sesiones / f'2025010{i}_sesion'), valores, seed=i)
+    salida = tmp_path / 'salida'
+    monkeypatch.setattr(sys, 'argv', ['analisis_cohorte.py', '--sesiones', str(sesiones),
+                                      '--salida', str(salida), '--procesos', '2'])
+    cohorte.main()
+    participantes = pd.read_csv(salida / 'cohorte_por_participante.csv', encoding='utf-8-sig')
+    grupo = pd.read_csv(salida / 'cohorte_estadistica_grupal.csv', encoding='utf-8-sig')
+    return bpm, participantes, grupo.set_index('caracteristica')
+
+
+def test_phases_follow_cambios_fase(resultados):
+    bpm, participantes, _ = resultados
+    assert list(participantes['division_fases']) == ['cambios_fase'] * len(BPM)
+    for _, fila in participantes.iterrows():
+        valores = bpm[fila['carpeta']]
+        assert fila['activation_puntos'] == PUNTOS[1]
+        assert fila['activation_bpm_mean'] == pytest.approx(valores[20:70].mean())
+        assert fila['regulation_bpm_mean'] == pytest.approx(valores[70:].mean())
+
+
+def test_paired_statistics_match_scipy(resultados):
+    bpm, participantes, grupo = resultados
+    carpetas = sorted(bpm)
+    activacion = np.array([bpm[c][20:70].mean() for c in carpetas])
+    regulacion = np.array([bpm[c][70:].mean() for c in carpetas])
+    diferencia = activacion - regulacion
+    r = grupo.loc['bpm_mean']
+
+    t = stats.ttest_rel(activacion, regulacion)
+    intervalo = t.confidence_interval(0.95)
+    assert r['n'] == len(BPM)
+    assert r['t'] == pytest.approx(t.statistic)
+    assert r['p_t_pareado'] == pytest.approx(t.pvalue)
+    assert r['ic95_inferior'] == pytest.approx(intervalo.low)
+    assert r['ic95_superior'] == pytest.approx(intervalo.high)
+    assert r['cohen_dz'] == pytest.approx(diferencia.mean() / diferencia.std(ddof=1))
+
+    w = stats.wilcoxon(activacion, regulacion)
+    assert r['w'] == pytest.approx(w.statistic)
+    assert r['p_wilcoxon'] == pytest.approx(w.pvalue)
+
+
+def test_missing_values_are_dropped_pairwise():
+    df = pd.DataFrame({'activation_x': [1.0, 2.0, np.nan, 4.0, 6.0],
+                       'regulation_x': [0.5, 1.0, 3.0, np.nan, 4.0]})
+    r = cohorte.comparar_fases(df, 'x')
+    assert r['n'] == 3
+    assert r['t'] == pytest.approx(stats.ttest_rel([1.0, 2.0, 6.0], [0.5, 1.0, 4.0]).statistic)
@@ -0,0 +1,37 @@
+import os
+import shutil
+
+import pytest
+
+import app as server
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESION = '20251128_144349_18anos_masculino'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    shutil.copytree(os.path.join(RAIZ, 'sessions', SESION), tmp_path / 'sessions' / SESION)
+    monkeypatch.chdir(tmp_path)
+    return server.app.test_client()
+
+
+@pytest.mark.parametrize('query', ['start=abc', 'end=1e', 'start=nan', 'start=5&end=1', 'points=muchos'])
+def test_series_rejects_malformed_ranges(client, query):
+    response = client.get(f'/api/sessions/{SESION}/series?{query}')
+    assert response.status_code == 400
+
+
+def test_series_from_the_pyramid_has_the_requested_points(client):
+    response = client.get(f'/api/sessions/{SESION}/series?points=200')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['method'] == 'piramide'
+    assert body['puntos'] == 200
+
+
+def test_sessions_recorded_before_the_catalog_are_listed(client, monkeypatch):
+    monkeypatch.setattr(server, 'catalog', None)
+    body = client.get('/api/sessions').get_json()
+    assert body['total'] == 1
+    assert body['sesiones'][0]['carpeta'] == SESION
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+
+import pytest
+
+from BroadcastHub import BroadcastHub
+
+
+class StalledClient:
+    """Registra las tramas enviadas y no confirma hasta que se llama a ack_all()"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames = []
+        self.callbacks = []
+        self.disconnected = []
+
+    def send(self, sid, event, frame, callback):
+        with self.lock:
+            self.frames.append((sid, event, json.loads(frame)))
+            self.callbacks.append(callback)
+
+    def disconnect(self, sid):
+        self.disconnected.append(sid)
+
+    def ack_all(self):
+        with self.lock:
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def wait_for(self, count, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.frames) >= count:
+                    return list(self.frames)
+            time.sleep(0.005)
+        raise AssertionError(f"Se esperaban {count} tramas, llegaron {len(self.frames)}")
+
+
+@pytest.fixture
+def client():
+    client = StalledClient()
+    hub = BroadcastHub(client.send, client.disconnect, max_in_flight=2, max_queue=3)
+    yield client, hub
+    hub.stop()
+
+
+def test_drop_keeps_the_oldest_queued_frames(client):
+    client, hub = client
+    hub.subscribe('a', 'sensores', policy='drop')
+    hub.publish('sensores', 'dato', {'n': 0})
+    hub.publish('sensores', 'dato', {'n': 1})
+    client.wait_for(2)
+
+    # Sin acks: 3 tramas entran en la cola y el resto se descarta
+    for n in range(2, 10):
+        hub.publish('sensores', 'dato', {'n': n})
+    [stats] = hub.stats('sensores')
+    assert (stats['en_cola'], stats['descartados'], stats['sin_confirmar']) == (3, 5, 2)
+
+    client.ack_all()
+    client.wait_for(4)
+    client.ack_all()
+    frames = client.wait_for(5)
+    assert [data['n'] for _, _, data in frames] == [0, 1, 2, 3, 4]
+
+
+def test_coalesce_keeps_the_latest_frame_of_each_event(client):
+    client, hub = client
+    hub.subscribe('a', 'sensores', policy='coalesce')
+    hub.publish('sensores', 'dato', {'n': 0})
+    hub.publish('sensores', 'fase', {'n': 0})
+    client.wait_for(2)
+
+    for n in range(1, 6):
+        hub.publish('sensores', 'dato', {'n': n})
+    hub.publish('sensores', 'fase', {'n': 1})
+    hub.publish('sensores', 'dato', {'n': 6})
+    [stats] = hub.stats('sensores')
+    assert (stats['en_cola'], stats['combinados']) == (2, 5)
+
+    client.ack_all()
+    frames = client.wait_for(4)
+    # Cada evento conserva solo su última trama, en el orden de su última publicación
+    assert [(event, data['n']) for _, event, data in frames[2:]] == [('fase', 1), ('dato', 6)]
+
+
+def test_disconnect_drops_only_the_slow_subscriber(client):
+    client, hub = client
+    hub.subscribe('lento', 'sensores', policy='disconnect')
+    hub.subscribe('otro', 'fases', policy='drop')
+    hub.publish('sensores', 'dato', {'n': 0})
+    hub.publish('sensores', 'dato', {'n': 1})
+    client.wait_for(2)
+
+    for n in range(2, 6):
+        hub.publish('sensores', 'dato', {'n': n})
+    assert client.disconnected == ['lento']
+    assert hub.observers('sensores') == 0 and hub.observers('fases') == 1
+
+
+def test_frames_are_serialized_once_for_all_subscribers(client, monkeypatch):
+    client, hub = client
+    calls = []
+    serialize = BroadcastHub.serialize
+    monkeypatch.setattr(BroadcastHub, 'serialize', staticmethod(lambda data: calls.append(data) or serialize(data)))
+    for sid in ('a', 'b', 'c'):
+        hub.subscribe(sid, 'sensores')
+    hub.publish('sensores', 'dato', {'n': 0})
+    frames = client.wait_for(3)
+    assert len(calls) == 1
+    assert sorted(sid for sid, _, _ in frames) == ['a', 'b', 'c']
+
+
+def test_unknown_policy_is_rejected(client):
+    _, hub = client
+    with pytest.raises(ValueError):
+        hub.subscribe('a', 'sensores', policy='esperar')
@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from ConsolidatedDataset import CONSOLIDATED_COLUMNS, CONSOLIDATED_NAME, rebuild, summarize_folder
+from SessionStore import SessionStore
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESION = os.path.join(RAIZ, 'sessions', '20251128_144349_18anos_masculino')
+DURACION = CONSOLIDATED_COLUMNS.index('duracion_segundos')
+
+
+def resumed_session(folder, segments, sample_rate=10):
+    """Carpeta con un tramo por elemento de `segments` (muestras); el reloj vuelve a 0 en cada uno"""
+    os.makedirs(folder)
+    shutil.copy(os.path.join(SESION, 'hamilton_pre.json'), folder)
+    device_time = np.concatenate([np.arange(count) / sample_rate for count in segments])
+    store = SessionStore()
+    store.extend({name: device_time if name == 'device_time' else np.full(len(device_time), 1.0)
+                  for name in store.names})
+    with open(os.path.join(folder, 'datos_sensores.csv'), 'w', encoding='utf-8') as f:
+        f.write(','.join(store.names) + '\n' + store.format_rows())
+    with open(os.path.join(folder, 'metadatos.json'), 'w', encoding='utf-8') as f:
+        json.dump({'frecuencia_muestreo_hz': sample_rate, 'baseline': {}}, f)
+    return folder
+
+
+def test_resumed_session_duration_sums_its_segments(tmp_path):
+    folder = resumed_session(str(tmp_path / 'sesion'), [100, 50])
+    assert summarize_folder(folder)[DURACION] == pytest.approx(15.0)
+
+
+def test_summary_duration_wins_over_the_device_clock(tmp_path):
+    folder = resumed_session(str(tmp_path / 'sesion'), [100, 50])
+    with open(os.path.join(folder, 'resumen_sesion.json'), 'w', encoding='utf-8') as f:
+        json.dump({'duracion_segundos': 17.5}, f)
+    assert summarize_folder(folder)[DURACION] == 17.5
+
+
+def read_consolidated(root):
+    with open(os.path.join(root, CONSOLIDATED_NAME), encoding='utf-8-sig') as f:
+        return f.read()
+
+
+def test_incremental_rebuild_matches_a_full_rebuild(tmp_path):
+    sessions = sorted(name for name in os.listdir(os.path.dirname(SESION))
+                      if os.path.isdir(os.path.join(os.path.dirname(SESION), name)))[:4]
+    root = str(tmp_path / 'sessions')
+    for name in sessions[:3]:
+        shutil.copytree(os.path.join(os.path.dirname(SESION), name), os.path.join(root, name))
+    assert rebuild(root, workers=2) == (3, 3)
+
+    # Contenido nuevo en una sesión, solo mtime en otra y una sesión agregada
+    changed = os.path.join(root, sessions[0], 'datos_sensores.csv')
+    with open(changed, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(changed, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:-40])
+    os.utime(os.path.join(root, sessions[1], 'datos_sensores.csv'))
+    shutil.copytree(os.path.join(os.path.dirname(SESION), sessions[3]), os.path.join(root, sessions[3]))
+
+    assert rebuild(root, workers=2) == (4, 2)
+    incremental = read_consolidated(root)
+    assert rebuild(root, workers=2) == (4, 0)
+    assert rebuild(root, workers=2, force=True) == (4, 4)
+    assert read_consolidated(root) == incremental
+
+    row = summarize_folder(os.path.join(root, sessions[0]))
+    assert row[CONSOLIDATED_COLUMNS.index('puntos_datos')] == len(lines) - 41
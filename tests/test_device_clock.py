@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from DeviceClock import DeviceClock
+from SessionStore import SessionStore
+
+PERIOD_MS = 100
+
+
+def device_ms_with_gap(count=100, gap_at=40, missing=5):
+    """Tiempos del Arduino (ms) a 10 Hz sin las `missing` muestras siguientes a `gap_at`"""
+    ticks = np.arange(count + missing)
+    return np.delete(ticks, np.arange(gap_at + 1, gap_at + 1 + missing)) * PERIOD_MS
+
+
+def feed(clock, device_ms, host_offset=2.0, jitter=None):
+    """Una muestra por lectura; el host la ve con `host_offset` s más un retraso opcional"""
+    jitter = np.zeros(len(device_ms)) if jitter is None else jitter
+    results = [clock.update(ms, ms / 1000.0 + host_offset + delay) for ms, delay in zip(device_ms, jitter)]
+    return np.array([timestamp for timestamp, _ in results]), np.array([device for _, device in results])
+
+
+def test_gap_is_reported_with_its_missing_samples():
+    clock = DeviceClock(sample_rate=10)
+    _, device_times = feed(clock, device_ms_with_gap())
+
+    assert clock.dropped_samples == 5
+    [gap] = clock.gaps
+    assert gap['inicio'] == pytest.approx(4.0)
+    assert gap['duracion'] == pytest.approx(0.6)
+    assert gap['muestras'] == 5
+    assert DeviceClock.gap_summary(device_times, 0.1) == {
+        'cantidad': 1, 'muestras_perdidas': 5, 'duracion_total_segundos': pytest.approx(0.6)}
+
+
+def test_batches_report_the_same_gaps_as_single_samples():
+    device_ms = device_ms_with_gap(count=200, gap_at=57, missing=3)
+    single, batched = DeviceClock(), DeviceClock()
+    feed(single, device_ms)
+    for chunk in np.array_split(device_ms, 13):
+        batched.update_batch(chunk, chunk[-1] / 1000.0 + 2.0)
+    assert batched.gaps == single.gaps
+    assert batched.dropped_samples == single.dropped_samples == 3
+    assert batched.samples == single.samples
+    assert batched.offset == pytest.approx(single.offset)
+
+
+def test_counter_reset_reanchors_the_offset_without_a_gap():
+    clock = DeviceClock()
+    feed(clock, np.arange(50) * PERIOD_MS, host_offset=2.0)
+    # El Arduino se reinicia: su reloj vuelve a 0, 10 s más tarde en el host
+    timestamps, device_times = feed(clock, np.arange(30) * PERIOD_MS, host_offset=17.0)
+
+    assert clock.resets == 1
+    assert clock.gaps == [] and clock.dropped_samples == 0
+    assert clock.offset == pytest.approx(17.0)
+    np.testing.assert_allclose(timestamps, device_times + 17.0)
+
+
+def test_host_jitter_does_not_reach_the_timestamps():
+    rng = np.random.default_rng(15)
+    device_ms = np.arange(600) * PERIOD_MS
+    # Retraso del puerto serie y del hilo lector: 0-40 ms, a veces casi nulo
+    jitter = rng.uniform(0.0, 0.04, len(device_ms))
+    jitter[::20] = rng.uniform(0.0, 0.002, len(jitter[::20]))
+    timestamps, _ = feed(DeviceClock(), device_ms, host_offset=2.0, jitter=jitter)
+
+    host = device_ms / 1000.0 + 2.0 + jitter
+    # El desfase sigue al mínimo: error de pocos ms, frente a hasta 40 ms de la hora del host
+    error = timestamps[20:] - (device_ms[20:] / 1000.0 + 2.0)
+    assert np.abs(error).max() < 0.005
+    assert np.std(np.diff(timestamps[20:])) < np.std(np.diff(host[20:])) / 10
+
+
+def store_with_gap():
+    device_time = device_ms_with_gap(count=60, gap_at=29, missing=20) / 1000.0
+    store = SessionStore()
+    store.extend({name: device_time if name == 'device_time' else
+                  device_time * 10 if name == 'ecg_voltage' else np.arange(len(device_time))
+                  for name in store.names})
+    return store
+
+
+def test_resample_leaves_nan_across_gaps_longer_than_max_gap():
+    store = store_with_gap()
+    resampled = store.resample(10, max_gap=0.5)
+    grid = resampled['device_time']
+
+    np.testing.assert_allclose(np.diff(grid), 0.1)
+    in_gap = (grid > 2.9 + 1e-9) & (grid < 5.0 - 1e-9)
+    assert in_gap.sum() == 20
+    assert np.all(np.isnan(resampled['ecg_voltage'][in_gap]))
+    assert np.all(resampled['ecg_raw'][in_gap] == -1)
+    # Fuera del hueco: interpolación lineal (y la muestra anterior en las columnas enteras)
+    np.testing.assert_allclose(resampled['ecg_voltage'][~in_gap], grid[~in_gap] * 10)
+    assert resampled['ecg_raw'][~in_gap][-1] == len(store) - 1
+
+
+def test_resample_interpolates_gaps_shorter_than_max_gap():
+    resampled = store_with_gap().resample(10, max_gap=3.0)
+    assert not np.isnan(resampled['ecg_voltage']).any()
+    np.testing.assert_allclose(resampled['ecg_voltage'], resampled['device_time'] * 10)
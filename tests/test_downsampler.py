@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from Downsampler import downsample, lttb_indices, minmax_indices, query_range
+
+
+def signal(count=5000, seed=16):
+    rng = np.random.default_rng(seed)
+    x = 1700000000.0 + np.arange(count) * 0.1
+    return x, np.cumsum(rng.normal(size=count))
+
+
+@pytest.mark.parametrize('threshold', [3, 10, 99, 500])
+def test_lttb_keeps_the_ends_within_the_threshold(threshold):
+    x, y = signal()
+    indices = lttb_indices(x, y, threshold)
+    assert len(indices) <= threshold
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize('threshold', [4, 11, 100, 500])
+def test_minmax_keeps_the_ends_within_the_threshold(threshold):
+    _, y = signal()
+    indices = minmax_indices(y, threshold)
+    assert len(indices) <= threshold
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_short_series_is_returned_whole():
+    x, y = signal(count=50)
+    np.testing.assert_array_equal(lttb_indices(x, y, 50), np.arange(50))
+    np.testing.assert_array_equal(minmax_indices(y, 80), np.arange(50))
+
+
+@pytest.mark.parametrize('position', [1, 1234, 4998])
+def test_single_sample_spike_survives_both_methods(position):
+    x, _ = signal()
+    y = np.sin(np.arange(len(x)) * 0.01)
+    y[position] = 50.0   # Pico R de una sola muestra
+    assert position in lttb_indices(x, y, 100)
+    assert position in minmax_indices(y, 100)
+    assert position in minmax_indices(-y, 100)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_minmax_returns_the_true_extremes_of_each_bucket(seed):
+    rng = np.random.default_rng(seed)
+    y = rng.normal(size=int(rng.integers(1000, 3000)))
+    threshold = int(rng.integers(10, 200))
+    selected = set(minmax_indices(y, threshold).tolist())
+
+    buckets = threshold // 2 - 1
+    edges = np.floor(np.linspace(0, len(y), buckets + 1)).astype(np.int64)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        assert lo + int(np.argmin(y[lo:hi])) in selected
+        assert lo + int(np.argmax(y[lo:hi])) in selected
+
+
+def test_downsample_shares_the_x_axis_across_channels():
+    x, y = signal()
+    columns = {'timestamp': x, 'ecg_voltage': y, 'bpm': -y, 'temperature': y ** 2}
+    for method in ('lttb', 'minmax'):
+        reduced = downsample(columns, 300, ['ecg_voltage', 'bpm'], method=method)
+        assert len(reduced['timestamp']) <= 300
+        keep = np.searchsorted(x, reduced['timestamp'])
+        for name, column in columns.items():
+            np.testing.assert_array_equal(reduced[name], column[keep])
+    with pytest.raises(ValueError):
+        downsample(columns, 300, ['bpm'], method='paso_fijo')
+
+
+def test_query_range_counts_the_points_in_range():
+    x, y = signal()
+    reduced, count = query_range({'timestamp': x, 'ecg_voltage': y}, x[1000], x[2999], 200)
+    assert count == 2000
+    assert reduced['timestamp'][0] == x[1000] and reduced['timestamp'][-1] == x[2999]
+    assert len(reduced['timestamp']) <= 200
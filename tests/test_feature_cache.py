@@ -0,0 +1,76 @@
+import os
+import shutil
+
+import pytest
+
+from FeatureCache import FeatureCache
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESION = os.path.join(RAIZ, 'sessions', '20251128_144349_18anos_masculino')
+INPUTS = ('datos_sensores.csv', 'metadatos.json')
+
+
+def count_rows(folder):
+    """Extractor de referencia: cantidad de filas de datos_sensores.csv"""
+    with open(os.path.join(folder, 'datos_sensores.csv'), encoding='utf-8') as f:
+        return {'filas': sum(1 for _ in f) - 1}
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    folders = []
+    for name in ('a', 'b'):
+        folder = str(tmp_path / 'sessions' / name)
+        shutil.copytree(SESION, folder)
+        folders.append(folder)
+    return folders
+
+
+def test_content_change_invalidates_only_that_session(sessions, tmp_path):
+    directory = str(tmp_path / 'cache')
+    expected = [count_rows(folder) for folder in sessions]
+    assert FeatureCache(directory).map(count_rows, sessions, INPUTS, 'filas', 1, workers=1) == expected
+
+    # Mismo contenido con otro mtime: se rehashea pero la clave no cambia
+    os.utime(os.path.join(sessions[1], 'datos_sensores.csv'))
+    cache = FeatureCache(directory)
+    assert cache.map(count_rows, sessions, INPUTS, 'filas', 1, workers=1) == expected
+    assert cache.stats() == {'aciertos': 2, 'fallos': 0}
+
+    path = os.path.join(sessions[0], 'datos_sensores.csv')
+    with open(path, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:-10])
+    cache = FeatureCache(directory)
+    results = cache.map(count_rows, sessions, INPUTS, 'filas', 1, workers=1)
+    assert results == [count_rows(folder) for folder in sessions]
+    assert results[0]['filas'] == expected[0]['filas'] - 10
+    assert cache.stats() == {'aciertos': 1, 'fallos': 1}
+
+
+def test_key_depends_on_optional_inputs_and_version(sessions, tmp_path):
+    cache = FeatureCache(str(tmp_path / 'cache'))
+    folder = sessions[0]
+    key = cache.key(folder, INPUTS, 'filas', 1)
+    assert cache.key(folder, INPUTS, 'filas', 2) != key
+    assert cache.key(folder, INPUTS, 'otro', 1) != key
+    assert cache.key(sessions[1], INPUTS, 'filas', 1) == key   # Misma entrada, misma clave
+
+    with open(os.path.join(folder, 'metadatos.json'), 'w', encoding='utf-8') as f:
+        f.write('{}')
+    assert cache.key(folder, INPUTS, 'filas', 1) != key
+
+
+def test_evict_removes_the_least_recently_used(tmp_path):
+    cache = FeatureCache(str(tmp_path / 'cache'), max_bytes=0)
+    keys = [f'{i:02x}' * 32 for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, {'valor': 'x' * 100})
+        os.utime(cache._entry_path(key), (1000 + age, 1000 + age))
+    cache.get(keys[0])   # Uso reciente
+
+    cache.max_bytes = os.path.getsize(cache._entry_path(keys[0])) * 2
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ResamplingStats
+from ConsolidatedDataset import CONSOLIDATED_COLUMNS
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'files'))
+import generar_graficas_articulo as graficas
+
+
+def consolidado(path, participantes=8, seed=14):
+    """todas_las_sesiones.csv sintético con las columnas del consolidado"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({name: rng.uniform(0, 1, participantes) for name in CONSOLIDATED_COLUMNS})
+    df['carpeta_sesion'] = [f'sesion_{i}' for i in range(participantes)]
+    df['edad'] = rng.integers(18, 60, participantes)
+    df['sexo'] = rng.choice(['masculino', 'femenino'], participantes)
+    df['hamilton_psiquica'] = rng.integers(0, 12, participantes)
+    df['hamilton_somatica'] = rng.integers(0, 12, participantes)
+    df['hamilton_total'] = df['hamilton_psiquica'] + df['hamilton_somatica']
+    df['bpm_minimo'] = rng.integers(45, 60, participantes)
+    df['bpm_maximo'] = rng.integers(80, 110, participantes)
+    df['bpm_promedio'] = rng.uniform(60, 80, participantes)
+    df['temp_promedio'] = rng.uniform(30, 35, participantes)
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+    return path
+
+
+def cargar(path):
+    return graficas.agregar_derivadas(pd.read_csv(path, encoding='utf-8-sig'))
+
+
+@pytest.fixture
+def construir(tmp_path, monkeypatch):
+    # Imágenes chicas y pocos remuestreos: lo que se prueba es qué se redibuja
+    monkeypatch.setattr(graficas, 'DPI', 20)
+    monkeypatch.setattr(graficas, 'REMUESTRAS', 200)
+    salida = str(tmp_path / 'graficas')
+    datos = consolidado(str(tmp_path / 'todas_las_sesiones.csv'))
+
+    def construir(df=None):
+        dibujadas, errores = graficas.construir(cargar(datos) if df is None else df, salida, procesos=2)
+        assert errores == []
+        return set(dibujadas)
+    construir.datos = datos
+    return construir
+
+
+def test_second_build_skips_every_figure(construir):
+    assert construir() == set(graficas.FIGURAS)
+    assert construir() == set()
+
+
+def test_column_change_redraws_only_its_figures(construir):
+    construir()
+    df = cargar(construir.datos)
+    df.loc[0, 'bpm_desviacion'] += 1.0
+
+    dependientes = {archivo for archivo, (_, columnas) in graficas.FIGURAS.items()
+                    if 'bpm_desviacion' in columnas}
+    assert dependientes == {'grafica4_correlaciones.png', 'grafica5_matriz_correlacion.png'}
+    assert construir(df) == dependientes
+    assert construir(df) == set()
+
+
+def test_missing_image_is_redrawn(construir, tmp_path):
+    construir()
+    os.remove(str(tmp_path / 'graficas' / 'grafica1_caracteristicas_muestra.png'))
+    assert construir() == {'grafica1_caracteristicas_muestra.png'}
+
+
+def test_resampling_engine_change_redraws_the_correlations(construir, tmp_path, monkeypatch):
+    construir()
+
+    # Copia del motor de remuestreo cargada desde tmp_path, luego editada en disco
+    path = str(tmp_path / 'ResamplingStats.py')
+    shutil.copy(ResamplingStats.__file__, path)
+    spec = importlib.util.spec_from_file_location('ResamplingStats', path)
+    motor = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(motor)
+    monkeypatch.setattr(graficas, 'CODIGO_COMUN', tuple(
+        motor if codigo is ResamplingStats else codigo for codigo in graficas.CODIGO_COMUN))
+    assert construir() == set()
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('\n\ndef _cambio_del_motor():\n    return None\n')
+    assert 'grafica4_correlaciones.png' in construir()
+    assert construir() == set()
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from HRVMonitor import StreamingHRV
+
+
+def rr_series(seconds=300, seed=13):
+    """RR (s) con oscilaciones conocidas: 50 ms a 0.1 Hz (LF) y 20 ms a 0.25 Hz (HF)"""
+    rng = np.random.default_rng(seed)
+    times, rr, t = [], [], 0.0
+    while t < seconds:
+        value = 0.8 + 0.05 * np.sin(2 * np.pi * 0.1 * t) + 0.02 * np.sin(2 * np.pi * 0.25 * t)
+        value += rng.normal(scale=0.002)
+        t += value
+        times.append(t)
+        rr.append(value)
+    return np.array(times), np.array(rr)
+
+
+def direct_time_domain(rr_ms, valid_pairs=None):
+    diffs = np.diff(rr_ms)
+    if valid_pairs is not None:
+        diffs = diffs[valid_pairs]
+    return {
+        'latidos': len(rr_ms),
+        'rr_promedio_ms': np.mean(rr_ms),
+        'sdnn_ms': np.std(rr_ms),
+        'rmssd_ms': np.sqrt(np.mean(diffs ** 2)),
+        'pnn50': 100.0 * np.mean(np.abs(diffs) > 50)
+    }
+
+
+def assert_metrics(actual, expected):
+    assert actual['latidos'] == expected['latidos']
+    for key in ('rr_promedio_ms', 'sdnn_ms', 'rmssd_ms', 'pnn50'):
+        assert actual[key] == pytest.approx(expected[key], rel=1e-9, abs=1e-9), key
+
+
+def test_sliding_window_matches_a_direct_computation():
+    times, rr = rr_series()
+    hrv = StreamingHRV(window_seconds=60.0)
+    for t, value in zip(times, rr):
+        hrv.add_rr(t, value)
+
+    inside = times > times[-1] - 60.0
+    assert_metrics(hrv.time_domain(), direct_time_domain(rr[inside] * 1000.0))
+
+
+def test_session_totals_skip_artifacts_and_their_differences():
+    times, rr = rr_series(seconds=120)
+    hrv = StreamingHRV()
+    hrv.begin(phase='activation')
+    for k, (t, value) in enumerate(zip(times, rr)):
+        if k == len(rr) // 2:
+            hrv.set_phase('regulation')
+            hrv.add_rr(t, 2.5)   # Latido perdido: fuera de rango
+        hrv.add_rr(t, value)
+    hrv.end()
+
+    half = len(rr) // 2
+    rr_ms = rr * 1000.0
+    # La diferencia que cruza el artefacto no cuenta
+    valid = np.ones(len(rr) - 1, dtype=bool)
+    valid[half - 1] = False
+    summary = hrv.summary()
+    assert_metrics(summary, direct_time_domain(rr_ms, valid))
+    assert summary['artefactos'] == 1
+    assert_metrics(summary['fases']['activation'], direct_time_domain(rr_ms[:half]))
+    assert_metrics(summary['fases']['regulation'], direct_time_domain(rr_ms[half:]))
+    assert summary['fases']['regulation']['artefactos'] == 1
+
+    # Ida y vuelta por el checkpoint
+    assert StreamingHRV.summary_from_dict(hrv.to_dict()) == summary
+
+
+def test_spectral_power_matches_the_known_oscillations():
+    times, rr = rr_series()
+    hrv = StreamingHRV(spectral_seconds=300.0, refresh_seconds=60.0)
+    for t, value in zip(times, rr):
+        hrv.add_rr(t, value)
+
+    spectral = hrv.frequency_domain()
+    # Potencia de una senoidal de amplitud A: A²/2 (ms²), atenuada por sinc⁴(f·RR)
+    # al interpolar linealmente un tacograma muestreado una vez por latido
+    power = lambda amplitude, f: amplitude ** 2 / 2 * np.sinc(f * rr.mean()) ** 4
+    assert spectral['lf_ms2'] == pytest.approx(power(50, 0.1), rel=0.1)
+    assert spectral['hf_ms2'] == pytest.approx(power(20, 0.25), rel=0.1)
+    assert spectral['lf_hf'] == pytest.approx(spectral['lf_ms2'] / spectral['hf_ms2'])
+    assert hrv.frequency_domain() is spectral   # Dentro de refresh_seconds no se recalcula
+
+
+def test_too_few_beats_give_no_metrics():
+    hrv = StreamingHRV()
+    hrv.add_rr(1.0, 0.8)
+    assert hrv.time_domain() is None
+    assert hrv.frequency_domain() is None
+    assert hrv.summary() is None
@@ -0,0 +1,175 @@
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import find_peaks
+
+from BioSensorSystem import BioSensorSystem
+from PeakDetector import StreamingPeakDetector
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESIONES = sorted(glob.glob(os.path.join(RAIZ, 'sessions', '*', 'datos_sensores.csv')))
+
+
+def find_peaks_reference(ecg):
+    """Cálculo original de calculate_bpm: find_peaks sobre la ventana en cada muestra
+
+    Devuelve los BPM y los picos de la ventana (índices absolutos) por muestra.
+    """
+    window, history = [], []
+    last_bpm = 70
+    bpm, peaks_per_sample = [], []
+    for index, value in enumerate(ecg):
+        window.append(value)
+        if len(window) > 100:
+            window.pop(0)
+        start = index - len(window) + 1
+
+        signal = np.array(window)
+        std = np.std(signal)
+        peaks = np.empty(0, dtype=np.int64)
+        if std >= 0.001:
+            normalized = (signal - np.mean(signal)) / std
+            peaks, _ = find_peaks(normalized, height=0.5, distance=6, prominence=0.3)
+        peaks_per_sample.append(peaks + start)
+
+        if len(window) >= 50 and std >= 0.001 and len(peaks) >= 3:
+            current_bpm = 60 / np.mean(np.diff(peaks) * 0.1)
+            if 40 <= current_bpm <= 180:
+                history.append(current_bpm)
+                if len(history) > 5:
+                    history.pop(0)
+                last_bpm = int(np.mean(history))
+        bpm.append(last_bpm)
+    return bpm, peaks_per_sample
+
+
+@pytest.mark.parametrize('path', SESIONES, ids=lambda path: os.path.basename(os.path.dirname(path)))
+def test_calculate_bpm_matches_find_peaks_on_recorded_sessions(path):
+    ecg = pd.read_csv(path)['ecg_voltage'].to_numpy()
+    expected_bpm, expected_peaks = find_peaks_reference(ecg)
+
+    system = BioSensorSystem()
+    for index, value in enumerate(ecg):
+        assert system.calculate_bpm(value) == expected_bpm[index], f"BPM distinto en la muestra {index}"
+        np.testing.assert_array_equal(system.peak_detector.peaks, expected_peaks[index],
+                                      err_msg=f"Picos distintos en la muestra {index}")
+
+
+def test_plateau_peaks_use_the_midpoint():
+    detector = StreamingPeakDetector(sample_rate=10, window_seconds=3)
+    signal = [0, 0, 1, 3, 3, 3, 1, 0, 0, 0, 0, 0, 2, 0, 0]
+    for value in signal:
+        detector.update(value)
+    expected, _ = find_peaks((np.array(signal) - np.mean(signal)) / np.std(signal),
+                             height=0.5, distance=6, prominence=0.3)
+    np.testing.assert_array_equal(detector.peaks, expected)
+
+
+def test_events_carry_rr_between_emitted_peaks():
+    rate = 10
+    t = np.arange(600) / rate
+    ecg = np.where((np.arange(600) % 8) == 0, 2.0, 0.0) + 0.01 * np.sin(t)
+    detector = StreamingPeakDetector(sample_rate=rate)
+    events = []
+    detector.add_listener(events.append)
+    for value in ecg:
+        detector.update(value)
+
+    assert events[0]['rr'] is None
+    assert [event['rr'] for event in events[1:]] == pytest.approx([0.8] * (len(events) - 1))
+    assert all(event['time'] == event['index'] / rate for event in events)
+
+
+def test_lost_frames_do_not_shorten_rr():
+    rate = 10
+    ecg = np.where((np.arange(600) % 8) == 0, 2.0, 0.0) + 0.01 * np.sin(np.arange(600) / rate)
+    device_time = np.arange(600) / rate
+    # Se pierden 2 tramas entre dos picos y el Arduino se reinicia en la muestra 400
+    kept = np.setdiff1d(np.arange(600), [203, 204])
+    device_time[400:] -= device_time[400]
+
+    system = BioSensorSystem()
+    events = []
+    system.peak_detector.add_listener(events.append)
+    for index in kept:
+        system.calculate_bpm(ecg[index], device_time[index])
+
+    beats = [index for index in range(8, 600, 8)]
+    assert [event['time'] for event in events] == pytest.approx([device_time[index] for index in beats])
+    # Con el índice de muestra, el intervalo que cruza la pérdida daría 0,6 s
+    rr = [event['rr'] for event in events]
+    restart = beats.index(400)
+    assert rr[0] is None and rr[restart] is None
+    assert rr[1:restart] + rr[restart + 1:] == pytest.approx([0.8] * (len(rr) - 2))
+    assert system.hrv.time_domain()['rr_promedio_ms'] == pytest.approx(800.0)
+
+
+def synthetic_ecg(rate, count, seed=0):
+    """Latidos cada 0,8 s (onda R y onda T) con ruido, a la frecuencia pedida"""
+    phase = (np.arange(count) / rate % 0.8) / 0.8
+    noise = 0.01 * np.random.default_rng(seed).standard_normal(count)
+    return 1.5 + np.exp(-((phase - 0.3) / 0.02) ** 2) + 0.2 * np.exp(-((phase - 0.6) / 0.06) ** 2) + noise
+
+
+def assert_matches_find_peaks(detector, signal):
+    """Los picos del detector, muestra a muestra, contra find_peaks sobre la ventana"""
+    for index, value in enumerate(signal):
+        detector.update(value)
+        start = max(0, index - detector.window_size + 1)
+        window = signal[start:index + 1]
+        expected = np.empty(0, dtype=np.int64)
+        if np.std(window) >= 0.001:
+            expected, _ = find_peaks((window - np.mean(window)) / np.std(window), height=0.5,
+                                     distance=detector.min_distance, prominence=0.3)
+        np.testing.assert_array_equal(detector.peaks, expected + start,
+                                      err_msg=f"Picos distintos en la muestra {index}")
+        assert detector.flat == (np.std(window) < 0.001)
+
+
+def test_noisy_high_rate_signal_matches_find_peaks():
+    rate = 100
+    detector = StreamingPeakDetector(sample_rate=rate, window_seconds=5)
+    assert_matches_find_peaks(detector, synthetic_ecg(rate, 3000))
+
+
+def quantized_signal(seed, count=400):
+    """Señal cuantizada como el ADC: valores repetidos, mesetas y muestras justo en el umbral"""
+    rng = np.random.default_rng(seed)
+    kind = seed % 3
+    if kind == 0:
+        counts = rng.integers(0, int(rng.integers(2, 8)), count)
+    elif kind == 1:
+        counts = np.repeat(rng.integers(0, 6, count // 4), rng.integers(1, 5, count // 4))[:count]
+    else:
+        counts = np.round(3 * np.sin(np.arange(count) * 0.7) + rng.normal(0, 1, count))
+    return counts * float(rng.choice([1.0, 0.1, 5 / 1023]))
+
+
+# Las semillas 15 y 218 tienen máximos con z a ~1e-16 de la altura mínima: con la
+# desviación de las sumas acumuladas quedaban del otro lado del umbral
+@pytest.mark.parametrize('seed', list(range(30)) + [218])
+def test_quantized_signal_matches_find_peaks(seed):
+    detector = StreamingPeakDetector(sample_rate=10, window_seconds=10)
+    assert_matches_find_peaks(detector, quantized_signal(seed))
+
+
+def test_cost_per_sample_does_not_grow_with_the_window():
+    def cost(rate):
+        # Misma ventana en segundos, 50 veces más muestras a 500 Hz que a 10 Hz
+        ecg = synthetic_ecg(rate, 12000)
+        best = float('inf')
+        for _ in range(3):
+            detector = StreamingPeakDetector(sample_rate=rate)
+            for value in ecg[:detector.window_size]:
+                detector.update(value)
+            began = time.perf_counter()
+            for value in ecg[detector.window_size:]:
+                detector.update(value)
+            best = min(best, (time.perf_counter() - began) / (len(ecg) - detector.window_size))
+        return best
+
+    assert cost(500) < 1.8 * cost(10)
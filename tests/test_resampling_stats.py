@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from ResamplingStats import (MEMORY_BUDGET, _batch_size, bootstrap_ci, bootstrap_pairs,
+                             correlation_table, fdr_bh, pearson_matrix, permutation_pvalues)
+
+
+@pytest.fixture(scope='module')
+def cohort():
+    # Tamaño de la cohorte real: 11 sesiones, una variable correlacionada y una independiente
+    rng = np.random.default_rng(6)
+    a = rng.normal(size=11)
+    return np.column_stack([a, 0.6 * a + rng.normal(scale=0.8, size=11), rng.normal(size=11)])
+
+
+def pearson(x, y, axis=-1):
+    return stats.pearsonr(np.broadcast_to(x, y.shape), y, axis=axis).statistic
+
+
+def scipy_permutation_p(x, y):
+    """p de scipy para |r| permutando los emparejamientos (la misma definición bilateral)"""
+    return stats.permutation_test((y,), lambda y, axis=-1: np.abs(pearson(x, y, axis)),
+                                  permutation_type='pairings', vectorized=True,
+                                  n_resamples=20000, alternative='greater',
+                                  random_state=np.random.default_rng(7)).pvalue
+
+
+def test_pearson_matches_scipy(cohort):
+    r = pearson_matrix(cohort)
+    for i in range(3):
+        for j in range(3):
+            assert r[i, j] == pytest.approx(stats.pearsonr(cohort[:, i], cohort[:, j]).statistic)
+
+
+def test_permutation_pvalues_match_scipy(cohort):
+    pvalues = permutation_pvalues(cohort, permutations=20000, seed=8)
+    assert np.allclose(pvalues, pvalues.T) and np.all(np.diag(pvalues) == 0)
+    for i, j in ((0, 1), (0, 2), (1, 2)):
+        expected = scipy_permutation_p(cohort[:, i], cohort[:, j])
+        # Ambos son estimaciones Monte Carlo: ~4 errores estándar de 20000 remuestreos
+        assert pvalues[i, j] == pytest.approx(expected, abs=0.015)
+
+
+def test_pvalue_is_never_zero():
+    x = np.arange(11.0)
+    pvalues = permutation_pvalues(np.column_stack([x, 2 * x + 1]), permutations=500, seed=9)
+    assert pvalues[0, 1] == pytest.approx(1 / 501)
+
+
+def test_bootstrap_ci_matches_scipy_percentile(cohort):
+    low, high = bootstrap_ci(cohort, resamples=20000, seed=10)
+    for i, j in ((0, 1), (0, 2)):
+        expected = stats.bootstrap((cohort[:, i], cohort[:, j]), pearson,
+                                   paired=True, vectorized=True, n_resamples=20000,
+                                   method='percentile', random_state=np.random.default_rng(11))
+        interval = expected.confidence_interval
+        assert low[i, j] == pytest.approx(interval.low, abs=0.03)
+        assert high[i, j] == pytest.approx(interval.high, abs=0.03)
+        assert (low[j, i], high[j, i]) == (low[i, j], high[i, j])
+
+
+def test_fdr_matches_scipy():
+    pvalues = np.array([0.001, 0.2, 0.03, 0.04, 0.5, 0.011, np.nan])
+    q = fdr_bh(pvalues)
+    np.testing.assert_allclose(q[:-1], stats.false_discovery_control(pvalues[:-1], method='bh'))
+    assert np.isnan(q[-1])
+
+
+def test_incomplete_rows_are_dropped(cohort):
+    with_nan = np.vstack([cohort, [np.nan, 1.0, 2.0]])
+    [row, *_] = correlation_table(with_nan, ['a', 'b', 'c'], resamples=200, permutations=200, seed=12)
+    assert row['n'] == 11
+    assert row['r'] == pytest.approx(stats.pearsonr(cohort[:, 0], cohort[:, 1]).statistic)
+
+
+def test_batch_size_follows_the_memory_budget():
+    assert _batch_size(11, 3, MEMORY_BUDGET) * 11 * 3 * 8 <= MEMORY_BUDGET
+    assert _batch_size(400, 8, MEMORY_BUDGET) < _batch_size(11, 3, MEMORY_BUDGET)
+    assert _batch_size(400, 8, MEMORY_BUDGET) * 400 * 8 * 8 <= MEMORY_BUDGET
+    assert _batch_size(10 ** 6, 8, MEMORY_BUDGET) == 1
+
+
+def test_results_do_not_depend_on_the_budget(cohort):
+    # Presupuesto para 7 remuestreos por lote: muchos lotes y uno final incompleto
+    small = 7 * 11 * 3 * 8
+    np.testing.assert_array_equal(bootstrap_pairs(cohort, 500, seed=13),
+                                  bootstrap_pairs(cohort, 500, seed=13, memory_budget=small))
+    np.testing.assert_array_equal(permutation_pvalues(cohort, 500, seed=14),
+                                  permutation_pvalues(cohort, 500, seed=14, memory_budget=small))
@@ -0,0 +1,47 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from RingBuffer import RingBuffer
+
+
+@pytest.mark.parametrize('capacity', [1, 5, 64])
+def test_matches_a_bounded_deque(capacity):
+    rng = np.random.default_rng(capacity)
+    ring = RingBuffer(capacity)
+    reference = deque(maxlen=capacity)
+
+    for value in rng.normal(size=5 * capacity + 3):
+        evicted = reference[0] if len(reference) == capacity else None
+        assert ring.append(value) == evicted
+        reference.append(value)
+
+        assert len(ring) == len(reference)
+        assert ring.full == (len(reference) == capacity)
+        np.testing.assert_array_equal(ring.view(), list(reference))
+        assert ring.oldest() == reference[0]
+        assert ring.latest() == reference[-1]
+        assert ring[-1] == reference[-1]
+
+
+def test_view_is_contiguous_and_shares_memory():
+    ring = RingBuffer(4)
+    for value in range(7):
+        ring.append(value)
+    view = ring.view()
+    assert view.flags['C_CONTIGUOUS']
+    assert np.shares_memory(view, ring._data)
+    np.testing.assert_array_equal(view, [3, 4, 5, 6])
+
+
+def test_clear_keeps_the_array():
+    ring = RingBuffer(3)
+    data = ring._data
+    for value in range(5):
+        ring.append(value)
+    ring.clear()
+    assert len(ring) == 0 and ring.oldest() is None and ring.latest() is None
+    ring.append(9)
+    assert ring._data is data
+    np.testing.assert_array_equal(ring.view(), [9])
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from RunningStats import RunningStats, SessionStats
+from test_session_writer import points
+
+
+def accumulate(values):
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+    return stats
+
+
+def assert_matches_numpy(stats, values):
+    values = np.asarray(values)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(np.mean(values), rel=1e-12)
+    assert stats.std == pytest.approx(np.std(values), rel=1e-9)
+    assert stats.minimum == values.min()
+    assert stats.maximum == values.max()
+
+
+@pytest.mark.parametrize('offset', [0.0, 1e6])
+def test_matches_numpy_mean_and_std(offset):
+    # Un desplazamiento grande no degrada la varianza (sin cancelación catastrófica)
+    values = offset + np.random.default_rng(1).normal(1.5, 0.2, size=5000)
+    assert_matches_numpy(accumulate(values), values)
+
+
+@pytest.mark.parametrize('split', [0, 1, 700, 3000])
+def test_merge_matches_numpy_on_the_concatenation(split):
+    values = np.random.default_rng(2).normal(33, 1.5, size=3000)
+    merged = accumulate(values[:split]).merge(accumulate(values[split:]))
+    assert_matches_numpy(merged, values)
+
+
+def test_state_round_trip():
+    values = np.random.default_rng(3).integers(50, 120, size=100)
+    restored = RunningStats.from_dict(accumulate(values).to_dict())
+    restored.update(80)
+    assert_matches_numpy(restored, np.append(values, 80))
+
+
+def test_session_stats_per_phase_match_numpy():
+    session_data = list(points(0, 900))
+    phases = ['baseline'] * 300 + ['activation'] * 250 + ['regulation'] * 350
+    stats = SessionStats()
+    for point, phase in zip(session_data, phases):
+        stats.update(point, phase)
+
+    summary = stats.summary()
+    assert summary['puntos_datos'] == 900
+    bpm = [p['bpm'] for p in session_data]
+    assert summary['bpm']['promedio'] == pytest.approx(np.mean(bpm))
+    assert summary['bpm']['desviacion'] == pytest.approx(np.std(bpm))
+
+    by_phase = stats.phase_summary()
+    for phase in ('baseline', 'activation', 'regulation'):
+        values = [p['temperature'] for p, name in zip(session_data, phases) if name == phase]
+        assert by_phase[phase]['puntos_datos'] == len(values)
+        assert by_phase[phase]['temperatura']['promedio'] == pytest.approx(np.mean(values))
+        assert by_phase[phase]['temperatura']['desviacion'] == pytest.approx(np.std(values))
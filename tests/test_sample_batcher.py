@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from SampleBatcher import (BATCH_COLUMNS, BATCH_HEADER, SampleBatcher, decode_batch,
+                           encode_batch)
+from test_session_writer import points
+
+
+def jittered(count):
+    """Puntos con el período irregular de la lectura serial real"""
+    rows = list(points(0, count))
+    jitter = np.random.default_rng(4).uniform(-0.004, 0.004, size=count)
+    for point, delta in zip(rows, jitter):
+        point['timestamp'] += delta
+    return rows
+
+
+@pytest.mark.parametrize('count', [1, 25, 1000])
+def test_round_trip_matches_the_points(count):
+    rows = jittered(count)
+    columns = decode_batch(encode_batch(rows))
+
+    # Cada delta se redondea a 1 µs
+    np.testing.assert_allclose(columns['timestamp'], [p['timestamp'] for p in rows],
+                               rtol=0, atol=0.5e-6 * count + 1e-6)
+    for name in ('ecg_voltage', 'temperature', 'ecg_change_percent', 'temp_change_celsius'):
+        np.testing.assert_array_equal(columns[name], np.float32([p[name] for p in rows]))
+    for name in ('bpm', 'ecg_raw'):
+        np.testing.assert_array_equal(columns[name], [p[name] for p in rows])
+
+
+def test_columns_are_aligned_for_typed_arrays():
+    payload = encode_batch(list(points(0, 7)))
+    sizes = {name: np.dtype(dtype).itemsize for name, dtype in BATCH_COLUMNS}
+    assert len(payload) == BATCH_HEADER.size + 7 * sum(sizes.values())
+    offset = BATCH_HEADER.size
+    for name, _ in BATCH_COLUMNS:
+        assert offset % sizes[name] == 0, name
+        offset += 7 * sizes[name]
+
+
+def test_unknown_version_is_rejected():
+    payload = bytearray(encode_batch(list(points(0, 3))))
+    payload[0] = 99
+    with pytest.raises(ValueError):
+        decode_batch(bytes(payload))
+
+
+def test_batcher_emits_full_batches_in_order():
+    batcher = SampleBatcher(max_samples=10, max_interval=60)
+    rows = list(points(0, 35))
+    payloads = [payload for payload in map(batcher.add, rows) if payload is not None]
+    assert len(payloads) == 3 and len(batcher) == 5
+    assert batcher.poll() is None
+    payloads.append(batcher.flush())
+
+    raw = np.concatenate([decode_batch(payload)['ecg_raw'] for payload in payloads])
+    np.testing.assert_array_equal(raw, [p['ecg_raw'] for p in rows])
+    assert batcher.flush() is None and batcher.time_left() is None
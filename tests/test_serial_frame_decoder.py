@@ -0,0 +1,59 @@
+import numpy as np
+
+from SerialFrameDecoder import FRAME_DTYPE, SYNC_WORD, CRC_START, CRC_END, FrameDecoder, crc16_ccitt
+
+
+def frames(seqs, start_ms=0):
+    """Tramas válidas con las secuencias dadas, una cada 4 ms"""
+    data = np.zeros(len(seqs), dtype=FRAME_DTYPE)
+    data['sync'] = SYNC_WORD
+    data['seq'] = np.asarray(seqs) % 65536
+    data['device_ms'] = start_ms + 4 * np.arange(len(seqs))
+    data['ecg_raw'] = 512
+    raw = data.view(np.uint8).reshape(len(seqs), FRAME_DTYPE.itemsize)
+    data['crc'] = crc16_ccitt(raw[:, CRC_START:CRC_END])
+    return data
+
+
+def corrupt(data, index):
+    data = data.copy()
+    data['ecg_raw'][index] ^= 1
+    return data
+
+
+def test_clean_stream_decodes_every_frame():
+    decoder = FrameDecoder()
+    stream = frames(range(100)).tobytes()
+    # En trozos arbitrarios, como llegan por el puerto
+    seqs = np.concatenate([decoder.feed(stream[i:i + 37])['seq'] for i in range(0, len(stream), 37)])
+    np.testing.assert_array_equal(seqs, np.arange(100))
+    assert decoder.stats()['tramas_perdidas'] == 0
+
+
+def test_corrupt_frame_is_not_also_counted_as_lost():
+    decoder = FrameDecoder()
+    decoded = decoder.feed(corrupt(frames(range(20)), 7).tobytes())
+    assert len(decoded['seq']) == 19
+    assert decoder.frames_corrupt == 1
+    assert decoder.frames_lost == 0
+
+
+def test_missing_frames_are_counted_as_lost():
+    decoder = FrameDecoder()
+    decoder.feed(np.concatenate([frames(range(10)), frames(range(13, 20), start_ms=52)]).tobytes())
+    assert decoder.frames_lost == 3
+
+
+def test_sequence_wraparound_is_not_a_loss():
+    decoder = FrameDecoder()
+    decoder.feed(frames(range(65530, 65540)).tobytes())
+    assert decoder.frames_lost == 0
+    assert decoder.resyncs == 0
+
+
+def test_device_reboot_is_a_resync():
+    decoder = FrameDecoder()
+    decoder.feed(frames(range(40000, 40010), start_ms=160000).tobytes())
+    decoder.feed(frames(range(0, 10), start_ms=4).tobytes())
+    assert decoder.frames_lost == 0
+    assert decoder.resyncs == 1
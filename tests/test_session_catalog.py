@@ -0,0 +1,34 @@
+import os
+import shutil
+
+from SessionCatalog import SessionCatalog
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESIONES = sorted(name for name in os.listdir(os.path.join(RAIZ, 'sessions'))
+                  if os.path.isdir(os.path.join(RAIZ, 'sessions', name)))
+
+
+def copy_sessions(root, names):
+    for name in names:
+        shutil.copytree(os.path.join(RAIZ, 'sessions', name), os.path.join(root, name))
+
+
+def test_refresh_fills_an_empty_catalog(tmp_path):
+    copy_sessions(tmp_path, SESIONES[:3])
+    catalog = SessionCatalog(str(tmp_path))
+    assert catalog.refresh(workers=2) == 3
+    total, rows = catalog.query()
+    assert total == 3
+    assert {row['carpeta'] for row in rows} == set(SESIONES[:3])
+
+
+def test_refresh_indexes_only_folders_it_has_not_seen(tmp_path):
+    copy_sessions(tmp_path, SESIONES[:2])
+    catalog = SessionCatalog(str(tmp_path))
+    catalog.refresh(workers=2)
+
+    copy_sessions(tmp_path, SESIONES[2:4])
+    os.makedirs(tmp_path / 'en_curso')   # Sin resumen: todavía no se indexa
+    assert catalog.refresh(workers=2) == 2
+    assert catalog.query()[0] == 4
+    assert catalog.refresh(workers=2) == 0
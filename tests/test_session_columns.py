@@ -0,0 +1,58 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from SessionColumns import COLUMNS_SCHEMA, SessionColumns
+from SessionStore import SessionStore
+from test_session_writer import points
+
+
+def csv_session(folder, count=300):
+    store = SessionStore()
+    for point in points(0, count):
+        store.append(point)
+    with open(os.path.join(folder, 'datos_sensores.csv'), 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(store.names) + '\r\n' + store.format_rows())
+    return store
+
+
+def test_write_and_mmap_load_round_trip(tmp_path):
+    store = csv_session(str(tmp_path))
+    SessionColumns.write(str(tmp_path), store.columns())
+
+    columns = SessionColumns.load(str(tmp_path))
+    assert list(columns) == store.names
+    for name in store.names:
+        assert isinstance(columns[name], np.memmap)
+        assert columns[name].dtype == store.column(name).dtype
+        np.testing.assert_array_equal(columns[name], store.column(name))
+
+    subset = SessionColumns.load(str(tmp_path), ['bpm'])
+    assert list(subset) == ['bpm']
+
+
+def test_columns_match_the_csv(tmp_path):
+    folder = str(tmp_path)
+    csv_session(folder)
+    expected = pd.read_csv(os.path.join(folder, 'datos_sensores.csv'), float_precision='round_trip')
+
+    from_csv = SessionColumns.load_columns(folder, convert=True)
+    assert SessionColumns.exists(folder)
+    from_npy = SessionColumns.to_dataframe(folder)
+    for name in expected.columns:
+        np.testing.assert_array_equal(from_csv[name], expected[name])
+        np.testing.assert_array_equal(from_npy[name], expected[name])
+
+
+def test_folder_without_schema_is_incomplete(tmp_path):
+    folder = str(tmp_path)
+    store = csv_session(folder)
+    SessionColumns.write(folder, store.columns())
+    os.remove(os.path.join(SessionColumns.path(folder), COLUMNS_SCHEMA))
+
+    # Escritura interrumpida: se vuelve al CSV
+    assert SessionColumns.load(folder) is None
+    np.testing.assert_array_equal(SessionColumns.load_columns(folder)['ecg_raw'], store.column('ecg_raw'))
+    shutil.rmtree(SessionColumns.path(folder))
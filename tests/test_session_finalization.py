@@ -0,0 +1,88 @@
+import os
+import threading
+
+import pandas as pd
+
+from BioSensorSystem import BioSensorSystem
+from RunningStats import SessionStats
+from SessionFinalizer import SessionFinalizer
+from SessionWAL import SessionWAL
+
+DEMOGRAPHICS = {'edad': 30, 'sexo': 'femenino'}
+HAMILTON = {'responses': {f'q{i}': 0 for i in range(1, 8)}, 'psychic': 0, 'somatic': 0, 'total': 0}
+
+
+def record(system, count):
+    for i in range(count):
+        system.add_data_point({
+            'timestamp': 1000.0 + i * 0.1,
+            'ecg_raw': 400 + i % 7,
+            'ecg_voltage': 1.5 + 0.01 * (i % 7),
+            'temperature': 33.0,
+            'ecg_change_percent': 0.0,
+            'temp_change_celsius': 0.0,
+            'bpm': 70,
+            'device_time': i * 0.1
+        })
+
+
+def test_late_finalize_keeps_its_own_session_after_a_new_one_starts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    system = BioSensorSystem()
+    # El escritor no vacía nada por su cuenta: todo queda para el cierre
+    system.flush_interval = 60
+    system.checkpoint_interval = 60
+
+    finalizer = SessionFinalizer()
+    release = threading.Event()
+    finalizer.submit([('retener', release.wait)])
+
+    first = system.start_session(DEMOGRAPHICS, HAMILTON, phase='activation')
+    record(system, 300)
+    system.stop_session(finalizer)
+
+    second = system.start_session(DEMOGRAPHICS, HAMILTON, phase='regulation')
+    record(system, 50)
+
+    release.set()
+    finalizer.jobs.join()
+    assert finalizer.failed == 0
+
+    assert len(pd.read_csv(os.path.join(first, 'datos_sensores.csv'))) == 300
+    checkpoint = SessionWAL.read_checkpoint(first)
+    assert checkpoint['filas'] == 300
+    assert SessionStats.from_dict(checkpoint['estadisticas']).summary()['puntos_datos'] == 300
+    assert [change['fase'] for change in checkpoint['cambios_fase']] == ['activation']
+    assert checkpoint['fase_actual'] == 'activation'
+
+    system.stop_session()
+    assert len(pd.read_csv(os.path.join(second, 'datos_sensores.csv'))) == 50
+    assert SessionWAL.read_checkpoint(second)['filas'] == 50
+
+
+def test_late_finalize_resamples_with_the_settings_of_its_own_session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    system = BioSensorSystem()
+    system.resample_on_save = True
+    system.resample_max_gap = 1.0
+
+    finalizer = SessionFinalizer()
+    release = threading.Event()
+    finalizer.submit([('retener', release.wait)])
+
+    folder = system.start_session(DEMOGRAPHICS, HAMILTON, phase='activation')
+    record(system, 100)
+    system.stop_session(finalizer)
+
+    # La estación se reconfigura para la próxima sesión antes de que termine el guardado
+    system.set_sample_rate(50)
+    system.resample_max_gap = 0.01
+
+    release.set()
+    finalizer.jobs.join()
+    assert finalizer.failed == 0
+
+    uniform = pd.read_csv(os.path.join(folder, 'datos_uniformes.csv'))
+    assert len(uniform) == 100
+    assert uniform['device_time'].diff().dropna().round(6).eq(0.1).all()
+    assert not uniform['ecg_voltage'].isna().any()
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from BioSensorSystem import BioSensorSystem
+from SessionManager import SessionManager
+
+PUERTOS = ['/dev/ttyACM0', '/dev/ttyACM1']
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """Administrador con dos Arduinos detectados; conectar solo marca el puerto como abierto"""
+    opened = []
+
+    def connect(bio_system):
+        port = bio_system.port or PUERTOS[0]
+        opened.append(port)
+        bio_system.port = port
+        bio_system.connected = True
+        return True
+
+    monkeypatch.setattr(BioSensorSystem, 'find_arduino_ports', staticmethod(lambda: list(PUERTOS)))
+    monkeypatch.setattr(BioSensorSystem, 'connect', connect)
+    emitted = []
+    manager = SessionManager(lambda event, data, room: emitted.append((event, data, room)))
+    manager.opened = opened
+    manager.emitted = emitted
+    yield manager
+    manager.close_all()
+    manager.finalizer.close()
+
+
+def test_stations_take_distinct_free_ports(manager):
+    first = manager.create(demo_mode=False)
+    second = manager.create(demo_mode=False)
+    assert (first.port, second.port) == tuple(PUERTOS)
+    assert manager.opened == PUERTOS
+    assert manager.ports_in_use() == set(PUERTOS)
+    assert manager.free_ports() == []
+    assert manager.create(demo_mode=False) is None   # No quedan puertos libres
+
+
+def test_second_reservation_of_a_port_is_rejected(manager):
+    station = manager.create(demo_mode=False, port=PUERTOS[1])
+    assert station.port == PUERTOS[1]
+    assert manager.create(demo_mode=False, port=PUERTOS[1]) is None
+    assert len(manager) == 1
+
+
+def test_port_is_reserved_while_the_station_connects(manager, monkeypatch):
+    connecting, release = threading.Event(), threading.Event()
+    connect = BioSensorSystem.connect
+
+    def slow_connect(bio_system):
+        connecting.set()
+        release.wait(2.0)
+        return connect(bio_system)
+
+    monkeypatch.setattr(BioSensorSystem, 'connect', slow_connect)
+    created = []
+    thread = threading.Thread(target=lambda: created.append(manager.create(demo_mode=False, port=PUERTOS[0])))
+    thread.start()
+    assert connecting.wait(2.0)
+    assert manager.create(demo_mode=False, port=PUERTOS[0]) is None
+    release.set()
+    thread.join()
+    assert created[0].port == PUERTOS[0] and len(manager) == 1
+
+
+def test_stop_releases_the_port(manager):
+    station = manager.create(demo_mode=False, port=PUERTOS[0])
+    assert manager.remove(station.session_id) is station
+    assert manager.ports_in_use() == set()
+    assert manager.get(station.session_id) is None
+    assert manager.create(demo_mode=False, port=PUERTOS[0]).port == PUERTOS[0]
+
+
+def test_events_go_to_the_station_room(manager):
+    first = manager.create(demo_mode=True)
+    second = manager.create(demo_mode=True)
+    assert first.room != second.room
+    first.emit('sensor_data', {'n': 1})
+    second.emit('sensor_data', {'n': 2})
+    assert manager.emitted == [('sensor_data', {'n': 1}, first.room),
+                               ('sensor_data', {'n': 2}, second.room)]
+
+
+def test_reconnecting_client_resolves_to_its_station(manager):
+    station = manager.create(demo_mode=True)
+    other = manager.create(demo_mode=True)
+    manager.attach_client('sid-1', station.session_id)
+    assert manager.for_client('sid-1') is station
+    assert manager.for_client('sid-1', other.session_id) is other   # Estación indicada explícitamente
+
+    # Se corta la conexión: la estación sigue y el cliente vuelve con otro sid
+    assert manager.detach_client('sid-1') == station.session_id
+    assert manager.for_client('sid-1') is None
+    manager.attach_client('sid-2', station.session_id)
+    assert manager.for_client('sid-2') is station
+
+    manager.remove(station.session_id)
+    assert manager.for_client('sid-2') is None
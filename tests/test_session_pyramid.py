@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from SessionColumns import SessionColumns
+from SessionPyramid import SessionPyramid
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESION = os.path.join(RAIZ, 'sessions', '20251128_144349_18anos_masculino')
+
+
+@pytest.fixture(scope='module')
+def columns():
+    return SessionColumns.load_columns(SESION)
+
+
+@pytest.mark.parametrize('points', [10, 75, 200, 297])
+def test_query_returns_the_requested_resolution(columns, points):
+    _, series = SessionPyramid.from_columns(columns).query(max_points=points)
+    assert len(series['timestamp']) == points
+    assert np.all(np.diff(series['timestamp']) > 0)
+
+
+def test_query_within_a_range(columns):
+    times = columns['timestamp']
+    start, end = times[100], times[900]
+    _, series = SessionPyramid.from_columns(columns).query(start, end, 150)
+    assert len(series['timestamp']) == 150
+    assert times[96] <= series['timestamp'][0] and series['timestamp'][-1] <= times[904]
+
+
+def test_small_range_uses_the_samples(columns):
+    times = columns['timestamp']
+    assert SessionPyramid.from_columns(columns).query(times[0], times[300], 400) is None
+
+
+@pytest.fixture(scope='module')
+def random_columns():
+    # Largo que no es múltiplo del factor: el último bucket de cada nivel está incompleto
+    rng = np.random.default_rng(5)
+    count = 4 ** 5 + 37
+    columns = {'timestamp': np.arange(count) * 0.1}
+    for name in ('ecg_voltage', 'temperature', 'ecg_change_percent', 'temp_change_celsius'):
+        columns[name] = rng.normal(size=count)
+    columns['bpm'] = rng.integers(50, 120, size=count)
+    return columns
+
+
+def test_every_bucket_matches_its_raw_slice(random_columns):
+    pyramid = SessionPyramid.from_columns(random_columns)
+    count = len(random_columns['timestamp'])
+    for number, level in enumerate(pyramid.levels, start=1):
+        size = pyramid.factor ** number
+        assert len(level) == -(-count // size)
+        for j, bucket in enumerate(level):
+            raw = slice(j * size, min((j + 1) * size, count))
+            assert bucket['muestras'] == raw.stop - raw.start
+            assert bucket['t_inicio'] == random_columns['timestamp'][raw.start]
+            assert bucket['t_fin'] == random_columns['timestamp'][raw.stop - 1]
+            for name in pyramid.channels:
+                values = random_columns[name][raw]
+                assert bucket[f'{name}_min'] == values.min()
+                assert bucket[f'{name}_max'] == values.max()
+                assert bucket[f'{name}_mean'] == pytest.approx(values.mean())
+
+
+def test_query_keeps_the_extremes_of_the_range(random_columns):
+    pyramid = SessionPyramid.from_columns(random_columns)
+    _, series = pyramid.query(max_points=100)
+    for name in pyramid.channels:
+        assert series[f'{name}_min'].min() == random_columns[name].min()
+        assert series[f'{name}_max'].max() == random_columns[name].max()
+        assert np.all(series[f'{name}_min'] <= series[name])
+        assert np.all(series[name] <= series[f'{name}_max'])
+
+
+def test_saved_pyramid_answers_like_the_built_one(random_columns, tmp_path):
+    built = SessionPyramid.from_columns(random_columns)
+    built.save(str(tmp_path))
+    loaded = SessionPyramid.load(str(tmp_path))
+    assert isinstance(loaded.levels[0], np.memmap) or isinstance(loaded.levels[0].base, np.memmap)
+    for level, expected in zip(loaded.levels, built.levels):
+        np.testing.assert_array_equal(level, expected)
+    expected, actual = built.query(20.0, 80.0, 50), loaded.query(20.0, 80.0, 50)
+    assert actual[0] == expected[0]
+    for name, column in expected[1].items():
+        np.testing.assert_array_equal(actual[1][name], column)
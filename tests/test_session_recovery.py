@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from BioSensorSystem import BioSensorSystem
+from RunningStats import SessionStats
+from SessionWAL import SessionWAL, WAL_NAME, FILE_HEADER, RECORD_HEADER
+from test_session_finalization import DEMOGRAPHICS, HAMILTON
+
+
+def point(i):
+    # ecg_raw = i: permite verificar qué filas exactas sobrevivieron
+    return {
+        'timestamp': 1000.0 + i * 0.1,
+        'ecg_raw': i,
+        'ecg_voltage': 1.5 + 0.001 * i,
+        'temperature': 33.0 + 0.01 * i,
+        'ecg_change_percent': 0.0,
+        'temp_change_celsius': 0.0,
+        'bpm': 70,
+        'device_time': i * 0.1
+    }
+
+
+def crashed_session(tmp_path, monkeypatch, batches, checkpoint_after=1):
+    """Graba `batches` lotes (uno por registro del WAL) y corta sin cerrar la sesión
+
+    Solo los primeros `checkpoint_after` lotes quedan cubiertos por checkpoint.json.
+    """
+    monkeypatch.chdir(tmp_path)
+    system = BioSensorSystem()
+    system.flush_interval = 60
+    system.checkpoint_interval = 60
+    folder = system.start_session(DEMOGRAPHICS, HAMILTON, phase='activation')
+    writer = system.session_writer
+
+    index = 0
+    for number, size in enumerate(batches, start=1):
+        for _ in range(size):
+            system.add_data_point(point(index))
+            index += 1
+        writer._flush(sync=True, checkpoint=number <= checkpoint_after)
+
+    # Corte: el hilo escritor termina sin volcar nada más
+    writer._flush = lambda sync, checkpoint=False: None
+    writer.close()
+    return folder
+
+
+def wal_records(folder):
+    """Desplazamiento (inicio del encabezado, largo del payload) de cada registro"""
+    with open(os.path.join(folder, WAL_NAME), 'rb') as f:
+        data = f.read()
+    records, position = [], FILE_HEADER.size
+    while position < len(data):
+        _, length, _ = RECORD_HEADER.unpack_from(data, position)
+        records.append((position, length))
+        position += RECORD_HEADER.size + length
+    return records
+
+
+def assert_recovered(folder, expected):
+    state = BioSensorSystem.recover_session(folder)
+    csv = pd.read_csv(os.path.join(folder, 'datos_sensores.csv'))
+    np.testing.assert_array_equal(csv['ecg_raw'], np.arange(expected))
+    np.testing.assert_allclose(csv['ecg_voltage'], 1.5 + 0.001 * np.arange(expected))
+
+    assert state['filas'] == expected
+    assert SessionStats.from_dict(state['estadisticas']).count == expected
+    assert SessionWAL.read_checkpoint(folder)['filas'] == expected
+    rows, _, valid_end = SessionWAL.scan(os.path.join(folder, WAL_NAME))
+    np.testing.assert_array_equal(rows['ecg_raw'], np.arange(expected))
+    assert valid_end == os.path.getsize(os.path.join(folder, WAL_NAME))
+
+
+def test_truncated_final_wal_record_is_dropped(tmp_path, monkeypatch):
+    folder = crashed_session(tmp_path, monkeypatch, [30, 20, 10])
+    start, length = wal_records(folder)[-1]
+    os.truncate(os.path.join(folder, WAL_NAME), start + RECORD_HEADER.size + length // 2)
+    assert_recovered(folder, 50)
+
+
+def test_bad_crc_in_the_middle_ends_the_valid_log(tmp_path, monkeypatch):
+    folder = crashed_session(tmp_path, monkeypatch, [30, 20, 10])
+    start, _ = wal_records(folder)[-2]
+    with open(os.path.join(folder, WAL_NAME), 'r+b') as f:
+        f.seek(start + RECORD_HEADER.size + 5)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    assert_recovered(folder, 30)
+
+
+def test_partial_csv_row_is_rebuilt_from_the_wal(tmp_path, monkeypatch):
+    folder = crashed_session(tmp_path, monkeypatch, [30, 20])
+    with open(os.path.join(folder, 'datos_sensores.csv'), 'ab') as f:
+        f.write(b'1005.0,50,1.55')
+    assert_recovered(folder, 50)
+
+
+def test_checkpoint_plus_wal_tail_restores_rows_missing_from_the_csv(tmp_path, monkeypatch):
+    folder = crashed_session(tmp_path, monkeypatch, [30, 20, 15])
+    # Corte entre el WAL y el CSV: el CSV solo llegó hasta el checkpoint
+    os.truncate(os.path.join(folder, 'datos_sensores.csv'), SessionWAL.read_checkpoint(folder)['csv_bytes'])
+    assert_recovered(folder, 65)
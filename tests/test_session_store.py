@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from SessionStore import SessionStore
+from test_session_writer import points
+
+
+def summary(session_data, name):
+    """Resumen que se calculaba sobre la lista de dicts original"""
+    values = [p[name] for p in session_data]
+    return {
+        'promedio': sum(values) / len(values),
+        'minimo': min(values),
+        'maximo': max(values),
+        'desviacion': np.std(values)
+    }
+
+
+@pytest.fixture
+def filled():
+    # Capacidad inicial chica: fuerza varios crecimientos
+    store = SessionStore(initial_capacity=4)
+    session_data = list(points(0, 1000))
+    for point in session_data[:600]:
+        store.append(point)
+    store.extend({name: [p[name] for p in session_data[600:]] for name in store.names})
+    return store, session_data
+
+
+def test_rows_match_the_list_of_dicts(filled):
+    store, session_data = filled
+    assert len(store) == len(session_data)
+    for index in (0, 3, 4, 599, 600, 999, -1):
+        assert store[index] == pytest.approx(session_data[index])
+    for name in store.names:
+        np.testing.assert_array_equal(store.column(name), [p[name] for p in session_data])
+    np.testing.assert_array_equal(store.column('bpm', 10, 20), [p['bpm'] for p in session_data[10:20]])
+    with pytest.raises(IndexError):
+        store.point(len(session_data))
+
+
+@pytest.mark.parametrize('name', ['ecg_voltage', 'temperature', 'bpm'])
+def test_stats_match_the_list_summary(filled, name):
+    store, session_data = filled
+    expected = summary(session_data, name)
+    stats = store.stats(name)
+    assert stats['minimo'] == expected['minimo']
+    assert stats['maximo'] == expected['maximo']
+    assert stats['promedio'] == pytest.approx(expected['promedio'], rel=1e-12)
+    assert stats['desviacion'] == pytest.approx(expected['desviacion'], rel=1e-12)
+
+
+def test_empty_store_has_no_stats():
+    assert SessionStore().stats('bpm') is None
+
+
+def test_csv_round_trip(filled, tmp_path):
+    store, _ = filled
+    path = tmp_path / 'datos_sensores.csv'
+    path.write_text(','.join(store.names) + '\r\n' + store.format_rows(), encoding='utf-8')
+    loaded = SessionStore.from_csv(str(path))
+    for name in store.names:
+        np.testing.assert_array_equal(loaded.column(name), store.column(name))
@@ -0,0 +1,83 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+from SessionStore import SessionStore
+from SessionWriter import SessionWriter
+
+
+def points(start, count, seed=0):
+    rng = np.random.default_rng(seed + start)
+    for i in range(start, start + count):
+        yield {
+            'timestamp': 1700000000.0 + i * 0.1,
+            'ecg_raw': int(rng.integers(0, 1024)),
+            'ecg_voltage': float(rng.uniform(0, 5)),
+            'temperature': float(rng.uniform(30, 36)),
+            'ecg_change_percent': float(rng.normal()),
+            'temp_change_celsius': float(rng.normal()),
+            'bpm': int(rng.integers(50, 120)),
+            'device_time': i * 0.1
+        }
+
+
+def reference_csv(names, rows):
+    """Lo que escribía el csv.writer original a partir de la lista de dicts"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(names)
+    for point in rows:
+        writer.writerow([point[name] for name in names])
+    return out.getvalue()
+
+
+def read(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.fixture
+def session(tmp_path):
+    store = SessionStore(initial_capacity=8)
+    writer = SessionWriter(str(tmp_path / 'datos_sensores.csv'), store,
+                           flush_interval=60, fsync_policy='never')
+    yield store, writer
+    writer.close()
+
+
+def test_close_writes_every_row_like_csv_writer(session):
+    store, writer = session
+    writer.start()
+    rows = list(points(0, 250))
+    for point in rows:
+        store.append(point)
+    writer.close()
+
+    assert writer.error is None
+    assert writer.points_written == 250
+    assert read(writer.path) == reference_csv(store.names, rows)
+
+
+def test_crash_keeps_the_flushed_batches(session):
+    store, writer = session
+    writer.start()
+    rows = list(points(0, 40))
+    for point in rows[:25]:
+        store.append(point)
+    writer._flush(sync=False)
+    for point in rows[25:]:
+        store.append(point)
+
+    # Corte antes del siguiente lote: el archivo tiene exactamente los lotes volcados
+    assert read(writer.path) == reference_csv(store.names, rows[:25])
+    assert writer.points_written == 25
+
+    writer._flush(sync=False)
+    assert read(writer.path) == reference_csv(store.names, rows)
+
+
+def test_unknown_fsync_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SessionWriter(str(tmp_path / 'datos_sensores.csv'), SessionStore(), fsync_policy='a veces')
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from SharedRing import SharedRing
+
+FIELDS = ['timestamp', 'value']
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing.create(FIELDS, capacity=8)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def write(ring, start, count):
+    for i in range(start, start + count):
+        ring.write({'timestamp': i * 0.1, 'value': float(i)})
+
+
+def test_reader_gets_structured_rows_in_order(ring):
+    write(ring, 0, 5)
+    rows, position, lost = ring.read_since(0)
+    np.testing.assert_array_equal(rows['value'], np.arange(5))
+    assert (position, lost) == (5, 0)
+
+    # Tramo que da la vuelta al final del buffer
+    write(ring, 5, 6)
+    rows, position, lost = ring.read_since(position)
+    np.testing.assert_array_equal(rows['value'], np.arange(5, 11))
+    assert (position, lost) == (11, 0)
+
+
+def test_rows_are_copies_not_views(ring):
+    write(ring, 0, 4)
+    rows, _, _ = ring.read_since(0)
+    write(ring, 4, 8)
+    np.testing.assert_array_equal(rows['value'], np.arange(4))
+
+
+def test_lapped_reader_skips_overwritten_rows(ring):
+    write(ring, 0, 20)
+    rows, position, lost = ring.read_since(0)
+    # La más antigua comparte lugar con la próxima escritura: tampoco se entrega
+    np.testing.assert_array_equal(rows['value'], np.arange(13, 20))
+    assert (position, lost) == (20, 13)
+
+
+def test_rows_overwritten_while_copying_are_discarded(ring, monkeypatch):
+    write(ring, 0, 8)
+    reads = []
+
+    def count(self):
+        # El escritor avanza 3 filas entre la primera lectura del contador y la segunda
+        reads.append(None)
+        if len(reads) == 2:
+            write(self, 8, 3)
+        return int(self.header[0])
+
+    monkeypatch.setattr(SharedRing, 'count', property(count))
+    rows, position, lost = ring.read_since(0)
+    np.testing.assert_array_equal(rows['value'], np.arange(4, 8))
+    assert (position, lost) == (8, 4)
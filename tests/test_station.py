@@ -0,0 +1,82 @@
+import os
+import threading
+from collections import deque
+
+import pandas as pd
+
+from Station import Station
+from test_session_finalization import DEMOGRAPHICS, HAMILTON
+
+
+def sample(i):
+    return {
+        'timestamp': 1000.0 + i * 0.1,
+        'ecg_raw': 400,
+        'ecg_voltage': 1.5,
+        'temperature': 33.0,
+        'ecg_change_percent': 0.0,
+        'temp_change_celsius': 0.0,
+        'bpm': 70,
+        'device_time': i * 0.1
+    }
+
+
+class QueuedAcquisition:
+    """Adquisición de prueba: entrega lo encolado y luego None"""
+
+    def __init__(self, samples, fail_at=None):
+        self.samples = deque(samples)
+        self.fail_at = fail_at
+        self.calls = 0
+        self.emptied = threading.Event()
+
+    def get(self, timeout=None):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise ValueError("lectura defectuosa")
+        if not self.samples:
+            self.emptied.set()
+            return None
+        return self.samples.popleft()
+
+    def stop(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def station_recording(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    station = Station(emit=lambda event, data: None, demo_mode=True)
+    station.demographics_data = DEMOGRAPHICS
+    station.hamilton_pre = HAMILTON
+    folder = station.bio_system.start_session(DEMOGRAPHICS, HAMILTON, phase='activation')
+    return station, folder
+
+
+def test_queued_samples_are_saved_when_streaming_stops(tmp_path, monkeypatch):
+    station, folder = station_recording(tmp_path, monkeypatch)
+    station.acquisition = QueuedAcquisition([sample(i) for i in range(40)])
+
+    # La sesión ya se detuvo: el bucle no corre, pero la cola se vacía igual
+    station.is_streaming = False
+    station._stream_data()
+    station.stop_session()
+
+    assert len(pd.read_csv(os.path.join(folder, 'datos_sensores.csv'))) == 40
+
+
+def test_a_failed_read_does_not_stop_streaming(tmp_path, monkeypatch):
+    station, folder = station_recording(tmp_path, monkeypatch)
+    station.acquisition = QueuedAcquisition([sample(i) for i in range(20)], fail_at=3)
+
+    station.is_streaming = True
+    thread = threading.Thread(target=station._stream_data)
+    thread.start()
+    assert station.acquisition.emptied.wait(5)
+    station.is_streaming = False
+    thread.join(5)
+    station.stop_session()
+
+    assert len(pd.read_csv(os.path.join(folder, 'datos_sensores.csv'))) == 20